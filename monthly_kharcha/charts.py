@@ -0,0 +1,362 @@
+"""
+Dashboard charts for Monthly Kharcha.
+
+Each chart keeps the matplotlib artists it created.  When new totals come
+in with the same labels, the wedges, bars and texts are updated in place
+and the layout is left alone; the axes are only rebuilt (and laid out
+again) when the set of labels changes.  ``update`` returns False when the
+totals are unchanged so the caller can skip redrawing.
+
+Rendering happens off the Tk main thread.  ``ChartRenderer`` owns a single
+worker thread that draws the figures with Agg and turns the RGBA buffer
+into image data; the main thread polls for finished renders with
+``after()`` and shows them in a ``ChartView`` label.  Finished images are
+kept in a small LRU cache keyed by the chart type, the aggregated totals,
+the size and the theme, so the same data is never rendered twice.
+"""
+
+import math
+import tkinter as tk
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from matplotlib import cm, rc_context
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+TITLE_SIZE = 12
+LABEL_SIZE = 10
+VALUE_SIZE = 9
+
+
+def theme_rc(colors):
+    """matplotlib rcParams for one of the app's color themes"""
+    return {
+        'figure.facecolor': colors['card'],
+        'axes.facecolor': colors['card'],
+        'axes.edgecolor': colors['text'],
+        'axes.labelcolor': colors['text'],
+        'text.color': colors['text'],
+        'xtick.color': colors['text'],
+        'ytick.color': colors['text'],
+        'legend.edgecolor': colors['border'],
+    }
+
+
+# Matching the defaults of Axes.pie
+_START_ANGLE = 90
+_LABEL_DISTANCE = 1.1
+_PCT_DISTANCE = 0.6
+
+
+class CategoryPieChart:
+    """Pie chart of spending by category, with amounts in the legend"""
+
+    def __init__(self, figure):
+        self.figure = figure
+        self.ax = figure.add_subplot(111)
+        self.theme = None
+        self._totals = None
+        self._labels = None
+        self.wedges = []
+        self.texts = []
+        self.autotexts = []
+        self.legend = None
+
+    def update(self, totals):
+        """Show ``{category: total}``; return False if nothing needs redrawing"""
+        key = tuple(totals.items())
+        if key == self._totals:
+            return False
+        labels = tuple(totals)
+        if labels != self._labels:
+            self._build(totals)
+            self.figure.tight_layout()
+        else:
+            self._move(totals)
+        self._totals = key
+        self._labels = labels
+        return True
+
+    def reset(self):
+        """Rebuild the axes on the next update, e.g. after a theme change"""
+        self._totals = None
+        self._labels = None
+
+    def _build(self, totals):
+        self.ax.clear()
+        self.wedges, self.texts, self.autotexts, self.legend = [], [], [], None
+        if not totals:
+            self.ax.text(0.5, 0.5, "No expenses yet",
+                         ha='center', va='center', fontsize=TITLE_SIZE)
+            return
+
+        # Use a colorful but professional color palette
+        colors = cm.Set3(np.linspace(0, 1, len(totals)))
+        self.wedges, self.texts, self.autotexts = self.ax.pie(
+            totals.values(),
+            labels=list(totals),
+            autopct='%1.1f%%',
+            startangle=_START_ANGLE,
+            colors=colors,
+            textprops={'fontsize': LABEL_SIZE}
+        )
+        # Make percentage labels more readable
+        for autotext in self.autotexts:
+            autotext.set_fontsize(VALUE_SIZE)
+            autotext.set_fontweight('bold')
+
+        self.legend = self.ax.legend(
+            self.wedges, self._legend_labels(totals),
+            title="Categories",
+            loc="center left",
+            bbox_to_anchor=(1.0, 0.5),
+            fontsize=LABEL_SIZE,
+            title_fontsize=LABEL_SIZE
+        )
+        self.ax.set_title("Spending by Category", pad=20,
+                          fontsize=TITLE_SIZE, fontweight='bold')
+
+    def _move(self, totals):
+        """Re-angle the existing wedges and move their labels"""
+        if not totals:
+            return
+        grand_total = sum(totals.values())
+        theta = _START_ANGLE
+        for wedge, text, autotext, value in zip(self.wedges, self.texts,
+                                                self.autotexts, totals.values()):
+            span = 360 * value / grand_total
+            wedge.set_theta1(theta)
+            wedge.set_theta2(theta + span)
+            middle = math.radians(theta + span / 2)
+            x, y = math.cos(middle), math.sin(middle)
+            text.set_position((_LABEL_DISTANCE * x, _LABEL_DISTANCE * y))
+            text.set_horizontalalignment('left' if x > 0 else 'right')
+            autotext.set_position((_PCT_DISTANCE * x, _PCT_DISTANCE * y))
+            autotext.set_text(f"{100 * value / grand_total:.1f}%")
+            theta += span
+        for text, label in zip(self.legend.get_texts(), self._legend_labels(totals)):
+            text.set_text(label)
+
+    @staticmethod
+    def _legend_labels(totals):
+        return [f"{name}\n₨{value:,.0f}" for name, value in totals.items()]
+
+
+class PersonBarChart:
+    """Bar chart of the amount paid by each person"""
+
+    def __init__(self, figure):
+        self.figure = figure
+        self.ax = figure.add_subplot(111)
+        self.theme = None
+        self._totals = None
+        self._labels = None
+        self.bars = []
+        self.value_texts = []
+
+    def update(self, totals):
+        """Show ``{name: amount paid}``; return False if nothing needs redrawing"""
+        key = tuple(totals.items())
+        if key == self._totals:
+            return False
+        labels = tuple(totals)
+        if labels != self._labels:
+            self._build(totals)
+            self.figure.tight_layout()
+        else:
+            self._resize(totals)
+        self._totals = key
+        self._labels = labels
+        return True
+
+    def reset(self):
+        """Rebuild the axes on the next update, e.g. after a theme change"""
+        self._totals = None
+        self._labels = None
+
+    def _build(self, totals):
+        self.ax.clear()
+        self.bars, self.value_texts = [], []
+        if not totals:
+            self.ax.text(0.5, 0.5, "No expenses yet",
+                         ha='center', va='center', fontsize=TITLE_SIZE)
+            return
+
+        names = list(totals)
+        self.bars = list(self.ax.bar(
+            names, list(totals.values()),
+            color=cm.Set3(np.linspace(0, 1, len(names))),
+            width=0.6
+        ))
+        # Value labels on top of the bars
+        for bar in self.bars:
+            height = bar.get_height()
+            self.value_texts.append(self.ax.text(
+                bar.get_x() + bar.get_width() / 2., height, f'₨{int(height):,}',
+                ha='center', va='bottom', fontsize=VALUE_SIZE, fontweight='bold'
+            ))
+
+        self.ax.set_title("Amount Paid by Each Person", pad=20,
+                          fontsize=TITLE_SIZE, fontweight='bold')
+        self.ax.set_ylabel("Amount (₨)", fontsize=LABEL_SIZE)
+        # Rotate and align the tick labels so they look better
+        self.ax.tick_params(axis='both', which='major', labelsize=LABEL_SIZE)
+        for label in self.ax.get_xticklabels():
+            label.set_rotation(45)
+            label.set_horizontalalignment('right')
+            label.set_rotation_mode('anchor')
+        # Add some padding to prevent label cutoff
+        self.ax.margins(y=0.2)
+
+    def _resize(self, totals):
+        """Change the bar heights and value labels in place"""
+        for bar, text, height in zip(self.bars, self.value_texts, totals.values()):
+            bar.set_height(height)
+            text.set_y(height)
+            text.set_text(f'₨{int(height):,}')
+        self.ax.relim()
+        self.ax.autoscale_view(scalex=False)
+
+
+def _render(chart, totals, size, theme):
+    """Draw a chart at a pixel size and return it as PPM data (worker thread)"""
+    figure = chart.figure
+    theme_name, rc = theme
+    # New artists take their colors from rcParams; only this thread uses them
+    with rc_context(rc):
+        if chart.theme != theme_name:
+            chart.theme = theme_name
+            figure.set_facecolor(rc['figure.facecolor'])
+            chart.reset()
+        resized = size != figure.canvas.get_width_height()
+        if resized:
+            figure.set_size_inches(size[0] / figure.dpi, size[1] / figure.dpi)
+        changed = chart.update(totals)
+        if resized:
+            figure.tight_layout()
+        if changed or resized:
+            figure.canvas.draw()
+    rgba = np.asarray(figure.canvas.buffer_rgba())
+    height, width = rgba.shape[:2]
+    return b'P6\n%d %d\n255\n' % (width, height) + rgba[..., :3].tobytes()
+
+
+class ChartView:
+    """Label showing a chart that is rendered by a ``ChartRenderer``"""
+
+    MIN_SIZE = 50
+    RESIZE_DELAY_MS = 150
+
+    def __init__(self, parent, renderer, chart_class, size=(600, 400), dpi=100):
+        self.renderer = renderer
+        # The figure is only ever touched by the renderer's worker thread
+        figure = Figure(figsize=(size[0] / dpi, size[1] / dpi), dpi=dpi)
+        FigureCanvasAgg(figure)
+        self.chart = chart_class(figure)
+        self.size = size
+        self.totals = None
+        self.wanted = None
+        self.image = None
+        self._resize_id = None
+
+        self.label = tk.Label(parent, borderwidth=0, highlightthickness=0, padx=0, pady=0)
+        self.label.pack(fill='both', expand=True)
+        self.label.bind('<Configure>', self._on_resize)
+
+    def show(self, totals):
+        self.totals = dict(totals)
+        self.renderer.request(self, self.totals)
+
+    def set_image(self, image):
+        if self.label.winfo_exists():
+            self.image = image
+            self.label.configure(image=image)
+
+    def _on_resize(self, event):
+        size = (event.width, event.height)
+        if size == self.size or min(size) < self.MIN_SIZE:
+            return
+        self.size = size
+        if self._resize_id is not None:
+            self.label.after_cancel(self._resize_id)
+        self._resize_id = self.label.after(self.RESIZE_DELAY_MS, self._rerender)
+
+    def _rerender(self):
+        self._resize_id = None
+        if self.totals is not None:
+            self.renderer.request(self, self.totals)
+
+
+class ChartRenderer:
+    """
+    Renders ``ChartView`` charts on one background thread.
+
+    Each view has at most one render running; newer requests made while it
+    runs replace each other and only the latest is rendered next.
+    """
+
+    POLL_MS = 30
+    CACHE_SIZE = 16
+
+    def __init__(self, widget):
+        self.widget = widget
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chart-render')
+        self._cache = OrderedDict()
+        self._running = {}      # view -> (cache key, future)
+        self._queued = {}       # view -> totals to render next
+        self._poll_id = None
+        self.theme = ('default', {})
+
+    def set_theme(self, name, colors):
+        """Use a color theme for every render requested from now on"""
+        self.theme = (name, theme_rc(colors))
+
+    def request(self, view, totals):
+        key = (type(view.chart).__name__, tuple(totals.items()), view.size, self.theme[0])
+        view.wanted = key
+        image = self._cache.get(key)
+        if image is not None:
+            self._cache.move_to_end(key)
+            self._queued.pop(view, None)
+            view.set_image(image)
+        elif view in self._running:
+            self._queued[view] = totals
+        else:
+            future = self._executor.submit(_render, view.chart, totals, view.size, self.theme)
+            self._running[view] = (key, future)
+            if self._poll_id is None:
+                self._poll_id = self.widget.after(self.POLL_MS, self._poll)
+
+    def _poll(self):
+        self._poll_id = None
+        for view, (key, future) in list(self._running.items()):
+            if not future.done():
+                continue
+            del self._running[view]
+            try:
+                image = tk.PhotoImage(master=self.widget, data=future.result(), format='PPM')
+            except Exception as e:
+                print(f"Error rendering chart: {str(e)}")
+            else:
+                self._cache[key] = image
+                if len(self._cache) > self.CACHE_SIZE:
+                    self._cache.popitem(last=False)
+                if view.wanted == key:
+                    view.set_image(image)
+            if view in self._queued:
+                self.request(view, self._queued.pop(view))
+        if self._running and self._poll_id is None:
+            self._poll_id = self.widget.after(self.POLL_MS, self._poll)
+
+    def close(self):
+        if self._poll_id is not None:
+            self.widget.after_cancel(self._poll_id)
+            self._poll_id = None
+        # shutdown(cancel_futures=True) needs Python 3.9
+        for key, future in self._running.values():
+            future.cancel()
+        self._running.clear()
+        self._queued.clear()
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,375 @@
+"""
+Command line for Monthly Kharcha.
+
+Without a subcommand the app window opens as before.  The subcommands
+work on the data directory directly and never import Tk, so month-end
+processing can be scripted:
+
+    monthly-kharcha --data-dir ~/flat2 import march.csv
+    monthly-kharcha --data-dir ~/flat2 settle-plan --json
+    monthly-kharcha --data-dir ~/flat2 archive --pdf
+
+Batches (``import``) are written to each month with a single storage
+write: one journal append for JSON data, one transaction for SQLite.
+"""
+
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from .engine import (DATE_FORMAT, DEFAULT_CATEGORIES, DEFAULT_ROOMMATES, BookChangedError,
+                     Expense, MonthBook, new_expense_id, new_month_data, open_storage)
+
+DEFAULT_DATA_DIR = Path.home() / "MonthlyKharcha"
+IMPORT_FIELDS = ('date', 'category', 'description', 'amount', 'paid_by', 'shared_between')
+
+
+class CommandError(Exception):
+    """A command could not run; the message is shown to the user"""
+
+
+def parse_date(value):
+    """A date given as ``YYYY-MM-DD`` or ``YYYY-MM-DD HH:MM:SS``"""
+    for fmt in (DATE_FORMAT, "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"invalid date {value!r}, expected YYYY-MM-DD")
+
+
+def parse_month(value):
+    """A month given as ``YYYY-MM``, returned as ``(year, month)``"""
+    try:
+        date = datetime.strptime(value, "%Y-%m")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid month {value!r}, expected YYYY-MM")
+    return date.year, date.month
+
+
+def month_name(year, month):
+    return datetime(year, month, 1).strftime('%B %Y')
+
+
+def new_expense(record, roommates=()):
+    """
+    An ``Expense`` from an imported or typed-in record, checked like the
+    app does.  It always gets a new ID; an ``id`` in the record is ignored,
+    so importing the same file twice cannot put one ID in a month twice.
+    """
+    missing = [field for field in ('category', 'description', 'amount', 'paid_by')
+               if not str(record.get(field) or '').strip()]
+    if missing:
+        raise CommandError(f"missing {', '.join(missing)}")
+    try:
+        amount = float(record['amount'])
+    except (TypeError, ValueError):
+        raise CommandError(f"invalid amount {record['amount']!r}")
+    shared_between = record.get('shared_between') or list(roommates)
+    if isinstance(shared_between, str):
+        shared_between = [name.strip() for name in shared_between.replace(';', ',').split(',')
+                          if name.strip()]
+    if not shared_between:
+        raise CommandError("at least one person must share the expense")
+    date = record.get('date') or datetime.now()
+    if isinstance(date, str):
+        try:
+            date = parse_date(date)
+        except argparse.ArgumentTypeError as e:
+            raise CommandError(str(e))
+    return Expense({
+        'id': new_expense_id(),
+        'category': record['category'].strip(),
+        'description': record['description'].strip(),
+        'amount': amount,
+        'paid_by': record['paid_by'].strip(),
+        'shared_between': shared_between,
+        'date': date.strftime(DATE_FORMAT)
+    })
+
+
+def read_records(path):
+    """Expense records from a CSV file with a header row or a JSON list"""
+    path = Path(path)
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.suffix.lower() == '.json':
+            records = json.load(f)
+            if isinstance(records, dict):
+                records = records.get('expenses', [])
+        else:
+            records = list(csv.DictReader(f))
+            if records and not set(IMPORT_FIELDS) - {'date', 'shared_between'} <= set(records[0]):
+                raise CommandError(f"{path.name}: the header needs the columns "
+                                   f"{', '.join(IMPORT_FIELDS)}")
+    return records
+
+
+def is_current_month(year, month):
+    today = datetime.now()
+    return (year, month) == (today.year, today.month)
+
+
+def find_month(storage, year, month, archived=None):
+    """Key of a month's book; the live one unless ``archived`` asks otherwise"""
+    key = storage.find_book(year, month, archived)
+    if key is None:
+        which = "archived " if archived else ""
+        raise CommandError(f"No existing {which}data found for {month_name(year, month)}.")
+    return key
+
+
+def open_month(storage, year, month, create=False, archived=None):
+    """
+    The book of a month.  The current month is started when it does not
+    exist yet and ``create`` is set; any other month has to exist.
+    """
+    if create and is_current_month(year, month):
+        return MonthBook.open(storage, year, month)
+    key = find_month(storage, year, month, archived)
+    return MonthBook(storage, key, storage.load(key))
+
+
+def selected_month(args):
+    if args.month is not None:
+        return args.month
+    today = datetime.now()
+    return today.year, today.month
+
+
+def selected_book(args, storage):
+    """The book picked by ``--month`` and ``--archived``"""
+    return open_month(storage, *selected_month(args), archived=args.archived or None)
+
+
+def print_json(value):
+    json.dump(value, sys.stdout, indent=2, ensure_ascii=False)
+    print()
+
+
+# Commands; each takes the parsed arguments and the open storage
+
+def cmd_add(args, storage):
+    date = args.date or datetime.now()
+    book = open_month(storage, date.year, date.month, create=True)
+    expense = new_expense({
+        'category': args.category,
+        'description': args.description,
+        'amount': args.amount,
+        'paid_by': args.paid_by,
+        'shared_between': args.shared_between,
+        'date': date
+    }, book.roommates)
+    book.add(expense)
+    print(f"Expense added to {date.strftime('%B %Y')}: ₨ {expense['amount']:,.2f}")
+
+
+def cmd_import(args, storage):
+    records = read_records(args.file)
+    by_month = defaultdict(list)
+    for line, record in enumerate(records, 1):
+        try:
+            date = parse_date(str(record.get('date') or '').strip())
+        except argparse.ArgumentTypeError as e:
+            raise CommandError(f"{args.file}: record {line}: {e}")
+        by_month[date.year, date.month].append((line, dict(record, date=date)))
+
+    # Every record is checked and every month found before anything is
+    # written; a current month that does not exist yet is only started
+    # in memory until then
+    batches = []
+    for year, month in sorted(by_month):
+        started = False
+        if is_current_month(year, month):
+            key = storage.current_book(year, month)
+            data = storage.load(key)
+            started = data is None
+            book = MonthBook(storage, key, data or new_month_data(DEFAULT_ROOMMATES))
+        else:
+            book = open_month(storage, year, month)
+        expenses = []
+        for line, record in by_month[year, month]:
+            try:
+                expenses.append(new_expense(record, book.roommates))
+            except CommandError as e:
+                raise CommandError(f"{args.file}: record {line}: {e}")
+        batches.append((year, month, book, expenses, started))
+
+    for year, month, book, expenses, started in batches:
+        if started:
+            try:
+                book.save()
+            except BookChangedError:
+                # The app started the month in the meantime; appending
+                # to it is still safe
+                pass
+        book.add_many(expenses)
+        print(f"Imported {len(expenses)} expenses into {month_name(year, month)}")
+
+
+def cmd_balances(args, storage):
+    book = selected_book(args, storage)
+    balances = book.update_balances()
+    if args.json:
+        print_json(balances)
+        return
+    for person, balance in balances.items():
+        if balance > 0:
+            print(f"{person}: to receive ₨ {balance:,.2f}")
+        elif balance < 0:
+            print(f"{person}: to pay ₨ {abs(balance):,.2f}")
+        else:
+            print(f"{person}: settled")
+
+
+def cmd_settle_plan(args, storage):
+    book = selected_book(args, storage)
+    book.update_balances()
+    plan = book.settlement_plan()
+    if args.json:
+        print_json(plan)
+        return
+    if not plan:
+        print("All balances are settled!")
+    for transfer in plan:
+        print(f"{transfer['from']} pays {transfer['to']}: ₨ {transfer['amount']:,.2f}")
+
+
+def cmd_summary(args, storage):
+    book = open_month(storage, *args.month, archived=args.archived or None)
+    print(book.summary_text(), end='')
+
+
+def cmd_export_pdf(args, storage):
+    from .engine.archive_loader import ArchiveLoader
+    from .reports import month_pdf_name, write_month_pdf
+
+    if args.all:
+        books = storage.list_books()
+    else:
+        year, month = args.month
+        books = [(year, month, find_month(storage, year, month, args.archived or None))]
+    archived_months = {(year, month) for year, month, key in storage.list_books()
+                       if storage.is_archive(key)}
+    output_dir = Path(args.output_dir) if args.output_dir else args.data_dir
+    output_dir.mkdir(parents=True, exist_ok=True)
+    # Months are read ahead on the loader's pool while the PDFs are drawn
+    loader = ArchiveLoader(storage)
+    try:
+        for year, month, key, archive_data in loader.iter_months(books):
+            date = datetime(year, month, 1)
+            live = not storage.is_archive(key) and (year, month) in archived_months
+            pdf_path = output_dir / month_pdf_name(date, live)
+            write_month_pdf(archive_data, date, pdf_path)
+            print(pdf_path)
+    finally:
+        loader.close()
+
+
+def cmd_archive(args, storage):
+    today = datetime.now()
+    book = MonthBook.open(storage, today.year, today.month)
+    book.update_balances(verify=True)
+    archived = book.start_new_month(DEFAULT_CATEGORIES, today)
+    summary = archived['month_summary']
+    print(f"Archived {today.strftime('%B %Y')}: {summary['expense_count']} expenses, "
+          f"₨ {summary['total_expenses']:,.2f}")
+    if args.pdf:
+        from .reports import month_pdf_name, write_month_pdf
+        pdf_path = args.data_dir / month_pdf_name(today)
+        write_month_pdf(archived, today, pdf_path)
+        print(pdf_path)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="monthly-kharcha",
+                                     description="Expense tracking and roommate settlements")
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR,
+                        help=f"data directory to work on (default: {DEFAULT_DATA_DIR})")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print how long each startup phase took once the window is up")
+    commands = parser.add_subparsers(dest="command", metavar="command",
+                                     help="run without a command to open the app")
+
+    add = commands.add_parser("add", help="add one expense")
+    add.add_argument("--category", required=True)
+    add.add_argument("--description", required=True)
+    add.add_argument("--amount", required=True)
+    add.add_argument("--paid-by", required=True)
+    add.add_argument("--shared-between",
+                     help="comma-separated names (default: every roommate)")
+    add.add_argument("--date", type=parse_date, help="YYYY-MM-DD (default: now)")
+    add.set_defaults(run=cmd_add)
+
+    import_ = commands.add_parser(
+        "import", help="add expenses from a CSV or JSON file",
+        description="Add expenses from a CSV file with the columns "
+                    f"{', '.join(IMPORT_FIELDS)} or a JSON list of expenses.  Each "
+                    "month is written once, and nothing is written unless every "
+                    "record is valid and every month exists.")
+    import_.add_argument("file")
+    import_.set_defaults(run=cmd_import)
+
+    for name, run, help_text in (("balances", cmd_balances, "show who owes whom"),
+                                 ("settle-plan", cmd_settle_plan,
+                                  "show the transfers that settle a month")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--month", type=parse_month,
+                             help="YYYY-MM (default: the current month)")
+        command.add_argument("--archived", action="store_true",
+                             help="use the month's archived book instead of its live one")
+        command.add_argument("--json", action="store_true", help="print JSON")
+        command.set_defaults(run=run)
+
+    summary = commands.add_parser("summary", help="print a month's summary")
+    summary.add_argument("--month", type=parse_month, required=True, help="YYYY-MM")
+    summary.add_argument("--archived", action="store_true",
+                         help="use the month's archived book instead of its live one")
+    summary.set_defaults(run=cmd_summary)
+
+    export = commands.add_parser("export-pdf", help="write PDF reports of stored months")
+    which = export.add_mutually_exclusive_group(required=True)
+    which.add_argument("--all", action="store_true", help="every stored month")
+    which.add_argument("--month", type=parse_month, help="YYYY-MM")
+    export.add_argument("--archived", action="store_true",
+                        help="with --month, use the month's archived book")
+    export.add_argument("--output-dir", help="where to write (default: the data directory)")
+    export.set_defaults(run=cmd_export_pdf)
+
+    archive = commands.add_parser("archive",
+                                  help="archive the current month and start a new one")
+    archive.add_argument("--pdf", action="store_true",
+                         help="also write the archived month's PDF report")
+    archive.set_defaults(run=cmd_archive)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        from .main import run_app
+        run_app(args.data_dir, args.profile_startup)
+        return 0
+
+    args.data_dir = args.data_dir.expanduser()
+    args.data_dir.mkdir(parents=True, exist_ok=True)
+    storage = open_storage(args.data_dir)
+    try:
+        args.run(args, storage)
+    except (CommandError, OSError, json.JSONDecodeError, sqlite3.Error) as e:
+        print(f"{parser.prog} {args.command}: {e}", file=sys.stderr)
+        return 1
+    finally:
+        # Journals are left for the app to compact; rewriting a month
+        # file on every run would undo the single-append writes
+        storage.close(compact=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,25 @@
+"""
+Headless ledger engine for Monthly Kharcha.
+
+Everything that does not need a window lives here: the expense model and
+money helpers, the incremental ledger and its aggregates, settlement
+planning, forecasting, insights and both storage backends.  Importing it
+loads neither Tk nor matplotlib; NumPy is only imported by the code
+paths that use it.
+"""
+
+from .book import (DEFAULT_CATEGORIES, DEFAULT_ROOMMATES, MonthBook, archive_data,
+                   new_month_data, summary_text)
+from .ledger import Ledger
+from .model import DATE_FORMAT, Expense, ExpenseIndex, new_expense_id
+from .money import to_paisa, to_rupees
+from .settlement import settle, settlement_plan
+from .storage import BookChangedError, JSONStorage, open_storage
+from .sqlite_storage import MigrationError, SQLiteStorage, migrate_json_to_sqlite
+
+__all__ = [
+    'BookChangedError', 'DATE_FORMAT', 'DEFAULT_CATEGORIES', 'DEFAULT_ROOMMATES', 'Expense',
+    'ExpenseIndex', 'JSONStorage', 'Ledger', 'MigrationError', 'MonthBook', 'SQLiteStorage',
+    'archive_data', 'migrate_json_to_sqlite', 'new_expense_id', 'new_month_data',
+    'open_storage', 'settle', 'settlement_plan', 'summary_text', 'to_paisa', 'to_rupees',
+]
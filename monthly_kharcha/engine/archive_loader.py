@@ -0,0 +1,134 @@
+"""
+Shared loading of stored months for Monthly Kharcha.
+
+The archive window, PDF exports and the forecaster read months through
+one ``ArchiveLoader``.  Months are read and parsed on a small
+thread pool, and parsed months are kept in an LRU cache keyed by the
+storage's book version (the path, mtime and size of the month files for
+the JSON backend), so a month is only parsed again after it changed.
+
+Months handed out by the loader are shared with the cache and must be
+treated as read-only; code that edits a month loads it from the storage.
+Their expenses are held in an ``ExpenseTable``, which iterates like the
+list of expense dicts but keeps many cached months small.
+"""
+
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .expense_table import ExpenseTable
+
+
+class ArchiveLoader:
+    """Reads stored months concurrently and caches the parsed results"""
+
+    MAX_WORKERS = 4
+    CACHE_SIZE = 24
+
+    def __init__(self, storage, max_workers=MAX_WORKERS, cache_size=CACHE_SIZE):
+        self.storage = storage
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='archive-loader')
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = set()       # futures not done yet, cancelled on close
+
+    def _submit(self, fn, *args):
+        future = self._executor.submit(fn, *args)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def _cached(self, version):
+        with self._lock:
+            archive_data = self._cache.get(version)
+            if archive_data is not None:
+                self._cache.move_to_end(version)
+            return archive_data
+
+    def _read(self, key):
+        """Read one month, through the cache (runs on the pool)"""
+        version = self.storage.book_version(key)
+        archive_data = self._cached(version)
+        if archive_data is None:
+            archive_data = self.storage.read_archive(key)
+            if archive_data is not None:
+                month_data = archive_data['month_data']
+                month_data['expenses'] = ExpenseTable.from_expenses(
+                    month_data['expenses'], month_data.get('roommates', ()))
+                with self._lock:
+                    self._cache[version] = archive_data
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+        return archive_data
+
+    def load(self, key):
+        """Return a month as ``{'month_data': ..., 'month_summary': ...}``, or None"""
+        return self._read(key)
+
+    def iter_months(self, books=None):
+        """
+        Yield ``(year, month, key, archive_data)`` for ``(year, month, key)``
+        books, every stored month newest first by default, in the order
+        given.  A few months are read ahead on the pool; months that cannot
+        be read are reported and skipped.
+        """
+        if books is None:
+            books = self.storage.list_books()
+        books = iter(books)
+        in_flight = deque()
+        read_ahead = 2 * self.max_workers
+        while True:
+            for year, month, key in books:
+                in_flight.append((year, month, key, self._submit(self._read, key)))
+                if len(in_flight) >= read_ahead:
+                    break
+            if not in_flight:
+                return
+            year, month, key, future = in_flight.popleft()
+            try:
+                archive_data = future.result()
+            except (OSError, ValueError) as e:
+                print(f"Error loading {year}-{month:02d}: {str(e)}")
+                continue
+            if archive_data is not None:
+                yield year, month, key, archive_data
+
+    def month_summaries(self):
+        """
+        Totals of every stored book, as ``storage.month_summaries`` gives
+        them: the ones the storage has cached right away, the rest read on
+        the pool.  Books that cannot be read are reported and skipped.
+        """
+        summaries, pending = self.storage.cached_month_summaries()
+        for year, month, key, future in self.submit_summaries(pending):
+            try:
+                summaries.append(future.result())
+            except (OSError, ValueError) as e:
+                print(f"Error loading {year}-{month:02d}: {str(e)}")
+        return summaries
+
+    def submit_summaries(self, books):
+        """
+        Start reading the totals of ``(year, month, key)`` books on the pool;
+        returns ``(year, month, key, future)`` for each book.
+        """
+        return [(year, month, key,
+                 self._submit(self.storage.read_month_summary, year, month, key))
+                for year, month, key in books]
+
+    def close(self):
+        # shutdown(cancel_futures=True) needs Python 3.9
+        with self._lock:
+            pending = list(self._pending)
+        for future in pending:
+            future.cancel()
+        self._executor.shutdown(wait=False)
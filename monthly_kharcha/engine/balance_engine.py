@@ -0,0 +1,173 @@
+"""
+Vectorized balance engine for Monthly Kharcha.
+
+A list of expenses is turned into columns: the amount in paisa, the
+payer's index and the category's index of every expense, plus the
+sharing matrix, an expense x person matrix holding each person's share of
+each expense in paisa.  Most people share only some expenses, so the
+matrix is kept sparse as coordinate arrays, and the totals are
+matrix-vector products computed with ``numpy.bincount``:
+
+    payments = P^T a    (P: expense x person payer indicator, a: amounts)
+    shares   = S^T 1    (S: the sharing matrix)
+    balances = payments - shares
+
+Shares use the same largest-remainder split as ``money.split``, so the
+results match the incremental ``Ledger`` to the paisa.  NumPy is only
+imported for lists of at least ``VECTORIZE_FROM`` expenses; shorter ones
+are summed in Python, which is faster than building the arrays.  An
+``ExpenseTable`` already holds the columns, so its arrays are used as
+they are.
+"""
+
+from collections import defaultdict
+from itertools import chain
+
+from .expense_table import ExpenseTable
+from .model import expense_paisa
+from .money import split
+
+VECTORIZE_FROM = 2000
+
+
+class Totals:
+    """Payments, shares and category totals in paisa, with their counts"""
+
+    def __init__(self):
+        self.payments = defaultdict(int)
+        self.payment_counts = defaultdict(int)
+        self.shares = defaultdict(int)
+        self.category_totals = defaultdict(int)
+        self.category_counts = defaultdict(int)
+        self.total = 0
+        self.count = 0
+
+    def balances(self, roommates=()):
+        """Balance in paisa of every roommate and everyone else involved"""
+        balances = {name: 0 for name in roommates}
+        for name in set(self.payments) | set(self.shares):
+            balances[name] = self.payments.get(name, 0) - self.shares.get(name, 0)
+        return balances
+
+
+def totals(expenses):
+    """Sum a list of expenses, vectorized when it is long"""
+    if len(expenses) < VECTORIZE_FROM:
+        return _python_totals(expenses)
+    if isinstance(expenses, ExpenseTable):
+        return SharingMatrix.from_table(expenses).totals()
+    return SharingMatrix(expenses).totals()
+
+
+def _python_totals(expenses):
+    result = Totals()
+    for expense in expenses:
+        amount = expense_paisa(expense)
+        paid_by = expense['paid_by']
+        sharing_people = expense['shared_between']
+        result.payments[paid_by] += amount
+        result.payment_counts[paid_by] += 1
+        for person, share in zip(sharing_people, split(amount, len(sharing_people))):
+            result.shares[person] += share
+        result.category_totals[expense['category']] += amount
+        result.category_counts[expense['category']] += 1
+        result.total += amount
+    result.count = len(expenses)
+    return result
+
+
+class SharingMatrix:
+    """Column arrays and the sparse sharing matrix of a list of expenses"""
+
+    def __init__(self, expenses):
+        import numpy as np
+
+        self.np = np
+        people = {}
+        categories = {}
+        count = len(expenses)
+        self.amounts = np.fromiter((expense_paisa(expense) for expense in expenses),
+                                   np.int64, count)
+        self.payers = np.fromiter(
+            (people.setdefault(expense['paid_by'], len(people)) for expense in expenses),
+            np.int64, count)
+        self.categories = np.fromiter(
+            (categories.setdefault(expense['category'], len(categories))
+             for expense in expenses),
+            np.int64, count)
+        sizes = np.fromiter((len(expense['shared_between']) for expense in expenses),
+                            np.int64, count)
+
+        # Coordinates of the non-zero entries of the sharing matrix
+        columns = np.fromiter(
+            (people.setdefault(person, len(people))
+             for expense in expenses for person in expense['shared_between']),
+            np.int64, int(sizes.sum()))
+        self._share(np.repeat(np.arange(count), sizes), columns, sizes)
+
+        self.people = list(people)
+        self.category_names = list(categories)
+
+    @classmethod
+    def from_table(cls, table):
+        """Build the matrix straight from an ``ExpenseTable``'s columns"""
+        import numpy as np
+
+        matrix = cls.__new__(cls)
+        matrix.np = np
+        matrix.amounts = np.frombuffer(table.paisa, dtype=np.int64)
+        matrix.payers = np.frombuffer(table.payer, dtype=np.uint16).astype(np.int64)
+        matrix.categories = np.frombuffer(table.category, dtype=np.uint16).astype(np.int64)
+        # Each row's people are its sharing group's, in the group's order
+        groups = table.groups
+        group_sizes = np.fromiter(map(len, groups), np.int64, len(groups))
+        group_people = np.fromiter(chain.from_iterable(groups), np.int64,
+                                   int(group_sizes.sum()))
+        group_starts = np.cumsum(group_sizes) - group_sizes
+        shared = np.frombuffer(table.shared, dtype=np.uint32).astype(np.int64)
+        sizes = group_sizes[shared]
+        rows = np.repeat(np.arange(len(shared)), sizes)
+        position = np.arange(int(sizes.sum())) - (np.cumsum(sizes) - sizes)[rows]
+        matrix._share(rows, group_people[group_starts[shared][rows] + position], sizes)
+        matrix.people = list(table.people)
+        matrix.category_names = list(table.categories)
+        return matrix
+
+    def _share(self, rows, columns, sizes):
+        """Fill in the sharing matrix from its coordinates and row sizes"""
+        np = self.np
+        self.rows, self.columns = rows, columns
+        starts = np.cumsum(sizes) - sizes
+        position = np.arange(len(columns)) - starts[rows]
+        magnitude = np.abs(self.amounts)
+        base, extra = magnitude // sizes, magnitude % sizes
+        self.values = (base[rows] + (position < extra[rows])) * np.sign(self.amounts)[rows]
+
+    def _sum(self, indexes, weights, length):
+        # Weighted bincount sums in float64, exact for integers below 2**53
+        sums = self.np.bincount(indexes, weights=weights, minlength=length)
+        return self.np.rint(sums).astype(self.np.int64)
+
+    def totals(self):
+        np = self.np
+        people, categories = len(self.people), len(self.category_names)
+        payments = self._sum(self.payers, self.amounts, people)
+        shares = self._sum(self.columns, self.values, people)
+        payment_counts = np.bincount(self.payers, minlength=people)
+        share_counts = np.bincount(self.columns, minlength=people)
+        category_totals = self._sum(self.categories, self.amounts, categories)
+        category_counts = np.bincount(self.categories, minlength=categories)
+
+        result = Totals()
+        for i, name in enumerate(self.people):
+            if payment_counts[i]:
+                result.payments[name] = int(payments[i])
+                result.payment_counts[name] = int(payment_counts[i])
+            if share_counts[i]:
+                result.shares[name] = int(shares[i])
+        for i, name in enumerate(self.category_names):
+            result.category_totals[name] = int(category_totals[i])
+            result.category_counts[name] = int(category_counts[i])
+        result.total = int(self.amounts.sum())
+        result.count = len(self.amounts)
+        return result
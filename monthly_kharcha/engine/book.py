@@ -0,0 +1,228 @@
+"""
+The live month of a household.
+
+A ``MonthBook`` holds one stored month together with its expense index,
+running ledger and insights, and applies every change to all of them and
+to storage in one call.  Nothing here touches Tk, so the app, scripts and
+the command line drive a month the same way.
+"""
+
+import json
+from datetime import datetime
+
+from .insights import Insights
+from .ledger import Ledger
+from .model import DATE_FORMAT, ExpenseIndex
+from .settlement import settlement_plan
+from .storage import BookChangedError
+
+DEFAULT_ROOMMATES = ("Danish", "Umair", "Nisar", "Shahzaib")
+DEFAULT_CATEGORIES = ("Food", "Rent", "Electricity", "Internet",
+                      "Gas", "Groceries", "Room Supplies", "Other")
+
+
+def new_month_data(roommates):
+    return {
+        'roommates': list(roommates),
+        'expenses': [],
+        'shared_expenses': {
+            'rent': 0,
+            'electricity': 0,
+            'internet': 0,
+            'gas': 0
+        },
+        'food_sharing': ["Danish", "Umair", "Nisar"],
+        'balances': {name: 0 for name in roommates}
+    }
+
+
+def summary_text(ledger):
+    """The month's summary: total, each roommate's payments and shares, categories"""
+    total_expenses = ledger.total
+    summary = "Monthly Summary\n" + "=" * 30 + "\n\n"
+    summary += f"Total Monthly Expenses: ₨ {total_expenses:,.2f}\n\n"
+
+    summary += "Payment Breakdown\n" + "-" * 30 + "\n"
+    payments, shares = ledger.payments, ledger.shares
+    for person in ledger.roommates:
+        balance = ledger.balance(person)
+        summary += f"\n{person}:\n"
+        summary += f"  Total Paid: ₨ {payments.get(person, 0):,.2f}\n"
+        summary += f"  Fair Share: ₨ {shares.get(person, 0):,.2f}\n"
+        if balance > 0:
+            summary += f"  To Receive: ₨ {balance:,.2f}\n"
+        else:
+            summary += f"  To Pay: ₨ {abs(balance):,.2f}\n"
+
+    summary += "\nCategory Breakdown\n" + "-" * 30 + "\n"
+    for category, amount in ledger.category_totals.items():
+        if amount > 0:
+            percentage = (amount / total_expenses) * 100
+            summary += f"{category}: ₨ {amount:,.2f} ({percentage:.1f}%)\n"
+    return summary
+
+
+def archive_data(data, ledger, categories=DEFAULT_CATEGORIES, archive_date=None):
+    """A month's data with the summary stored alongside it when it is archived"""
+    category_totals = {category: 0 for category in categories}
+    category_totals.update(
+        (category, total) for category, total in ledger.category_totals.items()
+        if ledger.category_counts[category])
+    return {
+        'month_data': data,
+        'month_summary': {
+            'total_expenses': ledger.total,
+            'category_totals': category_totals,
+            'final_balances': data['balances'],
+            'expense_count': len(data['expenses']),
+            'archive_date': (archive_date or datetime.now()).strftime(DATE_FORMAT)
+        }
+    }
+
+
+class MonthBook:
+    """
+    One stored month with its index, ledger and insights kept in step.
+
+    Single changes are written as they happen, so they mix safely with
+    another process writing the same month.  Whole-month writes (``save``
+    and ``start_new_month``) would overwrite that process's changes, so
+    they raise ``BookChangedError`` unless the book was reloaded since.
+    """
+
+    def __init__(self, storage, key, data):
+        self.storage = storage
+        self.key = key
+        self._attach(data)
+
+    def _attach(self, data):
+        self.data = data
+        self.roommates = data.setdefault('roommates', list(DEFAULT_ROOMMATES))
+        self.index = ExpenseIndex(data['expenses'])
+        self.ledger = Ledger(self.roommates)
+        self.ledger.rebuild(data['expenses'])
+        self.insights = Insights(self.ledger)
+
+    @classmethod
+    def open(cls, storage, year, month, roommates=DEFAULT_ROOMMATES):
+        """The live book of a month, started empty when there is none yet"""
+        key = storage.current_book(year, month)
+        try:
+            data = storage.load(key)
+        except json.JSONDecodeError:
+            data = None
+        if data is None:
+            data = new_month_data(roommates)
+            try:
+                storage.save(key, data)
+            except BookChangedError:
+                # Another process started the month first
+                data = storage.load(key)
+        return cls(storage, key, data)
+
+    def reload(self):
+        """
+        Read the month again if another process wrote it since it was
+        loaded.  Returns whether it did.
+        """
+        if not self.storage.is_stale(self.key):
+            return False
+        data = self.storage.load(self.key)
+        self._attach(data if data is not None else new_month_data(self.roommates))
+        return True
+
+    @property
+    def expenses(self):
+        return self.data['expenses']
+
+    def save(self):
+        """Write the whole month to storage"""
+        self.storage.save(self.key, self.data)
+
+    # Changes; each is applied to the index, the ledger and storage
+
+    def add(self, expense):
+        self.index.add(expense)
+        self.ledger.add(expense)
+        self.storage.add_expense(self.key, expense)
+
+    def add_many(self, expenses):
+        """Add a batch of expenses with a single storage write"""
+        for expense in expenses:
+            self.index.add(expense)
+            self.ledger.add(expense)
+        self.storage.add_expenses(self.key, expenses)
+
+    def record_settlement(self, expense):
+        self.index.add(expense)
+        self.ledger.add(expense)
+        self.storage.record_settlement(self.key, expense)
+
+    def replace(self, expense_id, expense):
+        """Swap in a new version of an expense and return the old one"""
+        old_expense = self.index.replace(expense_id, expense)
+        self.ledger.replace(old_expense, expense)
+        self.storage.edit_expense(self.key, expense_id, expense)
+        return old_expense
+
+    def remove(self, expense_id):
+        """Delete an expense and return it"""
+        expense = self.index.remove(expense_id)
+        self.ledger.remove(expense)
+        self.storage.delete_expense(self.key, expense_id)
+        return expense
+
+    def add_roommate(self, name):
+        if name in self.roommates:
+            return False
+        self.roommates.append(name)
+        self.data['balances'][name] = 0
+        self.ledger.add_roommate(name)
+        self.storage.set_roommates(self.key, self.roommates)
+        return True
+
+    def remove_roommate(self, name):
+        self.roommates.remove(name)
+        self.ledger.remove_roommate(name)
+        self.storage.set_roommates(self.key, self.roommates)
+
+    def start_new_month(self, categories=DEFAULT_CATEGORIES, archive_date=None):
+        """
+        Archive the month under the current date's month and start it over
+        empty with the same roommates.  Returns the archived data.
+        """
+        if self.storage.is_stale(self.key):
+            raise BookChangedError("the month was changed by another program")
+        archive_date = archive_date or datetime.now()
+        archived = archive_data(self.data, self.ledger, categories, archive_date)
+        self.storage.archive(archive_date.year, archive_date.month, archived)
+        self.data = new_month_data(self.roommates)
+        self.roommates = self.data['roommates']
+        self.index = ExpenseIndex(self.data['expenses'])
+        self.ledger.rebuild([], self.roommates)
+        self.save()
+        return archived
+
+    # Derived views
+
+    def update_balances(self, verify=False):
+        """Store the ledger's balances in the month data and return them"""
+        if verify:
+            self.ledger.verify(self.expenses)
+        self.data['balances'] = self.ledger.balances
+        return self.data['balances']
+
+    def settlement_plan(self):
+        return settlement_plan(self.data['balances'])
+
+    def summary_text(self):
+        return summary_text(self.ledger)
+
+    def spending_patterns(self, categories=DEFAULT_CATEGORIES):
+        """Per-category spending patterns of the listed categories"""
+        stats = self.ledger.patterns.current(self.expenses)
+        return {category: stats[category].pattern() for category in categories
+                if category in stats}
+
+    def insight_lines(self):
+        return self.insights.lines(self.expenses)
@@ -0,0 +1,213 @@
+"""
+Columnar expense storage for Monthly Kharcha.
+
+An ``ExpenseTable`` keeps a list of expenses as parallel typed arrays
+instead of one dict per expense: the timestamp and paisa amount as 64-bit
+integers, the category and payer as indexes into interned name lists and
+``shared_between`` as an index into the table's sharing groups.  Only the
+IDs and (interned) descriptions stay Python strings.  A month held this
+way takes a fraction of the memory of its dicts, which matters when many
+archived months are loaded at once.
+
+A sharing group is a tuple of interned people in the order the expense
+lists them, duplicates included.  ``money.split`` hands the leftover
+paisa out by position, so the order is part of an expense's shares; most
+expenses of a month share one of a handful of groups.
+
+Iterating a table yields ``ExpenseRow`` views that read like the expense
+dicts the GUI code expects.
+"""
+
+import sys
+from array import array
+from collections.abc import Mapping
+
+from .model import (DATE_FORMAT, SECONDS_PER_DAY, Expense, expense_paisa, parse_timestamp,
+                    timestamp_datetime)
+from .money import to_rupees
+
+
+class ExpenseRow(Mapping):
+    """
+    Read-only dict view of one row of an ``ExpenseTable``.
+
+    A view points at a row position, so it is only valid until the table
+    is next changed.
+    """
+
+    __slots__ = ('table', 'row')
+
+    KEYS = ('id', 'category', 'description', 'amount', 'paid_by', 'shared_between', 'date')
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    def __getitem__(self, key):
+        table, row = self.table, self.row
+        if key == 'id':
+            return table.ids[row]
+        if key == 'category':
+            return table.categories[table.category[row]]
+        if key == 'description':
+            return table.descriptions[row]
+        if key == 'amount':
+            return to_rupees(table.paisa[row])
+        if key == 'paid_by':
+            return table.people[table.payer[row]]
+        if key == 'shared_between':
+            return table.members(table.shared[row])
+        if key == 'date':
+            date = table.dates.get(row)
+            if date is None:
+                date = timestamp_datetime(table.ts[row]).strftime(DATE_FORMAT)
+            return date
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def __repr__(self):
+        return f"ExpenseRow({dict(self)!r})"
+
+    @property
+    def ts(self):
+        return self.table.ts[self.row]
+
+    @property
+    def paisa(self):
+        return self.table.paisa[self.row]
+
+    @property
+    def day(self):
+        return self.ts // SECONDS_PER_DAY
+
+    def copy(self):
+        """A standalone ``Expense`` with the same contents"""
+        return Expense(self)
+
+
+class ExpenseTable:
+    """Expenses as parallel typed columns with interned names"""
+
+    def __init__(self, people=()):
+        self.ids = []
+        self.descriptions = []
+        self.ts = array('q')
+        self.paisa = array('q')
+        self.category = array('H')
+        self.payer = array('H')
+        self.shared = array('I')
+        self.dates = {}         # row -> stored date text that DATE_FORMAT would not reproduce
+        self.people = []
+        self.categories = []
+        self.groups = []        # sharing groups, tuples of person indexes
+        self._person_index = {}
+        self._category_index = {}
+        self._group_index = {}
+        self._rows = {}         # expense ID -> row
+        for name in people:
+            self._person(name)
+
+    @classmethod
+    def from_expenses(cls, expenses, people=()):
+        table = cls(people)
+        for expense in expenses:
+            table.append(expense)
+        return table
+
+    def _person(self, name):
+        index = self._person_index.get(name)
+        if index is None:
+            index = self._person_index[name] = len(self.people)
+            self.people.append(name)
+        return index
+
+    def _category(self, name):
+        index = self._category_index.get(name)
+        if index is None:
+            index = self._category_index[name] = len(self.categories)
+            self.categories.append(name)
+        return index
+
+    def _group(self, names):
+        group = tuple(self._person(name) for name in names)
+        index = self._group_index.get(group)
+        if index is None:
+            index = self._group_index[group] = len(self.groups)
+            self.groups.append(group)
+        return index
+
+    def members(self, group):
+        """Names of the people in a sharing group, in their stored order"""
+        people = self.people
+        return [people[i] for i in self.groups[group]]
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return (ExpenseRow(self, row) for row in range(len(self.ids)))
+
+    def __contains__(self, expense_id):
+        return expense_id in self._rows
+
+    def get(self, expense_id):
+        row = self._rows.get(expense_id)
+        return None if row is None else ExpenseRow(self, row)
+
+    def _set(self, row, expense):
+        ts = getattr(expense, 'ts', None)
+        if ts is None:
+            ts = parse_timestamp(expense['date'])
+        self.ids[row] = expense['id']
+        self.descriptions[row] = sys.intern(expense['description'])
+        self.ts[row] = ts
+        self.paisa[row] = expense_paisa(expense)
+        self.category[row] = self._category(expense['category'])
+        self.payer[row] = self._person(expense['paid_by'])
+        self.shared[row] = self._group(expense['shared_between'])
+        if timestamp_datetime(ts).strftime(DATE_FORMAT) != expense['date']:
+            self.dates[row] = expense['date']
+        else:
+            self.dates.pop(row, None)
+
+    def append(self, expense):
+        row = len(self.ids)
+        self.ids.append(None)
+        self.descriptions.append(None)
+        for column in (self.ts, self.paisa, self.category, self.payer, self.shared):
+            column.append(0)
+        self._set(row, expense)
+        self._rows[expense['id']] = row
+
+    def replace(self, expense_id, expense):
+        row = self._rows.pop(expense_id)
+        self._set(row, expense)
+        self._rows[expense['id']] = row
+
+    def remove(self, expense_id):
+        """Remove an expense; the last row moves into its place"""
+        row = self._rows.pop(expense_id)
+        last = len(self.ids) - 1
+        columns = (self.ids, self.descriptions, self.ts, self.paisa,
+                   self.category, self.payer, self.shared)
+        if row != last:
+            for column in columns:
+                column[row] = column[last]
+            self._rows[self.ids[row]] = row
+            if last in self.dates:
+                self.dates[row] = self.dates.pop(last)
+            else:
+                self.dates.pop(row, None)
+        else:
+            self.dates.pop(row, None)
+        for column in columns:
+            del column[last]
+
+    def to_expenses(self):
+        """The rows as a list of standalone ``Expense`` dicts"""
+        return [row.copy() for row in self]
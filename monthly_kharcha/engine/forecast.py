@@ -0,0 +1,146 @@
+"""
+Expense forecasting for Monthly Kharcha.
+
+Next month's spending is forecast per category from the category totals of
+every stored month, read through the shared ``ArchiveLoader``, with a
+linear model fitted by closed-form weighted least squares:
+
+    total(t) = a + b t + s[month of year]
+
+The trend is only fitted from ``TREND_FROM`` months of history and the
+month-of-year terms once the history spans ``SEASONAL_FROM`` months; with
+less data they cannot be told apart from noise.  The month in progress
+counts as one more month: its spending so far is projected to the whole
+month at the current daily rate and weighted by the fraction of the month
+that has passed.
+
+A least-squares forecast is a fixed linear combination of the observed
+totals, so fitting produces one coefficient per month, shared by every
+category.  The stored months' part of each forecast is cached until their
+book versions change.  New spending in the current month moves a
+category's forecast by a single gain times the change, so updates and
+predictions are plain float arithmetic.
+"""
+
+import calendar
+from collections import defaultdict
+
+from .money import to_paisa, to_rupees
+
+# History needed, in months, before fitting a trend and month-of-year terms
+TREND_FROM = 3
+SEASONAL_FROM = 24
+
+
+def _month_index(year, month):
+    return year * 12 + month - 1
+
+
+class Forecaster:
+    """Per-category forecasts of next month's spending, updated incrementally"""
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.storage = loader.storage
+        self._versions = None       # book versions of the stored months in _history
+        self._history = {}          # month index -> {category: paisa}
+        self._fitted = None         # (year, month, day) the coefficients are for
+        self._gain = 0.0            # forecast change per paisa spent this month
+        self._observed = {}         # category -> paisa spent this month, as last seen
+        self._forecast = defaultdict(float)     # category -> forecast in paisa
+
+    def _load_history(self, year, month):
+        """Read the totals of the months before this one; False when unchanged"""
+        current = _month_index(year, month)
+        books = [(y, m, key) for y, m, key in self.storage.list_books()
+                 if _month_index(y, m) < current]
+        versions = tuple(self.storage.book_version(key) for _, _, key in books)
+        if versions == self._versions:
+            return False
+        months = {(y, m) for y, m, _ in books}
+        history = {}
+        for summary in self.loader.month_summaries():
+            if (summary['year'], summary['month']) not in months:
+                continue
+            totals = history.setdefault(_month_index(summary['year'], summary['month']),
+                                        defaultdict(int))
+            for category, amount in summary['category_totals'].items():
+                totals[category] += to_paisa(amount)
+        self._history = history
+        self._versions = versions
+        return True
+
+    def fit(self, year, month, day, spent):
+        """
+        Fit the stored months before ``year``/``month`` and the month in
+        progress, ``day`` days into it with ``{category: paisa}`` spent.
+        """
+        if self._load_history(year, month) or self._fitted != (year, month, day):
+            self._solve(year, month, day)
+        self.update(spent)
+
+    def invalidate(self):
+        """Check the stored months for changes on the next forecast"""
+        self._fitted = None
+
+    def forecast(self, year, month, day, spent):
+        """
+        Next month's total forecast in rupees, refitting only when the day
+        moved on or the stored months may have changed.
+        """
+        if self._fitted != (year, month, day):
+            self.fit(year, month, day, spent)
+        else:
+            self.update(spent)
+        return self.predict()
+
+    def _solve(self, year, month, day):
+        import numpy as np
+
+        current = _month_index(year, month)
+        days = calendar.monthrange(year, month)[1]
+        day = min(max(day, 1), days)
+        times = sorted(self._history) + [current]
+        weights = np.array([1.0] * len(self._history) + [day / days])
+
+        start = times[0]
+        seasonal = current - start + 1 >= SEASONAL_FROM
+        trend = len(times) >= TREND_FROM
+
+        def features(t):
+            row = [1.0]
+            if trend:
+                row.append(float(t - start))
+            if seasonal:
+                row.extend(1.0 if t % 12 == i else 0.0 for i in range(1, 12))
+            return row
+
+        design = np.array([features(t) for t in times])
+        weighted = design.T * weights
+        # forecast = x_next (X^T W X)^+ X^T W y: one coefficient per month
+        coefficients = np.array(features(current + 1)) @ np.linalg.pinv(weighted @ design) @ weighted
+
+        forecast = defaultdict(float)
+        for coefficient, t in zip(coefficients[:-1], times[:-1]):
+            for category, paisa in self._history[t].items():
+                forecast[category] += coefficient * paisa
+        self._forecast = forecast
+        # This month enters as spending projected over the whole month
+        self._gain = float(coefficients[-1]) * days / day
+        self._observed = {}
+        self._fitted = (year, month, day)
+
+    def update(self, spent):
+        """Apply the current month's latest ``{category: paisa}`` spending"""
+        for category in set(spent) | set(self._observed):
+            paisa = spent.get(category, 0)
+            change = paisa - self._observed.get(category, 0)
+            if change:
+                self._observed[category] = paisa
+                self._forecast[category] += self._gain * change
+
+    def predict(self, category=None):
+        """Forecast in rupees for one category, or the sum over all of them"""
+        if category is not None:
+            return to_rupees(max(self._forecast.get(category, 0.0), 0.0))
+        return to_rupees(sum(max(amount, 0.0) for amount in self._forecast.values()))
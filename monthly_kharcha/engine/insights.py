@@ -0,0 +1,101 @@
+"""
+Dashboard insights for Monthly Kharcha.
+
+Each insight provider turns the ledger's running totals and spending
+patterns into a few lines of text; none of them walks the expense list.
+The lines are memoized on the ledger's version, so refreshing the
+dashboard without a change reuses them as they are.
+"""
+
+from .money import to_rupees
+from .settlement import settlement_plan
+
+
+def _rupees(paisa):
+    return f"₨ {to_rupees(paisa):,.2f}"
+
+
+def spending_insights(ledger):
+    """Total spending and the categories it went to"""
+    lines = [f"Total spending this month: {_rupees(ledger.total_paisa)}"]
+    categories = sorted(
+        ((category, amount) for category, amount in ledger.category_paisa.items()
+         if ledger.category_counts[category]),
+        key=lambda item: item[1], reverse=True)
+    if categories:
+        top, amount = categories[0]
+        lines.append(f"Top spending category: {top} ({_rupees(amount)})")
+        if ledger.total_paisa:
+            for category, amount in categories[:3]:
+                percentage = amount / ledger.total_paisa * 100
+                lines.append(f"{category}: {_rupees(amount)} ({percentage:.1f}% of total)")
+    return lines
+
+
+def recent_insights(ledger):
+    latest = ledger.patterns.latest
+    if latest is None:
+        return []
+    return [f"Most recent expense: {latest['description']} (₨ {latest['amount']:,.2f})"]
+
+
+def people_insights(ledger):
+    """Who paid the most, by amount and by number of expenses"""
+    counts = {name: count for name, count in ledger.payment_counts.items() if count}
+    if not counts:
+        return []
+    highest = max(counts, key=lambda name: ledger.payments_paisa[name])
+    most_frequent = max(counts.items(), key=lambda item: item[1])
+    return [f"Highest contributor: {highest} ({_rupees(ledger.payments_paisa[highest])})",
+            f"Most frequent payer: {most_frequent[0]} ({most_frequent[1]} expenses)"]
+
+
+def settlement_insights(ledger):
+    """Money still owed and the largest transfer that would settle it"""
+    balances = ledger.balances
+    # Every debt shows up once as a credit and once as a debit
+    pending = sum(abs(ledger.balance_paisa(name)) for name in balances) // 2
+    if not pending:
+        return []
+    lines = [f"Total pending settlements: {_rupees(pending)}"]
+    plan = settlement_plan(balances)
+    if plan:
+        top = plan[0]
+        lines.append(f"Recommended settlement: {top['from']} should pay "
+                     f"₨ {top['amount']:,.2f} to {top['to']}")
+    return lines
+
+
+def daily_insights(ledger):
+    days = len(ledger.patterns.days)
+    if ledger.count < 2 or not days:
+        return []
+    return [f"Daily average spending: {_rupees(ledger.total_paisa / days)}"]
+
+
+PROVIDERS = (spending_insights, recent_insights, people_insights,
+             settlement_insights, daily_insights)
+
+
+class Insights:
+    """The dashboard's insight lines, recomputed only when the ledger changed"""
+
+    def __init__(self, ledger, providers=PROVIDERS):
+        self.ledger = ledger
+        self.providers = providers
+        self._version = None
+        self._lines = []
+
+    def lines(self, expenses):
+        """Insight lines for the month whose ``expenses`` the ledger holds"""
+        ledger = self.ledger
+        if ledger.version != self._version:
+            if not ledger.count:
+                lines = ["No expenses recorded yet this month"]
+            else:
+                # Bring the patterns' stale maxima and latest expense up to date
+                ledger.patterns.current(expenses)
+                lines = [line for provider in self.providers for line in provider(ledger)]
+            self._lines = lines
+            self._version = ledger.version
+        return self._lines
@@ -0,0 +1,159 @@
+"""
+Incremental balance ledger for Monthly Kharcha.
+
+The ledger keeps running totals for the current month and applies each
+added, edited or deleted expense as a delta touching only its payer and
+the people sharing it.  A full recompute is only done when the ledger is
+rebuilt from scratch or asked to verify itself, and goes through the
+vectorized ``balance_engine`` for long lists.  The per-category spending
+patterns ride along with the same deltas.
+
+Every change bumps ``version``, which only ever goes up, so views derived
+from the ledger can be memoized on it.
+"""
+
+from collections import defaultdict
+
+from . import balance_engine
+from .money import split, to_rupees
+from .patterns import SpendingPatterns
+
+
+def _rupees(paisa_totals):
+    return {key: to_rupees(value) for key, value in paisa_totals.items()}
+
+
+class Ledger:
+    """
+    Running payments, fair shares, balances and category totals.
+
+    Totals are kept in integer paisa (``*_paisa``) and each expense is split
+    with ``money.split``, so balances always sum to exactly zero.  The
+    rupee attributes are views of them for display.
+    """
+
+    def __init__(self, roommates=()):
+        self.roommates = list(roommates)
+        self.patterns = SpendingPatterns()
+        self.version = 0
+        self.reset()
+
+    def reset(self):
+        self.payments_paisa = defaultdict(int)
+        self.payment_counts = defaultdict(int)
+        self.shares_paisa = defaultdict(int)
+        self.category_paisa = defaultdict(int)
+        self.category_counts = defaultdict(int)
+        self.total_paisa = 0
+        self.count = 0
+        self.patterns.invalidate()
+        self.version += 1
+
+    def rebuild(self, expenses, roommates=None):
+        """Recompute every total from a full list of expenses"""
+        if roommates is not None:
+            self.roommates = list(roommates)
+        totals = balance_engine.totals(expenses)
+        self.payments_paisa = totals.payments
+        self.payment_counts = totals.payment_counts
+        self.shares_paisa = totals.shares
+        self.category_paisa = totals.category_totals
+        self.category_counts = totals.category_counts
+        self.total_paisa = totals.total
+        self.count = totals.count
+        self.patterns.invalidate()
+        self.version += 1
+
+    def _apply(self, expense, sign):
+        amount = expense.paisa * sign
+        paid_by = expense['paid_by']
+        category = expense['category']
+        sharing_people = expense['shared_between']
+
+        self.payments_paisa[paid_by] += amount
+        self.payment_counts[paid_by] += sign
+        for person, share in zip(sharing_people, split(amount, len(sharing_people))):
+            self.shares_paisa[person] += share
+        self.category_paisa[category] += amount
+        self.category_counts[category] += sign
+        self.total_paisa += amount
+        self.count += sign
+        self.version += 1
+
+    def add(self, expense):
+        self._apply(expense, 1)
+        self.patterns.add(expense)
+
+    def remove(self, expense):
+        self._apply(expense, -1)
+        self.patterns.remove(expense)
+
+    def replace(self, old_expense, new_expense):
+        self._apply(old_expense, -1)
+        self._apply(new_expense, 1)
+        self.patterns.replace(old_expense, new_expense)
+
+    def add_roommate(self, name):
+        if name not in self.roommates:
+            self.roommates.append(name)
+            self.version += 1
+
+    def remove_roommate(self, name):
+        if name in self.roommates:
+            self.roommates.remove(name)
+            self.version += 1
+
+    def balance_paisa(self, name):
+        return self.payments_paisa.get(name, 0) - self.shares_paisa.get(name, 0)
+
+    def balance(self, name):
+        return to_rupees(self.balance_paisa(name))
+
+    @property
+    def balances(self):
+        """Balance of every roommate plus anyone else with an open balance"""
+        balances = {name: self.balance(name) for name in self.roommates}
+        for name in set(self.payments_paisa) | set(self.shares_paisa):
+            if name not in balances and self.balance_paisa(name):
+                balances[name] = self.balance(name)
+        return balances
+
+    @property
+    def total(self):
+        return to_rupees(self.total_paisa)
+
+    @property
+    def payments(self):
+        return _rupees(self.payments_paisa)
+
+    @property
+    def shares(self):
+        return _rupees(self.shares_paisa)
+
+    @property
+    def category_totals(self):
+        return _rupees(self.category_paisa)
+
+    def verify(self, expenses):
+        """
+        Recompute everything from scratch and compare with the running totals.
+
+        Returns True when they agree.  On a mismatch the ledger adopts the
+        recomputed totals and returns False.
+        """
+        check = Ledger(self.roommates)
+        check.rebuild(expenses)
+
+        def differs(a, b):
+            return any(a.get(k, 0) != b.get(k, 0) for k in set(a) | set(b))
+
+        if (differs(self.payments_paisa, check.payments_paisa)
+                or differs(self.shares_paisa, check.shares_paisa)
+                or differs(self.category_paisa, check.category_paisa)
+                or self.total_paisa != check.total_paisa or self.count != check.count):
+            print("Ledger drifted from a full recompute; using recomputed totals")
+            version = self.version
+            self.__dict__.update(check.__dict__)
+            self.version = version + 1
+            return False
+        return True
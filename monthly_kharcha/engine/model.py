@@ -0,0 +1,212 @@
+"""
+Expense records for Monthly Kharcha.
+
+Every expense carries a persistent unique ``id``.  It is used as the
+Treeview row id and as the key for edits and deletes, so two expenses with
+the same date and description can no longer be confused.
+
+Dates are stored as ``"%Y-%m-%d %H:%M:%S"`` strings.  In memory each
+expense is an ``Expense`` that also holds the date as integer seconds
+since the epoch (``ts``), parsed once when the expense is loaded or
+created, so sorting, day bucketing and month checks compare integers.
+Amounts likewise get an integer paisa copy (``paisa``); the rupee
+``amount`` is rounded to whole paisa on the way in, which also converts
+the unrounded floats older versions stored.
+"""
+
+import uuid
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+
+from .money import to_paisa, to_rupees
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+SECONDS_PER_DAY = 86400
+
+# Timestamps are naive: the stored strings carry no timezone, so they are
+# counted from a naive epoch and never shift with DST
+_EPOCH = datetime(1970, 1, 1)
+
+
+def parse_timestamp(date_string):
+    """Seconds since the epoch for a stored date string"""
+    return (datetime.fromisoformat(date_string) - _EPOCH) // timedelta(seconds=1)
+
+
+def timestamp_datetime(ts):
+    return _EPOCH + timedelta(seconds=ts)
+
+
+def datetime_timestamp(value):
+    return (value - _EPOCH) // timedelta(seconds=1)
+
+
+def month_bounds(year, month):
+    """Timestamps of the first second of a month and of the month after it"""
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return (datetime_timestamp(datetime(year, month, 1)),
+            datetime_timestamp(datetime(next_year, next_month, 1)))
+
+
+class Expense(dict):
+    """
+    Expense record with its date parsed into ``ts`` and its amount in
+    integer ``paisa``.
+
+    It is still a plain dict to everything else, so it serializes to the
+    same JSON as before and neither slot ever reaches the files.
+    """
+
+    __slots__ = ('ts', 'paisa')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ts = parse_timestamp(self['date'])
+        self._set_amount(self['amount'])
+
+    def _set_amount(self, amount):
+        self.paisa = to_paisa(amount)
+        super().__setitem__('amount', to_rupees(self.paisa))
+
+    def __setitem__(self, key, value):
+        if key == 'amount':
+            self._set_amount(value)
+            return
+        super().__setitem__(key, value)
+        if key == 'date':
+            self.ts = parse_timestamp(value)
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.ts = parse_timestamp(self['date'])
+        self._set_amount(self['amount'])
+
+    def copy(self):
+        return Expense(self)
+
+    @property
+    def day(self):
+        """Day number since the epoch, for bucketing expenses by day"""
+        return self.ts // SECONDS_PER_DAY
+
+
+def expense_paisa(expense):
+    """Amount of an ``Expense``, a table row or a plain expense dict in paisa"""
+    paisa = getattr(expense, 'paisa', None)
+    return to_paisa(expense['amount']) if paisa is None else paisa
+
+
+def as_expenses(expenses):
+    """Turn every plain dict in a list of expenses into an ``Expense`` in place"""
+    for i, expense in enumerate(expenses):
+        if not isinstance(expense, Expense):
+            expenses[i] = Expense(expense)
+    return expenses
+
+
+def new_expense_id():
+    return uuid.uuid4().hex
+
+
+def ensure_ids(expenses):
+    """Give every expense without an ID a new one; return how many were added"""
+    added = 0
+    for expense in expenses:
+        if not expense.get('id'):
+            expense['id'] = new_expense_id()
+            added += 1
+    return added
+
+
+class ExpenseIndex:
+    """
+    Maps expense IDs to their position in a month's expense list.
+
+    Lookup, replacement and removal are O(1).  Removal moves the last
+    expense into the freed slot, so list order is not meaningful; views
+    sort by date.
+    """
+
+    def __init__(self, expenses):
+        self.expenses = expenses
+        self.positions = {expense['id']: i for i, expense in enumerate(expenses)}
+
+    def __contains__(self, expense_id):
+        return expense_id in self.positions
+
+    def __len__(self):
+        return len(self.expenses)
+
+    def get(self, expense_id):
+        position = self.positions.get(expense_id)
+        return None if position is None else self.expenses[position]
+
+    def add(self, expense):
+        self.positions[expense['id']] = len(self.expenses)
+        self.expenses.append(expense)
+
+    def replace(self, expense_id, expense):
+        """Swap in a new version of an expense and return the old one"""
+        position = self.positions.pop(expense_id)
+        old_expense = self.expenses[position]
+        self.expenses[position] = expense
+        self.positions[expense['id']] = position
+        return old_expense
+
+    def remove(self, expense_id):
+        """Remove an expense and return it"""
+        position = self.positions.pop(expense_id)
+        last = self.expenses.pop()
+        if position < len(self.expenses):
+            removed = self.expenses[position]
+            self.expenses[position] = last
+            self.positions[last['id']] = position
+            return removed
+        return last
+
+
+class DateIndex:
+    """
+    Expense IDs kept sorted by date, newest first.
+
+    Ordering uses the parsed ``Expense.ts``; inserts, updates and removals
+    keep the order with a binary search instead of re-sorting.
+    """
+
+    def __init__(self, expenses=()):
+        self._order = sorted(self._key(expense) for expense in expenses)
+        self._keys = {key[1]: key for key in self._order}
+
+    @staticmethod
+    def _key(expense):
+        return (expense.ts, expense['id'])
+
+    def __len__(self):
+        return len(self._order)
+
+    def __contains__(self, expense_id):
+        return expense_id in self._keys
+
+    def insert(self, expense):
+        key = self._key(expense)
+        self._keys[expense['id']] = key
+        insort(self._order, key)
+
+    def remove(self, expense_id):
+        key = self._keys.pop(expense_id)
+        del self._order[bisect_left(self._order, key)]
+
+    def update(self, expense):
+        self.remove(expense['id'])
+        self.insert(expense)
+
+    def position(self, expense_id):
+        """Position of an expense counted from the newest one"""
+        key = self._keys[expense_id]
+        return len(self._order) - 1 - bisect_left(self._order, key)
+
+    def ids(self, start=0, stop=None):
+        """IDs from position ``start`` up to ``stop``, newest first"""
+        count = len(self._order)
+        stop = count if stop is None else min(stop, count)
+        return [self._order[count - 1 - i][1] for i in range(max(start, 0), stop)]
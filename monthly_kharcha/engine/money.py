@@ -0,0 +1,43 @@
+"""
+Fixed-point money for Monthly Kharcha.
+
+Amounts are counted in whole paisa as plain ints, so totals and balances
+add up exactly and a month's balances always sum to zero.  Rupee floats
+only appear at the edges: amounts typed in or read from older files are
+rounded to the nearest paisa once, and totals are turned back into rupees
+for display.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal
+
+PAISA_PER_RUPEE = 100
+
+
+def to_paisa(amount):
+    """Round a rupee amount to whole paisa, halves away from zero"""
+    if isinstance(amount, int):
+        return amount * PAISA_PER_RUPEE
+    scaled = amount * PAISA_PER_RUPEE
+    rounded = round(scaled)
+    if abs(scaled - rounded) < 1e-6:
+        # Already a whole number of paisa, give or take float noise
+        return rounded
+    return int((Decimal(repr(float(amount))) * PAISA_PER_RUPEE).quantize(
+        Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def to_rupees(paisa):
+    return paisa / PAISA_PER_RUPEE
+
+
+def split(paisa, parts):
+    """
+    Split an amount into ``parts`` whole-paisa shares that add up to it.
+
+    Shares differ by at most one paisa; the leftover paisa go to the first
+    shares (largest remainder with ties broken by position), so the split
+    of an expense is the same every time it is applied or reverted.
+    """
+    sign = -1 if paisa < 0 else 1
+    base, extra = divmod(abs(paisa), parts)
+    return [sign * (base + 1 if i < extra else base) for i in range(parts)]
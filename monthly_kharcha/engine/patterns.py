@@ -0,0 +1,201 @@
+"""
+Per-category spending patterns for Monthly Kharcha.
+
+For every category the count and total of its expenses, its largest
+expense and the time of its latest one are kept as running aggregates.
+Adding an expense updates them directly.  Removing one can only lower the
+largest or latest value, so the category is marked stale instead, and
+stale categories get those two values back from one pass over the
+expenses the next time the patterns are read.  The number of expenses on
+each day and the latest expense overall are kept the same way.
+
+The aggregates are built with a single grouped pass over the expenses.
+That is a plain loop for expense dicts: filling NumPy columns from dicts
+costs more than the loop itself.  An ``ExpenseTable`` of at least
+``VECTORIZE_FROM`` rows already holds the columns and is reduced with
+NumPy instead.
+"""
+
+from collections import defaultdict
+
+from .balance_engine import VECTORIZE_FROM
+from .expense_table import ExpenseTable
+from .model import SECONDS_PER_DAY, expense_paisa, parse_timestamp, timestamp_datetime
+from .money import to_rupees
+
+
+def _expense_ts(expense):
+    ts = getattr(expense, 'ts', None)
+    return parse_timestamp(expense['date']) if ts is None else ts
+
+
+def _recency(expense):
+    """Order of expenses by date, ties broken by ID as the date index does"""
+    return (_expense_ts(expense), expense['id'])
+
+
+class CategoryStats:
+    """Count, total and largest expense in paisa, and the latest timestamp"""
+
+    __slots__ = ('count', 'total', 'largest', 'latest')
+
+    def __init__(self, count=0, total=0, largest=None, latest=None):
+        self.count = count
+        self.total = total
+        self.largest = largest
+        self.latest = latest
+
+    def include(self, paisa, ts):
+        if self.largest is None or paisa > self.largest:
+            self.largest = paisa
+        if self.latest is None or ts > self.latest:
+            self.latest = ts
+
+    def pattern(self):
+        """The stats in the shape ``analyze_spending_patterns`` reports them"""
+        return {
+            'average_amount': to_rupees(self.total) / self.count,
+            'max_amount': to_rupees(self.largest),
+            'total': to_rupees(self.total),
+            'frequency': self.count,
+            'last_date': timestamp_datetime(self.latest),
+        }
+
+
+def category_stats(expenses):
+    """
+    ``{category: CategoryStats}`` for a list of expenses in one pass, with
+    the ``{day: count}`` of expenses per day and the latest expense.
+    """
+    if isinstance(expenses, ExpenseTable) and len(expenses) >= VECTORIZE_FROM:
+        return _table_stats(expenses)
+    return _python_stats(expenses)
+
+
+def _python_stats(expenses):
+    stats = {}
+    days = defaultdict(int)
+    latest = latest_key = None
+    for expense in expenses:
+        category = expense['category']
+        paisa = expense_paisa(expense)
+        ts = _expense_ts(expense)
+        entry = stats.get(category)
+        if entry is None:
+            entry = stats[category] = CategoryStats()
+        entry.count += 1
+        entry.total += paisa
+        entry.include(paisa, ts)
+        days[ts // SECONDS_PER_DAY] += 1
+        if latest is None or (ts, expense['id']) > latest_key:
+            latest, latest_key = expense, (ts, expense['id'])
+    return stats, days, latest
+
+
+def _table_stats(table):
+    import numpy as np
+
+    names = table.categories
+    groups = np.frombuffer(table.category, dtype=np.uint16).astype(np.intp)
+    amounts = np.frombuffer(table.paisa, dtype=np.int64)
+    times = np.frombuffer(table.ts, dtype=np.int64)
+
+    size = len(names)
+    counts = np.bincount(groups, minlength=size)
+    # Sum each group as exact int64; bincount weights would go through float64
+    totals = np.zeros(size, dtype=np.int64)
+    np.add.at(totals, groups, amounts)
+    largest = np.full(size, np.iinfo(np.int64).min)
+    np.maximum.at(largest, groups, amounts)
+    latest = np.full(size, np.iinfo(np.int64).min)
+    np.maximum.at(latest, groups, times)
+    stats = {name: CategoryStats(int(counts[i]), int(totals[i]), int(largest[i]), int(latest[i]))
+             for i, name in enumerate(names) if counts[i]}
+
+    day_numbers, day_counts = np.unique(times // SECONDS_PER_DAY, return_counts=True)
+    days = defaultdict(int, zip(day_numbers.tolist(), day_counts.tolist()))
+    newest = np.flatnonzero(times == times.max())
+    row = max(newest.tolist(), key=lambda row: table.ids[row])
+    return stats, days, table.get(table.ids[row])
+
+
+class SpendingPatterns:
+    """Per-category aggregates kept up to date as expenses change"""
+
+    def __init__(self):
+        self.invalidate()
+
+    def invalidate(self):
+        """Recompute everything from the expenses on the next read"""
+        self.stats = {}
+        self.days = defaultdict(int)    # day number -> expenses on that day
+        self.latest = None              # the newest expense
+        self._rebuild = True            # everything needs one full pass
+        self._stale = set()             # categories whose largest or latest may be too high
+        self._latest_stale = False
+
+    def add(self, expense):
+        if self._rebuild:
+            return
+        category = expense['category']
+        entry = self.stats.get(category)
+        if entry is None:
+            entry = self.stats[category] = CategoryStats()
+        paisa = expense_paisa(expense)
+        ts = _expense_ts(expense)
+        entry.count += 1
+        entry.total += paisa
+        if category not in self._stale:
+            entry.include(paisa, ts)
+        self.days[ts // SECONDS_PER_DAY] += 1
+        if not self._latest_stale and (self.latest is None
+                                       or _recency(expense) > _recency(self.latest)):
+            self.latest = expense
+
+    def remove(self, expense):
+        if self._rebuild:
+            return
+        category = expense['category']
+        entry = self.stats[category]
+        paisa = expense_paisa(expense)
+        ts = _expense_ts(expense)
+        entry.count -= 1
+        entry.total -= paisa
+        if not entry.count:
+            del self.stats[category]
+            self._stale.discard(category)
+        elif paisa == entry.largest or ts == entry.latest:
+            self._stale.add(category)
+        day = ts // SECONDS_PER_DAY
+        self.days[day] -= 1
+        if not self.days[day]:
+            del self.days[day]
+        if self.latest is not None and self.latest['id'] == expense['id']:
+            self.latest = None
+            self._latest_stale = True
+
+    def replace(self, old_expense, new_expense):
+        self.remove(old_expense)
+        self.add(new_expense)
+
+    def current(self, expenses):
+        """``{category: CategoryStats}``, bringing stale entries up to date first"""
+        if self._rebuild:
+            self.stats, self.days, self.latest = category_stats(expenses)
+            self._rebuild = self._latest_stale = False
+        elif self._stale or self._latest_stale:
+            for category in self._stale:
+                self.stats[category].largest = self.stats[category].latest = None
+            latest = None
+            for expense in expenses:
+                category = expense['category']
+                if category in self._stale:
+                    self.stats[category].include(expense_paisa(expense), _expense_ts(expense))
+                if self._latest_stale and (latest is None
+                                           or _recency(expense) > _recency(latest)):
+                    latest = expense
+            if self._latest_stale:
+                self.latest = latest
+            self._stale.clear()
+            self._latest_stale = False
+        return self.stats
@@ -0,0 +1,161 @@
+"""
+Settlement planning for Monthly Kharcha.
+
+Balances are planned in integer paisa, so transfers always add up
+exactly.  Balances that come in as rupees from elsewhere than the ledger
+may round to a total a paisa or two off zero; the difference is taken off
+the largest balances on the side that is over, ties broken by name, so the
+same balances always give the same plan.
+
+Small groups get an exact minimum-transfer plan.  A group whose members
+can be split into ``k`` subsets that each sum to zero settles in
+``n - k`` transfers, and no plan does better, so the solver looks for the
+largest number of such subsets with a dynamic program over bitmasks of
+members.  That is exponential in the group size; past ``EXACT_LIMIT``
+members a heap-based greedy is used instead, which always pays the
+largest debt to the largest credit.
+"""
+
+import heapq
+
+from .money import to_paisa, to_rupees
+
+# Largest number of members with a non-zero balance planned exactly
+EXACT_LIMIT = 20
+
+
+def balances_to_paisa(balances):
+    """Round ``{name: rupees}`` to ``{name: paisa}`` summing to exactly zero"""
+    paisa = {name: to_paisa(balance) for name, balance in balances.items()}
+    residual = sum(paisa.values())
+    if residual:
+        # Credits are too large when the residual is positive, debts when
+        # it is negative; trim the largest ones by a paisa each
+        sign = 1 if residual > 0 else -1
+        largest = sorted((name for name in paisa if paisa[name] * sign > 0),
+                         key=lambda name: (-abs(paisa[name]), name))
+        for i in range(abs(residual)):
+            paisa[largest[i % len(largest)]] -= sign
+    return paisa
+
+
+def settle(balances, exact_limit=EXACT_LIMIT):
+    """
+    Plan transfers for ``{name: paisa}`` balances that sum to zero.
+
+    Returns ``(payer, receiver, paisa)`` tuples, largest first.  Positive
+    balances are owed money, negative ones owe it.
+    """
+    remaining = {name: amount for name, amount in sorted(balances.items()) if amount}
+    transfers = _settle_opposites(remaining)
+    if len(remaining) <= exact_limit:
+        for group in _zero_sum_groups(remaining):
+            transfers.extend(_settle_greedy(group))
+    else:
+        transfers.extend(_settle_greedy(remaining))
+    transfers.sort(key=lambda transfer: (-transfer[2], transfer[0], transfer[1]))
+    return transfers
+
+
+def settlement_plan(balances, exact_limit=EXACT_LIMIT):
+    """
+    Transfers settling a month's ``{name: rupees}`` balances, as
+    ``{'from', 'to', 'amount'}`` dicts with the amount in rupees,
+    largest first.
+    """
+    return [{'from': payer, 'to': receiver, 'amount': to_rupees(amount)}
+            for payer, receiver, amount in settle(balances_to_paisa(balances), exact_limit)]
+
+
+def _settle_opposites(balances):
+    """
+    Pair off members whose balances exactly cancel, removing them from
+    ``balances``.  Such a pair is a zero-sum group of its own in some
+    optimal plan, so this never costs a transfer.
+    """
+    transfers = []
+    debtors = {}
+    for name, amount in balances.items():
+        if amount < 0:
+            debtors.setdefault(-amount, []).append(name)
+    for name, amount in list(balances.items()):
+        if amount > 0 and debtors.get(amount):
+            debtor = debtors[amount].pop(0)
+            transfers.append((debtor, name, amount))
+            del balances[name], balances[debtor]
+    return transfers
+
+
+def _zero_sum_groups(balances):
+    """Split balances into the largest number of subsets that each sum to zero"""
+    names = list(balances)
+    count = len(names)
+    if count == 0:
+        return []
+
+    import numpy as np
+
+    amounts = [balances[name] for name in names]
+    size = 1 << count
+    # Subset sums and member counts of every mask, built a member at a
+    # time: the masks with member i are the ones before it plus member i
+    sums = np.zeros(1, dtype=np.int64)
+    popcount = np.zeros(1, dtype=np.int8)
+    for amount in amounts:
+        sums = np.concatenate((sums, sums + amount))
+        popcount = np.concatenate((popcount, popcount + 1))
+    zero = (sums == 0).view(np.int8)
+    del sums
+
+    # groups[mask]: most zero-sum subsets the members in mask split into,
+    # counted as the zero-sum prefixes of the best order to add them in
+    groups = np.zeros(size, dtype=np.int8)
+    for members in range(1, count + 1):
+        layer = np.flatnonzero(popcount == members)
+        best = np.zeros(len(layer), dtype=np.int8)
+        for i in range(count):
+            # Masks without member i are in the layer below; clearing a bit
+            # that is not set points back into this layer, still all zeros
+            np.maximum(best, groups[layer & ~(1 << i)], out=best)
+        groups[layer] = best + zero[layer]
+
+    # Walk back from all members, removing one that keeps the count optimal
+    order = []
+    mask = size - 1
+    while mask:
+        target = groups[mask] - zero[mask]
+        for i in range(count):
+            if mask >> i & 1 and groups[mask ^ (1 << i)] == target:
+                order.append(i)
+                mask ^= 1 << i
+                break
+    order.reverse()
+
+    result, group, running = [], {}, 0
+    for i in order:
+        group[names[i]] = amounts[i]
+        running += amounts[i]
+        if running == 0:
+            result.append(group)
+            group = {}
+    return result
+
+
+def _settle_greedy(balances):
+    """Repeatedly pay the largest debt to the largest credit"""
+    creditors = [(-amount, name) for name, amount in balances.items() if amount > 0]
+    debtors = [(amount, name) for name, amount in balances.items() if amount < 0]
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+
+    transfers = []
+    while creditors and debtors:
+        credit, creditor = heapq.heappop(creditors)
+        debt, debtor = heapq.heappop(debtors)
+        amount = min(-credit, -debt)
+        transfers.append((debtor, creditor, amount))
+        if -credit > amount:
+            heapq.heappush(creditors, (credit + amount, creditor))
+        if -debt > amount:
+            heapq.heappush(debtors, (debt + amount, debtor))
+    return transfers
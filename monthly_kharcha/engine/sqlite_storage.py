@@ -0,0 +1,492 @@
+"""
+SQLite storage backend for Monthly Kharcha.
+
+All months live in one database file.  Expenses are indexed by month and
+date, category and payer, so loading a month, back-dated inserts and
+cross-month totals are indexed queries instead of whole-file rewrites.
+
+Book keys are ``(month, archived)`` tuples where ``month`` is ``YYYY-MM``.
+Amounts are stored as integer paisa; the rupee ``amount`` column is kept
+up to date for other tools reading the database.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+from .model import Expense, ensure_ids, new_expense_id
+from .money import to_paisa, to_rupees
+from .storage import (DATABASE_NAME, MONTH_FILE_RE, BookChangedError, JSONStorage,
+                      compute_balances, summarize_month)
+
+# Bumped whenever SCHEMA changes; see SQLiteStorage._upgrade
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS months (
+    month TEXT NOT NULL,
+    archived INTEGER NOT NULL DEFAULT 0,
+    archive_date TEXT,
+    final_balances TEXT,
+    extra TEXT NOT NULL DEFAULT '{}',
+    PRIMARY KEY (month, archived)
+);
+CREATE TABLE IF NOT EXISTS roommates (
+    month TEXT NOT NULL,
+    archived INTEGER NOT NULL DEFAULT 0,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (month, archived, position)
+);
+CREATE TABLE IF NOT EXISTS expenses (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT,
+    month TEXT NOT NULL,
+    archived INTEGER NOT NULL DEFAULT 0,
+    date TEXT NOT NULL,
+    category TEXT NOT NULL,
+    description TEXT NOT NULL,
+    amount REAL NOT NULL,
+    paisa INTEGER NOT NULL DEFAULT 0,
+    paid_by TEXT NOT NULL,
+    shared_between TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS expenses_month_date ON expenses (month, date);
+CREATE INDEX IF NOT EXISTS expenses_category ON expenses (category);
+CREATE INDEX IF NOT EXISTS expenses_paid_by ON expenses (paid_by);
+"""
+
+INDEXES_V1 = """
+CREATE UNIQUE INDEX IF NOT EXISTS expenses_id ON expenses (month, archived, id);
+"""
+
+# Keys of the month dict that have their own tables or are derived
+_STRUCTURED_KEYS = ('roommates', 'expenses', 'balances', 'journal_seq')
+
+
+def _month_label(year, month):
+    return f"{year}-{month:02d}"
+
+
+class SQLiteStorage:
+    """Storage backend keeping every month in a single SQLite database"""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        # Worker threads only read PRAGMA data_version through this
+        # connection, under _version_lock; see book_version
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._upgrade()
+        # Per-book write counters for book_version, and the data_version
+        # each book was last loaded at for is_stale
+        self._changes = defaultdict(int)
+        self._loaded = {}
+        self._version_lock = threading.Lock()
+        # sqlite3 connections belong to the thread that opened them, so
+        # worker threads reading months get one each
+        self._readers = threading.local()
+        self._reader_conns = []
+        self._reader_lock = threading.Lock()
+
+    def _reader(self):
+        conn = getattr(self._readers, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self._readers.conn = conn
+            with self._reader_lock:
+                self._reader_conns.append(conn)
+        return conn
+
+    def _upgrade(self):
+        """Create the schema or bring an older database up to date"""
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        self.conn.executescript(SCHEMA)
+        if version < 1:
+            # Version 1 gives every expense a persistent ID
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(expenses)")]
+            with self.conn:
+                if 'id' not in columns:
+                    self.conn.execute("ALTER TABLE expenses ADD COLUMN id TEXT")
+                missing = self.conn.execute("SELECT seq FROM expenses WHERE id IS NULL").fetchall()
+                self.conn.executemany("UPDATE expenses SET id = ? WHERE seq = ?",
+                                      [(new_expense_id(), seq) for (seq,) in missing])
+        if version < 2:
+            # Version 2 counts amounts in integer paisa
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(expenses)")]
+            with self.conn:
+                if 'paisa' not in columns:
+                    self.conn.execute(
+                        "ALTER TABLE expenses ADD COLUMN paisa INTEGER NOT NULL DEFAULT 0")
+                # Rounded with to_paisa rather than SQL's ROUND, which sees
+                # 10.005 as 1000.4999... and rounds it down
+                updates = []
+                for seq, amount in self.conn.execute("SELECT seq, amount FROM expenses"):
+                    paisa = to_paisa(amount)
+                    updates.append((paisa, to_rupees(paisa), seq))
+                self.conn.executemany("UPDATE expenses SET paisa = ?, amount = ? WHERE seq = ?",
+                                      updates)
+        self.conn.executescript(INDEXES_V1)
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def current_book(self, year, month):
+        return (_month_label(year, month), 0)
+
+    def find_book(self, year, month, archived=None):
+        """
+        Key of the existing book holding a month, or None.  ``archived``
+        asks for the live or the archived book; by default the live one is
+        preferred.
+        """
+        if archived is None:
+            row = self.conn.execute(
+                "SELECT month, archived FROM months WHERE month = ? ORDER BY archived LIMIT 1",
+                (_month_label(year, month),)).fetchone()
+        else:
+            row = self.conn.execute(
+                "SELECT month, archived FROM months WHERE month = ? AND archived = ?",
+                (_month_label(year, month), int(archived))).fetchone()
+        return tuple(row) if row else None
+
+    def list_books(self):
+        """
+        Return ``(year, month, key)`` for every stored book, newest first.
+        A month with both a live and an archived book is listed twice, the
+        live book first.
+        """
+        books = []
+        for month, archived in self.conn.execute(
+                "SELECT month, archived FROM months ORDER BY month DESC, archived"):
+            year, month_number = map(int, month.split('-'))
+            books.append((year, month_number, (month, archived)))
+        return books
+
+    def is_archive(self, key):
+        return bool(key[1])
+
+    def exists(self, key):
+        return self.conn.execute(
+            "SELECT 1 FROM months WHERE month = ? AND archived = ?", key).fetchone() is not None
+
+    def _load_parts(self, key, conn=None):
+        conn = conn or self.conn
+        row = conn.execute(
+            "SELECT archive_date, final_balances, extra FROM months "
+            "WHERE month = ? AND archived = ?", key).fetchone()
+        if row is None:
+            return None
+        archive_date, final_balances, extra = row
+
+        month_data = json.loads(extra)
+        month_data['roommates'] = [name for (name,) in conn.execute(
+            "SELECT name FROM roommates WHERE month = ? AND archived = ? ORDER BY position", key)]
+        month_data['expenses'] = [
+            Expense({
+                'id': expense_id,
+                'category': category,
+                'description': description,
+                'amount': to_rupees(paisa),
+                'paid_by': paid_by,
+                'shared_between': json.loads(shared_between),
+                'date': date
+            })
+            for expense_id, date, category, description, paisa, paid_by, shared_between
+            in conn.execute(
+                "SELECT id, date, category, description, paisa, paid_by, shared_between "
+                "FROM expenses WHERE month = ? AND archived = ? ORDER BY seq", key)
+        ]
+        month_data['balances'] = compute_balances(month_data['expenses'],
+                                                  month_data['roommates'])
+        return month_data, archive_date, final_balances
+
+    def load(self, key):
+        self._loaded[key] = self._data_version()
+        parts = self._load_parts(key)
+        return parts[0] if parts else None
+
+    def load_archive(self, key):
+        self._loaded[key] = self._data_version()
+        return self._archive(self._load_parts(key))
+
+    def read_archive(self, key):
+        """``load_archive`` for read-only use; safe to call from a worker thread"""
+        return self._archive(self._load_parts(key, self._reader()))
+
+    def book_version(self, key):
+        """
+        Changes whenever the contents of a book change.
+
+        Writes through this storage are counted per book.  Writes by other
+        processes, such as the command line, move SQLite's data_version,
+        which covers the whole database, so they change every book's
+        version.
+        """
+        return (key, self._changes.get(key, 0), self._data_version())
+
+    def _data_version(self):
+        with self._version_lock:
+            return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def is_stale(self, key):
+        """
+        Whether another process may have written a book since it was last
+        loaded here.  data_version covers the whole database, so a write to
+        any other month counts as well.
+        """
+        return key in self._loaded and self._loaded[key] != self._data_version()
+
+    @staticmethod
+    def _archive(parts):
+        if parts is None:
+            return None
+        month_data, archive_date, final_balances = parts
+        month_summary = summarize_month(month_data, archive_date)
+        if final_balances is not None:
+            month_summary['final_balances'] = json.loads(final_balances)
+        return {'month_data': month_data, 'month_summary': month_summary}
+
+    def _insert_expense(self, key, expense):
+        self.conn.execute(
+            "INSERT INTO expenses (id, month, archived, date, category, description, "
+            "amount, paisa, paid_by, shared_between) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (expense['id'], *key, expense['date'], expense['category'], expense['description'],
+             expense['amount'], expense.paisa, expense['paid_by'],
+             json.dumps(expense['shared_between'])))
+
+    def _write_roommates(self, key, roommates):
+        self.conn.execute("DELETE FROM roommates WHERE month = ? AND archived = ?", key)
+        self.conn.executemany(
+            "INSERT INTO roommates (month, archived, position, name) VALUES (?, ?, ?, ?)",
+            [(*key, position, name) for position, name in enumerate(roommates)])
+
+    def _write_book(self, key, month_data, archive_date=None, final_balances=None):
+        extra = {k: v for k, v in month_data.items() if k not in _STRUCTURED_KEYS}
+        self.conn.execute(
+            "INSERT OR REPLACE INTO months (month, archived, archive_date, final_balances, extra) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (*key, archive_date,
+             json.dumps(final_balances) if final_balances is not None else None,
+             json.dumps(extra)))
+        self._write_roommates(key, month_data.get('roommates', []))
+        self.conn.execute("DELETE FROM expenses WHERE month = ? AND archived = ?", key)
+        ensure_ids(month_data.get('expenses', []))
+        for expense in month_data.get('expenses', []):
+            self._insert_expense(key, expense)
+
+    def save(self, key, month_data):
+        """
+        Replace the whole contents of a book.  Raises ``BookChangedError``
+        instead when another process may have written the book since it
+        was loaded, as its changes are not in ``month_data``.
+        """
+        with self.conn:
+            # Holds the write lock from the check until the commit
+            self.conn.execute("BEGIN IMMEDIATE")
+            if self.is_stale(key):
+                raise BookChangedError(f"{key[0]} was changed by another program")
+            row = self.conn.execute(
+                "SELECT archive_date, final_balances FROM months "
+                "WHERE month = ? AND archived = ?", key).fetchone()
+            archive_date, final_balances = row if row else (None, None)
+            self._write_book(key, month_data, archive_date,
+                             json.loads(final_balances) if final_balances else None)
+        self._changes[key] += 1
+
+    def archive(self, year, month, archive_data):
+        key = (_month_label(year, month), 1)
+        month_summary = archive_data.get('month_summary', {})
+        with self.conn:
+            self._write_book(key, archive_data['month_data'],
+                             month_summary.get('archive_date'),
+                             month_summary.get('final_balances'))
+        self._changes[key] += 1
+        return key
+
+    def add_expense(self, key, expense):
+        with self.conn:
+            self._insert_expense(key, expense)
+        self._changes[key] += 1
+
+    record_settlement = add_expense
+
+    def add_expenses(self, key, expenses):
+        """Add many expenses in a single transaction"""
+        with self.conn:
+            for expense in expenses:
+                self._insert_expense(key, expense)
+        self._changes[key] += 1
+
+    def edit_expense(self, key, expense_id, expense):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE expenses SET date = ?, category = ?, description = ?, amount = ?, "
+                "paisa = ?, paid_by = ?, shared_between = ? "
+                "WHERE month = ? AND archived = ? AND id = ?",
+                (expense['date'], expense['category'], expense['description'],
+                 expense['amount'], expense.paisa, expense['paid_by'],
+                 json.dumps(expense['shared_between']), *key, expense_id))
+        self._changes[key] += 1
+
+    def delete_expense(self, key, expense_id):
+        with self.conn:
+            self.conn.execute("DELETE FROM expenses WHERE month = ? AND archived = ? AND id = ?",
+                              (*key, expense_id))
+        self._changes[key] += 1
+
+    def set_roommates(self, key, roommates):
+        with self.conn:
+            self._write_roommates(key, roommates)
+        self._changes[key] += 1
+
+    def month_summaries(self):
+        """
+        Return the total, expense count and category totals of every stored
+        book, newest first, as dicts with ``year``, ``month``, ``key`` and
+        ``archived``.
+        """
+        category_totals = self._book_category_totals()
+        summaries = []
+        for month, archived, count, total in self.conn.execute(
+                "SELECT b.month, b.archived, COUNT(e.seq), COALESCE(SUM(e.paisa), 0) "
+                "FROM months b "
+                "LEFT JOIN expenses e ON e.month = b.month AND e.archived = b.archived "
+                "GROUP BY b.month, b.archived ORDER BY b.month DESC, b.archived"):
+            year, month_number = map(int, month.split('-'))
+            summaries.append({
+                'year': year,
+                'month': month_number,
+                'key': (month, archived),
+                'archived': bool(archived),
+                'total': to_rupees(total),
+                'count': count,
+                'category_totals': category_totals.get((month, archived), {})
+            })
+        return summaries
+
+    def cached_month_summaries(self):
+        """Every month's summary is one query away, so nothing is left pending"""
+        return self.month_summaries(), []
+
+    def read_month_summary(self, year, month, key):
+        """Read one month's totals; safe to call from a worker thread"""
+        conn = self._reader()
+        count, total = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(paisa), 0) FROM expenses "
+            "WHERE month = ? AND archived = ?", key).fetchone()
+        category_totals = {category: to_rupees(total) for category, total in conn.execute(
+            "SELECT category, SUM(paisa) FROM expenses "
+            "WHERE month = ? AND archived = ? GROUP BY category", key)}
+        return {'year': year, 'month': month, 'key': key, 'archived': bool(key[1]),
+                'total': to_rupees(total), 'count': count, 'category_totals': category_totals}
+
+    def _book_category_totals(self):
+        """Return ``{key: {category: total}}`` for every book with expenses"""
+        totals = defaultdict(dict)
+        for month, archived, category, total in self.conn.execute(
+                "SELECT month, archived, category, SUM(paisa) FROM expenses "
+                "GROUP BY month, archived, category"):
+            totals[(month, archived)][category] = to_rupees(total)
+        return totals
+
+    def monthly_category_totals(self):
+        """
+        Return ``{(year, month): {category: total}}`` for every stored month,
+        adding up the live and the archived book of a month
+        """
+        totals = {}
+        for year, month, key in self.list_books():
+            totals[(year, month)] = {}
+        for month, category, total in self.conn.execute(
+                "SELECT month, category, SUM(paisa) FROM expenses "
+                "WHERE EXISTS (SELECT 1 FROM months b "
+                "WHERE b.month = expenses.month AND b.archived = expenses.archived) "
+                "GROUP BY month, category"):
+            year, month_number = map(int, month.split('-'))
+            totals[(year, month_number)][category] = to_rupees(total)
+        return totals
+
+    def flush(self, compact=True):
+        """Commit; ``compact`` only matters to the JSON backend"""
+        self.conn.commit()
+
+    def close(self, compact=True):
+        with self._reader_lock:
+            for conn in self._reader_conns:
+                conn.close()
+            self._reader_conns.clear()
+        self.conn.close()
+
+
+class MigrationError(Exception):
+    """A month file could not be copied into the new database"""
+
+
+def _remove_database(db_path):
+    for path in (db_path, Path(str(db_path) + "-wal"), Path(str(db_path) + "-shm")):
+        if path.exists():
+            path.unlink()
+
+
+def migrate_json_to_sqlite(data_dir):
+    """
+    Import every ``YYYY_M.json`` and ``archive_YYYY_MM.json`` file into a new
+    database in the data directory.  The JSON files are left untouched.
+
+    Returns the names of the imported files.  If a file cannot be copied,
+    for example because two of its expenses share an ID, nothing is
+    migrated and ``MigrationError`` names the file.
+    """
+    data_dir = Path(data_dir)
+    db_path = data_dir / DATABASE_NAME
+    tmp_path = data_dir / (DATABASE_NAME + ".tmp")
+    _remove_database(tmp_path)
+
+    source = JSONStorage(data_dir)
+    target = SQLiteStorage(tmp_path)
+    imported = []
+    try:
+        for path in sorted(data_dir.glob("*.json")):
+            match = MONTH_FILE_RE.match(path.name)
+            if not match:
+                continue
+            year, month = map(int, match.groups())
+            is_archive = source.is_archive(path)
+            if source.find_book(year, month, is_archive) != path:
+                # YYYY_MM.json and YYYY_M.json for the same month: the app
+                # only ever reads the first one
+                print(f"Skipping {path.name}: superseded by another file for {year}-{month:02d}")
+                continue
+            try:
+                archive_data = source.load_archive(path)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Skipping {path.name}: {str(e)}")
+                continue
+            key = (_month_label(year, month), int(is_archive))
+            if target.exists(key):
+                print(f"Skipping {path.name}: {year}-{month:02d} already imported")
+                continue
+            month_summary = archive_data['month_summary']
+            try:
+                with target.conn:
+                    target._write_book(key, archive_data['month_data'],
+                                       month_summary.get('archive_date'),
+                                       month_summary.get('final_balances') if is_archive else None)
+            except sqlite3.IntegrityError as e:
+                raise MigrationError(f"{path.name} could not be imported: two expenses "
+                                     f"share an ID ({str(e)})") from e
+            except (sqlite3.Error, KeyError, TypeError, ValueError) as e:
+                raise MigrationError(f"{path.name} could not be imported: {str(e)}") from e
+            imported.append(path.name)
+    except BaseException:
+        target.close()
+        _remove_database(tmp_path)
+        raise
+    target.close()
+
+    os.replace(tmp_path, db_path)
+    _remove_database(tmp_path)
+    return imported
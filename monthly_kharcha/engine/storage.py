@@ -0,0 +1,727 @@
+"""
+Storage backends for Monthly Kharcha.
+
+Every month of data is a "book" that the app addresses through an opaque
+key handed out by the storage backend.  Two backends share the same API:
+
+* ``JSONStorage`` keeps the original files in the data directory.  Each
+  month is a snapshot file (``YYYY_M.json`` or ``archive_YYYY_MM.json``)
+  plus an append-only journal next to it, so a change only appends one
+  JSON line and the snapshot is rewritten when the journal is compacted.
+  A ``manifest.json`` keeps each month's totals so listing months does
+  not have to open every file.
+* ``SQLiteStorage`` (see ``sqlite_storage``) keeps every month in one
+  indexed database.
+
+``open_storage`` picks the SQLite backend once the data directory has been
+migrated to it, and the JSON files otherwise.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:     # Windows
+    fcntl = None
+    import msvcrt
+
+from . import balance_engine
+from .model import Expense, ExpenseIndex, as_expenses, ensure_ids, expense_paisa
+from .money import to_paisa, to_rupees
+
+DATABASE_NAME = "kharcha.db"
+MANIFEST_NAME = "manifest.json"
+MONTH_FILE_RE = re.compile(r'^(?:archive_)?(\d{4})_(\d{1,2})\.json$')
+_SEQ_HEADER_RE = re.compile(rb'"journal_seq":\s*(\d+)')
+
+
+def compute_balances(expenses, roommates):
+    """Return the balance of every roommate for a list of expenses"""
+    balances = balance_engine.totals(expenses).balances(roommates)
+    return {name: to_rupees(balance) for name, balance in balances.items()}
+
+
+def category_paisa(expenses):
+    """Return ``{category: total paisa}`` for a list of expenses"""
+    totals = defaultdict(int)
+    for expense in expenses:
+        totals[expense['category']] += expense_paisa(expense)
+    return dict(totals)
+
+
+def summarize_month(month_data, archive_date=None):
+    """Build the ``month_summary`` block stored alongside archived months"""
+    category_totals = category_paisa(month_data.get('expenses', []))
+
+    summary = {
+        'total_expenses': to_rupees(sum(category_totals.values())),
+        'category_totals': {category: to_rupees(total)
+                            for category, total in category_totals.items()},
+        'final_balances': month_data.get('balances', {}),
+        'expense_count': len(month_data.get('expenses', []))
+    }
+    if archive_date:
+        summary['archive_date'] = archive_date
+    return summary
+
+
+class BookChangedError(Exception):
+    """A book was written by another process since it was loaded"""
+
+
+def _acquire_lock(path):
+    """
+    Create and lock the file at ``path``; ``_release_lock`` removes it
+    again, so lock files do not pile up in the data directory.
+    """
+    while True:
+        f = open(path, 'a+b')
+        if fcntl is None:
+            # Windows refuses to remove a file another process has open,
+            # so the file locked here is always the one at path
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return f
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        # The previous holder may have removed the file while this
+        # process waited for it; lock the new one then
+        try:
+            if os.stat(path).st_ino == os.fstat(f.fileno()).st_ino:
+                return f
+        except FileNotFoundError:
+            pass
+        f.close()
+
+
+def _release_lock(f, path):
+    if fcntl is None:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        f.close()
+        try:
+            os.remove(path)
+        except OSError:     # another process has it open and locks it next
+            pass
+    else:
+        # Removed while still held, so a waiting process notices
+        os.remove(path)
+        f.close()
+
+
+def apply_op(data, entry, index):
+    """Apply a single journal entry to month data in place"""
+    op = entry['op']
+    if op in ('add', 'settle'):
+        index.add(Expense(entry['expense']))
+    elif op == 'edit':
+        index.replace(entry['id'], Expense(entry['expense']))
+    elif op == 'delete':
+        index.remove(entry['id'])
+    elif op == 'roommates':
+        data['roommates'] = entry['roommates']
+    else:
+        raise ValueError(f"Unknown journal operation: {op}")
+
+
+class MonthJournal:
+    """
+    Snapshot plus write-ahead journal for a single month file.
+
+    Loading reads the snapshot and replays the journal tail on top of it.
+    Writers append small operations and compact into a fresh snapshot once
+    the journal grows past ``COMPACT_AFTER`` entries.  Entries carry a
+    sequence number and the snapshot records the last one it contains, so
+    a crash between writing the snapshot and removing the journal never
+    replays an operation twice.
+
+    Archive files nest the month under ``month_data``; journal entries are
+    applied to that block and the ``month_summary`` is rebuilt on replay.
+
+    The app and the command line may write the same month at once, so
+    writes hold a lock file next to the snapshot, which only exists while
+    it is held.  A writer that finds the files changed since it last saw
+    them reads the sequence counter again before appending.  ``stale``
+    then stays set until the month is loaded again, as the loaded copy is
+    missing the other writer's changes.
+    """
+
+    COMPACT_AFTER = 200
+
+    def __init__(self, snapshot_path):
+        self.snapshot_path = Path(snapshot_path)
+        self.journal_path = self.snapshot_path.with_suffix('.journal')
+        self.lock_path = self.snapshot_path.with_suffix('.lock')
+        self.pending = 0
+        self.seq = 0
+        self.ids_added = 0
+        self.digest = None
+        self._stamp = None          # file state seq and pending were read from
+        self.stale = False
+        self._lock = None
+        self._lock_depth = 0
+
+    @contextmanager
+    def locked(self):
+        """Hold the month's lock file while in the block; re-entrant within one journal"""
+        if not self._lock_depth:
+            self._lock = _acquire_lock(self.lock_path)
+        self._lock_depth += 1
+        try:
+            yield
+        finally:
+            self._lock_depth -= 1
+            if not self._lock_depth:
+                _release_lock(self._lock, self.lock_path)
+                self._lock = None
+
+    def _files_stamp(self):
+        return (_file_stamp(self.snapshot_path), _file_stamp(self.journal_path))
+
+    def changed_elsewhere(self):
+        """Whether another process wrote the month since it was last loaded"""
+        return self.stale or (self._stamp is not None and self._stamp != self._files_stamp())
+
+    def load(self, repair=True):
+        """
+        Return the file contents with the journal replayed, or None if missing.
+
+        With ``repair=False`` the files are never written, so a throwaway
+        ``MonthJournal`` can read a month from a worker thread.
+        """
+        if not repair:
+            return self._load(repair)
+        with self.locked():
+            return self._load(repair)
+
+    def _load(self, repair):
+        # Taken before reading, so a write racing an unlocked read shows
+        # up as a changed stamp on the next append
+        stamp = self._files_stamp()
+        if self._stamp is not None and stamp != self._stamp:
+            self.stale = True
+        if not self.snapshot_path.exists():
+            self._stamp = stamp
+            return None
+        with open(self.snapshot_path, 'rb') as f:
+            raw = f.read()
+        data = json.loads(raw)
+        self.digest = hashlib.sha1(raw).hexdigest()
+
+        month_data = data.get('month_data', data)
+        expenses = month_data.setdefault('expenses', [])
+        # Files written before expenses had IDs get them here; the caller
+        # persists them by writing a snapshot
+        self.ids_added = ensure_ids(expenses)
+        as_expenses(expenses)
+        index = ExpenseIndex(expenses)
+        self.pending = 0
+        self.seq = data.pop('journal_seq', 0)
+        for entry in self._read_journal(repair):
+            if entry.get('seq', 0) <= self.seq:
+                continue
+            try:
+                if entry['op'] in ('add', 'settle'):
+                    self.ids_added += ensure_ids([entry['expense']])
+                apply_op(month_data, entry, index)
+            except (KeyError, IndexError, ValueError) as e:
+                print(f"Skipping bad journal entry in {self.journal_path.name}: {str(e)}")
+                continue
+            finally:
+                self.seq = max(self.seq, entry.get('seq', 0))
+            self.pending += 1
+        # A repairing load holds the lock, so its own truncation of a torn
+        # tail is the only change since the stamp was taken
+        self._stamp = self._files_stamp() if repair else stamp
+
+        if self.pending:
+            month_data['balances'] = compute_balances(month_data['expenses'],
+                                                      month_data.get('roommates', []))
+            if 'month_summary' in data:
+                data['month_summary'] = summarize_month(
+                    month_data, data['month_summary'].get('archive_date'))
+        return data
+
+    def _read_journal(self, repair=True):
+        if not self.journal_path.exists():
+            return
+        good_offset = 0
+        with open(self.journal_path, 'rb') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line) if line.strip() else None
+                except json.JSONDecodeError:
+                    entry = None
+                if entry is None or not line.endswith(b"\n"):
+                    break
+                good_offset += len(line)
+                yield entry
+        # Drop a torn tail left by an interrupted write so new entries
+        # are not appended onto a partial line
+        if repair and good_offset < self.journal_path.stat().st_size:
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(good_offset)
+
+    def _sync(self):
+        """Pick up the sequence counter without parsing the whole snapshot"""
+        self._stamp = self._files_stamp()
+        self.stale = True
+        self.pending = 0
+        self.seq = 0
+        for entry in self._read_journal():
+            self.pending += 1
+            self.seq = max(self.seq, entry.get('seq', 0))
+        if not self.pending and self.snapshot_path.exists():
+            # Snapshots are written with journal_seq as their first key
+            with open(self.snapshot_path, 'rb') as f:
+                match = _SEQ_HEADER_RE.search(f.read(128))
+            if match:
+                self.seq = int(match.group(1))
+            else:
+                with open(self.snapshot_path, 'r') as f:
+                    self.seq = json.load(f).get('journal_seq', 0)
+
+    def append(self, op, **fields):
+        """Append one operation to the journal"""
+        self.extend([(op, fields)])
+
+    def extend(self, operations):
+        """Append ``(op, fields)`` operations to the journal in a single write"""
+        with self.locked():
+            if self._stamp != self._files_stamp():
+                # Another process wrote the month since it was last read
+                self._sync()
+            lines = []
+            for op, fields in operations:
+                self.seq += 1
+                entry = dict(op=op, seq=self.seq, **fields)
+                lines.append(json.dumps(entry, separators=(',', ':')) + "\n")
+            with open(self.journal_path, 'a') as f:
+                f.write("".join(lines))
+            self.pending += len(lines)
+            self._stamp = self._files_stamp()
+
+    def needs_compaction(self):
+        return self.pending >= self.COMPACT_AFTER
+
+    def write_snapshot(self, data):
+        """Atomically replace the snapshot and truncate the journal"""
+        with self.locked():
+            if self._stamp != self._files_stamp():
+                self._sync()
+            snapshot = {'journal_seq': self.seq}
+            snapshot.update((k, v) for k, v in data.items() if k != 'journal_seq')
+            raw = json.dumps(snapshot, indent=4).encode()
+            tmp_path = self.snapshot_path.with_suffix('.json.tmp')
+            with open(tmp_path, 'wb') as f:
+                f.write(raw)
+            os.replace(tmp_path, self.snapshot_path)
+            self.digest = hashlib.sha1(raw).hexdigest()
+            if self.journal_path.exists():
+                self.journal_path.unlink()
+            self.pending = 0
+            self._stamp = self._files_stamp()
+
+    def compact(self):
+        """Fold the journal into a fresh snapshot"""
+        with self.locked():
+            data = self.load()
+            if data is not None:
+                self.write_snapshot(data)
+
+
+def _file_stamp(path):
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class Manifest:
+    """
+    Per-month totals of the JSON month files, kept in ``manifest.json``.
+
+    Every entry records the mtime and size of the snapshot and journal it
+    was computed from.  An entry whose files have changed since then is
+    treated as missing and rebuilt from the month file, so an entry left
+    behind by a crash before the manifest was saved only costs one reload.
+    Entries may be recorded from a worker thread.  Totals are kept in
+    paisa.
+    """
+
+    VERSION = 2
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                self.entries = data['months']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    @staticmethod
+    def _stamp(journal):
+        return [_file_stamp(journal.snapshot_path), _file_stamp(journal.journal_path)]
+
+    def get(self, journal):
+        """The entry for a month if it is still up to date, else None"""
+        entry = self.entries.get(journal.snapshot_path.name)
+        if entry is not None and entry['stamp'] == self._stamp(journal):
+            return entry
+        return None
+
+    def record(self, journal, data, stamp=None):
+        """
+        Store the totals of freshly loaded or written file contents.
+
+        ``stamp`` is the file state taken before reading, when the files may
+        have changed while they were read.
+        """
+        expenses = data.get('month_data', data).get('expenses', [])
+        category_totals = category_paisa(expenses)
+        entry = {
+            'total': sum(category_totals.values()),
+            'count': len(expenses),
+            'category_totals': category_totals,
+            'hash': journal.digest,
+            'stamp': stamp or self._stamp(journal)
+        }
+        with self._lock:
+            self.entries[journal.snapshot_path.name] = entry
+            self.dirty = True
+        return entry
+
+    def apply(self, journal, entry, op, fields):
+        """Bring an entry that was current before a journal append up to date"""
+        name = journal.snapshot_path.name
+        with self._lock:
+            if entry is None or op in ('edit', 'delete'):
+                # Edits and deletes need the old expense; recompute on demand
+                self.entries.pop(name, None)
+            else:
+                if op in ('add', 'settle'):
+                    expense = fields['expense']
+                    amount = expense_paisa(expense)
+                    entry['total'] += amount
+                    entry['count'] += 1
+                    category_totals = entry['category_totals']
+                    category_totals[expense['category']] = (
+                        category_totals.get(expense['category'], 0) + amount)
+                entry['stamp'] = self._stamp(journal)
+            self.dirty = True
+
+    def prune(self, names):
+        """Drop entries for month files that no longer exist"""
+        with self._lock:
+            stale = set(self.entries) - set(names)
+            for name in stale:
+                del self.entries[name]
+            self.dirty = self.dirty or bool(stale)
+
+    def save(self):
+        with self._lock:
+            if not self.dirty:
+                return
+            contents = json.dumps({'version': self.VERSION, 'months': self.entries})
+            self.dirty = False
+        tmp_path = self.path.with_suffix('.json.tmp')
+        with open(tmp_path, 'w') as f:
+            f.write(contents)
+        os.replace(tmp_path, self.path)
+
+
+class JSONStorage:
+    """
+    Storage backend using the month files in the data directory.
+
+    Book keys are the snapshot paths.  A month can have both a live file
+    and an archive file, as "Start New Month" archives the month and then
+    starts it over; they are separate books.
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = Path(data_dir)
+        self._journals = {}
+        self.manifest = Manifest(self.data_dir / MANIFEST_NAME)
+
+    def _journal(self, key):
+        journal = self._journals.get(key)
+        if journal is None:
+            journal = self._journals[key] = MonthJournal(key)
+        return journal
+
+    def current_book(self, year, month):
+        """Key of the live month file for a month, whether or not it exists yet"""
+        return self.data_dir / f"{year}_{month}.json"
+
+    def find_book(self, year, month, archived=None):
+        """
+        Key of the existing book holding a month, or None.  ``archived``
+        asks for the live or the archived book; by default the live one is
+        preferred.
+        """
+        names = []
+        if archived is not True:
+            names += [f"{year}_{month:02d}.json", f"{year}_{month}.json"]
+        if archived is not False:
+            names += [f"archive_{year}_{month:02d}.json", f"archive_{year}_{month}.json"]
+        for name in names:
+            path = self.data_dir / name
+            if path.exists():
+                return path
+        return None
+
+    def list_books(self):
+        """
+        Return ``(year, month, key)`` for every stored book, newest first.
+        A month with both a live and an archived book is listed twice, the
+        live book first.
+        """
+        found = set()
+        for path in self.data_dir.glob("*.json"):
+            match = MONTH_FILE_RE.match(path.name)
+            if match:
+                year, month = map(int, match.groups())
+                found.add((year, month, path.name.startswith('archive_')))
+        return [(year, month, self.find_book(year, month, archived))
+                for year, month, archived in sorted(found, key=_book_order)]
+
+    def is_archive(self, key):
+        return Path(key).name.startswith('archive_')
+
+    def exists(self, key):
+        return Path(key).exists()
+
+    def _read(self, key):
+        journal = self._journal(key)
+        with journal.locked():
+            data = journal.load()
+            journal.stale = False
+            if data is not None and (journal.ids_added or journal.needs_compaction()):
+                self._write_snapshot(key, data)
+            elif data is not None and self.manifest.get(journal) is None:
+                self.manifest.record(journal, data)
+        return data
+
+    def _write_snapshot(self, key, data):
+        journal = self._journal(key)
+        journal.write_snapshot(data)
+        self.manifest.record(journal, data)
+
+    def _compact(self, key):
+        journal = self._journal(key)
+        # Held from reading to writing, so no other writer's entries are
+        # dropped with the journal
+        with journal.locked():
+            data = journal.load()
+            if data is not None:
+                self._write_snapshot(key, data)
+
+    def load(self, key):
+        """Return the plain month data of a book, or None if it does not exist"""
+        data = self._read(key)
+        if data is not None and 'month_data' in data:
+            return data['month_data']
+        return data
+
+    def load_archive(self, key):
+        """Return a book as ``{'month_data': ..., 'month_summary': ...}``"""
+        return _as_archive(self._read(key))
+
+    def read_archive(self, key):
+        """
+        ``load_archive`` for read-only use; safe to call from a worker thread.
+
+        Nothing is written back, so IDs given to expenses of files from
+        before expenses had IDs are not kept.
+        """
+        return _as_archive(MonthJournal(key).load(repair=False))
+
+    def book_version(self, key):
+        """Changes whenever the contents of a book change"""
+        snapshot, journal = Manifest._stamp(MonthJournal(key))
+        return (str(key), snapshot and tuple(snapshot), journal and tuple(journal))
+
+    def is_stale(self, key):
+        """Whether another process wrote a book since it was last loaded here"""
+        journal = self._journals.get(key)
+        return journal is not None and journal.changed_elsewhere()
+
+    def save(self, key, month_data):
+        """
+        Replace the whole contents of a book.  Raises ``BookChangedError``
+        instead when another process wrote the book since it was loaded,
+        as its changes are not in ``month_data``.
+        """
+        journal = self._journal(key)
+        with journal.locked():
+            if journal.changed_elsewhere():
+                raise BookChangedError(f"{Path(key).name} was changed by another program")
+            ensure_ids(month_data.get('expenses', []))
+            if self.is_archive(key) and self.exists(key):
+                archive_data = self._read(key)
+                archive_data['month_data'] = month_data
+                archive_data['month_summary'] = summarize_month(
+                    month_data, archive_data.get('month_summary', {}).get('archive_date'))
+                self._write_snapshot(key, archive_data)
+            else:
+                self._write_snapshot(key, month_data)
+
+    def archive(self, year, month, archive_data):
+        """Store a finished month as an archive book and return its key"""
+        key = self.data_dir / f"archive_{year}_{month:02d}.json"
+        ensure_ids(archive_data['month_data'].get('expenses', []))
+        self._write_snapshot(key, archive_data)
+        return key
+
+    def _log(self, key, op, **fields):
+        self._log_many(key, [(op, fields)])
+
+    def _log_many(self, key, operations):
+        journal = self._journal(key)
+        entry = self.manifest.get(journal)
+        journal.extend(operations)
+        for op, fields in operations:
+            self.manifest.apply(journal, entry, op, fields)
+            if entry is not None and op in ('edit', 'delete'):
+                entry = None
+        if journal.needs_compaction():
+            self._compact(key)
+
+    def add_expense(self, key, expense):
+        self._log(key, 'add', expense=expense)
+
+    def add_expenses(self, key, expenses):
+        """Add many expenses with a single journal write"""
+        self._log_many(key, [('add', {'expense': expense}) for expense in expenses])
+
+    def record_settlement(self, key, expense):
+        self._log(key, 'settle', expense=expense)
+
+    def edit_expense(self, key, expense_id, expense):
+        self._log(key, 'edit', id=expense_id, expense=expense)
+
+    def delete_expense(self, key, expense_id):
+        self._log(key, 'delete', id=expense_id)
+
+    def set_roommates(self, key, roommates):
+        self._log(key, 'roommates', roommates=list(roommates))
+
+    def month_summaries(self):
+        """
+        Return the total, expense count and category totals of every stored
+        month, newest first, as dicts with ``year``, ``month`` and ``key``.
+        """
+        summaries, pending = self.cached_month_summaries()
+        for year, month, key in pending:
+            try:
+                summaries.append(self.read_month_summary(year, month, key))
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Error loading {Path(key).name}: {str(e)}")
+        summaries.sort(key=lambda summary: _book_order(
+            (summary['year'], summary['month'], summary['archived'])))
+        self.manifest.save()
+        return summaries
+
+    def cached_month_summaries(self):
+        """
+        Split the stored months into summaries the manifest already has
+        and ``(year, month, key)`` books that ``read_month_summary`` has to
+        read first.
+        """
+        summaries, pending = [], []
+        books = self.list_books()
+        for year, month, key in books:
+            entry = self.manifest.get(self._journal(key))
+            if entry is None:
+                pending.append((year, month, key))
+            else:
+                summaries.append(_month_summary(year, month, key, entry))
+        self.manifest.prune(Path(key).name for year, month, key in books)
+        return summaries, pending
+
+    def read_month_summary(self, year, month, key):
+        """Read one month's totals from its files; safe to call from a worker thread"""
+        # A private journal so the shared one's state is left alone
+        journal = MonthJournal(key)
+        stamp = Manifest._stamp(journal)
+        data = journal.load(repair=False)
+        if data is None:
+            raise FileNotFoundError(f"{Path(key).name} no longer exists")
+        return _month_summary(year, month, key, self.manifest.record(journal, data, stamp))
+
+    def monthly_category_totals(self):
+        """
+        Return ``{(year, month): {category: total}}`` for every stored month,
+        adding up the live and the archived book of a month
+        """
+        totals = defaultdict(lambda: defaultdict(int))
+        for summary in self.month_summaries():
+            month_totals = totals[(summary['year'], summary['month'])]
+            for category, amount in summary['category_totals'].items():
+                month_totals[category] += to_paisa(amount)
+        return {month: {category: to_rupees(total) for category, total in month_totals.items()}
+                for month, month_totals in totals.items()}
+
+    def flush(self, compact=True):
+        """
+        Compact every journal that has pending entries and save the
+        manifest.  With ``compact=False`` only the manifest is saved and
+        journals are left to compact once they reach ``COMPACT_AFTER``.
+        """
+        if compact:
+            for key, journal in self._journals.items():
+                if journal.pending:
+                    self._compact(key)
+        self.manifest.save()
+
+    def close(self, compact=True):
+        self.flush(compact)
+
+
+def _as_archive(data):
+    if data is not None and 'month_data' not in data:
+        data = {'month_data': data, 'month_summary': summarize_month(data)}
+    return data
+
+
+def _book_order(book):
+    """Sort key putting ``(year, month, archived)`` books newest first, live first"""
+    year, month, archived = book
+    return (-year, -month, archived)
+
+
+def _month_summary(year, month, key, entry):
+    return {
+        'year': year,
+        'month': month,
+        'key': key,
+        'archived': Path(key).name.startswith('archive_'),
+        'total': to_rupees(entry['total']),
+        'count': entry['count'],
+        'category_totals': {category: to_rupees(total)
+                            for category, total in entry['category_totals'].items()}
+    }
+
+
+def open_storage(data_dir):
+    """Return the storage backend in use for a data directory"""
+    data_dir = Path(data_dir)
+    db_path = data_dir / DATABASE_NAME
+    if db_path.exists():
+        from .sqlite_storage import SQLiteStorage
+        return SQLiteStorage(db_path)
+    return JSONStorage(data_dir)
+
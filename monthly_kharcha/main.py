@@ -1,25 +1,66 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+import sys
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
-import json
 import os
 import traceback  # Add this import
 from datetime import datetime
 from pathlib import Path
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-import time
 from tkinter import font as tkfont
 import customtkinter as ctk
-import pandas as pd
-from sklearn.linear_model import LinearRegression  # type: ignore
 from datetime import timedelta
-import numpy as np
 from collections import defaultdict
 import re
-from tkcalendar import DateEntry
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import seaborn as sns
+
+# numpy, matplotlib (through .charts), reportlab and tkcalendar
+# are imported where they are first used so they stay off the
+# startup path; run with --profile-startup to see what startup costs
+
+from .engine import (DATE_FORMAT, DEFAULT_CATEGORIES, DEFAULT_ROOMMATES, BookChangedError,
+                     Expense, ExpenseIndex, JSONStorage, MonthBook, migrate_json_to_sqlite,
+                     new_expense_id, open_storage, to_rupees)
+from .engine.archive_loader import ArchiveLoader
+from .engine.forecast import Forecaster
+from .engine.model import month_bounds, timestamp_datetime
+from .engine.storage import category_paisa
+from .refresh import RefreshScheduler
+from .reports import month_pdf_name, write_month_pdf, write_summary_pdf
+from .widgets import ArchiveCardList, TextList, VirtualExpenseList
+
+_IMPORT_FINISHED = time.perf_counter()
+
+# Heavy optional modules listed in the --profile-startup report when loaded
+_HEAVY_MODULES = ('numpy', 'matplotlib', 'reportlab', 'tkcalendar')
+# Startup time the --profile-startup report checks against, in seconds
+STARTUP_BUDGET = 1.5
+
+
+class StartupProfile:
+    """Wall-clock time of each startup phase, reported by --profile-startup"""
+    
+    def __init__(self):
+        self.phases = [("imports", _IMPORT_FINISHED - _IMPORT_STARTED)]
+        self._last = time.perf_counter()
+    
+    def mark(self, phase):
+        """Record the time since the previous mark as ``phase``"""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+    
+    def report(self):
+        total = sum(seconds for phase, seconds in self.phases)
+        lines = ["Startup profile:"]
+        for phase, seconds in self.phases:
+            lines.append(f"  {phase:<20} {seconds * 1000:8.1f} ms")
+        lines.append(f"  {'total':<20} {total * 1000:8.1f} ms "
+                     f"(budget {STARTUP_BUDGET * 1000:.0f} ms"
+                     f"{', over budget' if total > STARTUP_BUDGET else ''})")
+        loaded = [name for name in _HEAVY_MODULES if name in sys.modules]
+        lines.append(f"  heavy modules loaded: {', '.join(loaded) or 'none'}")
+        print("\n".join(lines))
 
 os.environ['QT_AUTO_SCREEN_SCALE_FACTOR'] = '1'
 
@@ -31,8 +72,9 @@ class MonthlyKharcha:
     with a modern GUI interface.
     """
     
-    def __init__(self):
+    def __init__(self, profile=None, data_dir=None):
         """Initialize the application with default settings and UI setup."""
+        self.profile = profile
         self.window = ctk.CTk()
         self.window.title("Monthly Kharcha - Expense Manager")
         self.window.geometry("1400x900")
@@ -42,45 +84,91 @@ class MonthlyKharcha:
         
         # Initialize data structures first
         self.spending_patterns = defaultdict(dict)  # Initialize spending_patterns
-        self.expense_predictor = None
+        self.expense_predictor = None   # Forecaster, created on first use
         
         # Setup themes first
         
         self.setup_theme_settings()  # Add this line before _setup_styles
         self._setup_styles()
+        self._mark_startup("window")
         
-        self.data_dir = Path.home() / "MonthlyKharcha"
-        self.data_dir.mkdir(exist_ok=True)
-        self.roommates = ["Danish", "Umair", "Nisar", "Shahzaib"]
-        self.categories = [
-            "Food", "Rent", "Electricity", "Internet", 
-            "Gas", "Groceries", "Room Supplies", "Other"  # Added Gas category
-        ]
+        self.data_dir = Path(data_dir or Path.home() / "MonthlyKharcha").expanduser()
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.storage = open_storage(self.data_dir)
+        self.archives = None            # ArchiveLoader, created on first use
+        self.categories = list(DEFAULT_CATEGORIES)
         
-        self._expense_cache = {}
-        self._balance_cache = {}
+        # The current month with its running totals; set the environment
+        # variable to cross-check them against a full recompute on every update
+        self.book = None
+        self.verify_ledger = bool(os.environ.get('MONTHLY_KHARCHA_VERIFY_LEDGER'))
         
         self.load_current_month()
-        self.analyze_spending_patterns()  # Analyze after loading data
+        self._mark_startup("data load")
+        self.chart_renderer = None      # created with the first chart
         self.setup_gui()
-        self.update_balances()
+        self._mark_startup("gui construction")
+        
+        # Derived views, each after the ones it depends on.  Changes call
+        # self.refresh.invalidate() and the views are redrawn together once
+        # the event loop is idle.  Expense list rows are still patched
+        # directly; the whole list only reloads when the month changes.
+        # Views on a tab that has not been built yet are skipped and filled
+        # in when the tab is first shown.
+        self.refresh = RefreshScheduler(self.window)
+        self.refresh.register('balances', self.update_balances,
+                              depends_on=('expenses', 'roommates', 'month'))
+        self.refresh.register('balance_labels', self.update_balance_labels,
+                              depends_on=('balances', 'dashboard_tab', 'expenses_tab'))
+        self.refresh.register('graphs', self._if_built('expenses_tab', self.update_graphs),
+                              depends_on=('balances', 'expenses_tab'))
+        self.refresh.register('spending_patterns', self.analyze_spending_patterns,
+                              depends_on=('balances',))
+        self.refresh.register('insights',
+                              self._if_built('dashboard_tab', lambda: self.update_insights()),
+                              depends_on=('balances', 'dashboard_tab'))
+        self.refresh.register('summary', self._if_built('summary_tab', self.refresh_summary),
+                              depends_on=('balances',))
+        self.refresh.register('expense_list',
+                              self._if_built('summary_tab', self.update_expense_list),
+                              depends_on=('month',))
+        self.refresh.register('roommate_list',
+                              self._if_built('settings_tab', self.update_roommate_list),
+                              depends_on=('roommates',))
+        self.refresh.invalidate('balances', *self._built_tabs)
+
+        # The command line may have written stored months while the window
+        # was in the background
+        self.window.bind('<FocusIn>', lambda e: self._reload_stored_months(), add='+')
+        self.window.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    @property
+    def current_data(self):
+        return self.book.data
+
+    @property
+    def roommates(self):
+        return self.book.roommates
+
+    @property
+    def ledger(self):
+        return self.book.ledger
+
+    def _if_built(self, tab, callback):
+        """Wrap a view refresh so it only runs once its tab exists"""
+        def refresh():
+            if tab in self._built_tabs:
+                callback()
+        return refresh
+
+    def _mark_startup(self, phase):
+        if self.profile is not None:
+            self.profile.mark(phase)
 
     def _setup_styles(self):
-        # Modern color scheme
-        self.colors = {
-            'primary': '#2962ff',      # Vibrant blue
-            'secondary': '#f5f5f5',    # Light gray background
-            'accent': '#00c853',       # Success green
-            'warning': '#ff6d00',      # Warning orange
-            'error': '#d50000',        # Error red
-            'text': '#212121',         # Dark text
-            'text_secondary': '#757575', # Secondary text
-            'background': '#ffffff',    # White background
-            'card': '#ffffff',         # Card background
-            'border': '#e0e0e0'        # Border color
-        }
-        
-        # Configure styles for ttk widgets
+        """Configure the ttk styles from the current theme's colors"""
+        # Widgets pick up style changes in place, so this is also how the
+        # theme is switched
         self.style = ttk.Style()
         
         # Main window background
@@ -105,6 +193,10 @@ class MonthlyKharcha:
                             font=("Segoe UI", 12),
                             foreground=self.colors['text'],
                             background=self.colors['card'])
+        self.style.configure("Subtitle.TLabel",
+                            font=("Segoe UI", 12),
+                            foreground=self.colors['text_secondary'],
+                            background=self.colors['card'])
         self.style.configure("Amount.TLabel",
                             font=("Segoe UI", 22, "bold"),
                             foreground=self.colors['primary'],
@@ -118,6 +210,12 @@ class MonthlyKharcha:
                             font=("Segoe UI", 12, "bold"),
                             background=self.colors['card'],
                             foreground=self.colors['text'])
+        
+        # Expense lists
+        self.style.configure("Treeview",
+                            background=self.colors['card'],
+                            fieldbackground=self.colors['card'],
+                            foreground=self.colors['text'])
 
     def setup_theme_settings(self):
         # Theme colors
@@ -148,6 +246,7 @@ class MonthlyKharcha:
             }
         }
         self.current_theme = 'light'
+        self._themed_widgets = []
         
         # Set initial theme
         ctk.set_appearance_mode("light")
@@ -164,56 +263,69 @@ class MonthlyKharcha:
         # Update ttk styles
         self._setup_styles()
         
-        # Update all frames and widgets
-        self.refresh_ui()
-
-    def refresh_ui(self):
-        """Refresh the UI with new theme colors"""
-        # Recreate the tabs with new theme
-        for tab in self.notebook.tabs():
-            self.notebook.forget(tab)
-        
-        # Recreate tabs
-        dashboard_tab = ttk.Frame(self.notebook, style="Dashboard.TFrame")
-        expenses_tab = ttk.Frame(self.notebook)
-        summary_tab = ttk.Frame(self.notebook)
-        settings_tab = ttk.Frame(self.notebook)
+        # Recolor the widgets that take colors directly instead of a style
+        self._themed_widgets = [(widget, option, key)
+                                for widget, option, key in self._themed_widgets
+                                if widget.winfo_exists()]
+        for widget, option, key in self._themed_widgets:
+            widget.configure(**{option: self.colors[key]})
         
-        self.notebook.add(dashboard_tab, text=' Dashboard ')
-        self.notebook.add(expenses_tab, text=' Add Expenses ')
-        self.notebook.add(summary_tab, text=' Monthly Summary ')
-        self.notebook.add(settings_tab, text=' Settings ')
-        
-        self.setup_dashboard_tab(dashboard_tab)
-        self.setup_expenses_tab(expenses_tab)
-        self.setup_summary_tab(summary_tab)
-        self.setup_settings_tab(settings_tab)
+        if self.chart_renderer is not None:
+            self.chart_renderer.set_theme(self.current_theme, self.colors)
+        self.refresh.invalidate('balance_labels', 'graphs')
+
+    def _themed(self, widget, **options):
+        """
+        Give a widget colors from the current theme and keep them in step
+        when the theme changes.  Options map to keys of ``self.colors``.
+        """
+        widget.configure(**{option: self.colors[key] for option, key in options.items()})
+        self._themed_widgets.extend((widget, option, key) for option, key in options.items())
+        return widget
 
     def setup_gui(self):
         self.notebook = ttk.Notebook(self.window)
         self.notebook.pack(expand=True, fill='both', padx=5, pady=5)
+        self.notebook.bind('<<NotebookTabChanged>>',
+                           lambda e: self._build_tab(self.notebook.select()))
         
-        dashboard_tab = ttk.Frame(self.notebook, style="Dashboard.TFrame")
-        expenses_tab = ttk.Frame(self.notebook)
-        summary_tab = ttk.Frame(self.notebook)
-        settings_tab = ttk.Frame(self.notebook)
-        
-        self.notebook.add(dashboard_tab, text=' Dashboard ')
-        self.notebook.add(expenses_tab, text=' Add Expenses ')
-        self.notebook.add(summary_tab, text=' Monthly Summary ')
-        self.notebook.add(settings_tab, text=' Settings ')
-        
-        self.setup_dashboard_tab(dashboard_tab)
-        self.setup_expenses_tab(expenses_tab)
-        self.setup_summary_tab(summary_tab)
-        self.setup_settings_tab(settings_tab)
+        self._add_tabs()
+
+    def _add_tabs(self):
+        """
+        Add the notebook tabs as empty frames.  Each tab is built the first
+        time it is selected, so startup only pays for the one on screen.
+        """
+        self._tab_setups = {}
+        self._built_tabs = set()
+        for name, text, setup, style in (
+                ('dashboard_tab', ' Dashboard ', self.setup_dashboard_tab, "Dashboard.TFrame"),
+                ('expenses_tab', ' Add Expenses ', self.setup_expenses_tab, "TFrame"),
+                ('summary_tab', ' Monthly Summary ', self.setup_summary_tab, "TFrame"),
+                ('settings_tab', ' Settings ', self.setup_settings_tab, "TFrame")):
+            frame = ttk.Frame(self.notebook, style=style)
+            self.notebook.add(frame, text=text)
+            self._tab_setups[str(frame)] = (name, setup, frame)
+        self._build_tab(self.notebook.select())
+
+    def _build_tab(self, tab_id):
+        if tab_id not in self._tab_setups:
+            return
+        name, setup, frame = self._tab_setups[tab_id]
+        if name in self._built_tabs:
+            return
+        setup(frame)
+        self._built_tabs.add(name)
+        if hasattr(self, 'refresh'):
+            # Views on the new tab still show their placeholders
+            self.refresh.invalidate(name)
 
     def setup_dashboard_tab(self, parent):
         # Create a canvas with scrollbar for the entire dashboard
         container = ttk.Frame(parent)
         container.pack(fill='both', expand=True)
         
-        canvas = tk.Canvas(container, bg=self.colors['secondary'])
+        canvas = self._themed(tk.Canvas(container), bg='secondary')
         scrollbar = ttk.Scrollbar(container, orient="vertical", command=canvas.yview)
         
         # Create the main frame that will contain all content
@@ -315,11 +427,11 @@ class MonthlyKharcha:
                      style="SubHeader.TLabel").pack(pady=(0,15))
             
             for text, command, color in buttons:
-                ctk.CTkButton(frame,
-                             text=text,
-                             command=command,
-                             fg_color=self.colors[color],
-                             **button_style).pack(pady=5, fill='x')
+                self._themed(ctk.CTkButton(frame,
+                                           text=text,
+                                           command=command,
+                                           **button_style),
+                             fg_color=color).pack(pady=5, fill='x')
         
         # AI Insights section
         insights_frame = ttk.LabelFrame(content_frame, 
@@ -335,57 +447,34 @@ class MonthlyKharcha:
         # Store insights content frame reference
         self.insights_content = insights_content
         
+        insight_list = TextList(insights_content, boxed=True, wraplength=800)
+        
+        def insight_icon(insight):
+            """Choose icon based on content"""
+            insight = insight.lower()
+            if "average" in insight:
+                return "📊"
+            if "contributor" in insight or "payer" in insight:
+                return "👤"
+            if "settlement" in insight:
+                return "🔄"
+            if "recent" in insight:
+                return "🕒"
+            if "recommended" in insight:
+                return "💡"
+            if "category" in insight:
+                return "📑"
+            return "💰"
+        
         def update_insights():
             try:
-                # Clear previous insights
-                for widget in insights_content.winfo_children():
-                    widget.destroy()
-                
-                # Get insights
                 insights = self.get_expense_insights()
-                
                 if insights:
-                    for insight in insights:
-                        # Create container for each insight
-                        insight_frame = ttk.Frame(insights_content, style="Card.TFrame")
-                        insight_frame.pack(fill='x', pady=5, padx=5)
-                        
-                        # Choose icon based on content
-                        icon = "💰"
-                        if "average" in insight.lower():
-                            icon = "📊"
-                        elif "contributor" in insight.lower() or "payer" in insight.lower():
-                            icon = "👤"
-                        elif "settlement" in insight.lower():
-                            icon = "🔄"
-                        elif "recent" in insight.lower():
-                            icon = "🕒"
-                        elif "recommended" in insight.lower():
-                            icon = "💡"
-                        elif "category" in insight.lower():
-                            icon = "📑"
-                        
-                        # Add insight with icon
-                        label = ttk.Label(
-                            insight_frame,
-                            text=f"{icon} {insight}",
-                            style="Card.TLabel",
-                            wraplength=800
-                        )
-                        label.pack(fill='x', pady=5, padx=10)
-                        
-                        # Add separator except for last insight
-                        if insight != insights[-1]:
-                            ttk.Separator(insights_content, orient='horizontal').pack(fill='x', pady=2)
+                    texts = [f"{insight_icon(insight)} {insight}" for insight in insights]
                 else:
-                    ttk.Label(
-                        insights_content,
-                        text="🔍 No insights available - Add some expenses to get started!",
-                        style="Card.TLabel"
-                    ).pack(pady=10)
+                    texts = ["🔍 No insights available - Add some expenses to get started!"]
                 
-                # Force update
-                self.window.update_idletasks()
+                insight_list.set(texts)
                 
             except Exception as e:
                 print(f"Error in update_insights: {str(e)}")
@@ -401,9 +490,8 @@ class MonthlyKharcha:
         )
         refresh_btn.pack(anchor='e', pady=(0, 10), padx=10)
         
-        # Store update function and run initial update
+        # Store update function; the first fill comes from the refresh pass
         self.update_insights = update_insights
-        update_insights()
 
     def _create_stat_card(self, parent, title, value, subtitle, column):
         """Creates a modern statistics card with shadow effect"""
@@ -434,19 +522,27 @@ class MonthlyKharcha:
         # Subtitle with secondary color
         ttk.Label(inner_frame, 
                  text=subtitle,
-                 foreground=self.colors['text_secondary'],
-                 style="Card.TLabel").pack(anchor='w')
+                 style="Subtitle.TLabel").pack(anchor='w')
         
         return card
 
     def clear_all_balances(self):
         if messagebox.askyesno("Confirm", "Are you sure you want to clear all balances? This will mark all debts as settled."):
+            self._reload_stored_months()
             self.current_data['balances'] = {name: 0 for name in self.roommates}
-            self.save_data()
-            self.update_balances()
+            try:
+                self.save_data()
+            except BookChangedError as e:
+                self._reload_stored_months()
+                messagebox.showerror("Error", f"Balances were not cleared: {str(e)}. "
+                                     "The month has been reloaded; please try again.")
+                return
+            self.refresh.invalidate('balances')
             messagebox.showinfo("Success", "All balances have been cleared!")
 
     def record_settlement(self):
+        from tkcalendar import DateEntry
+        
         settlement_window = tk.Toplevel(self.window)
         settlement_window.title("Record Settlement")
         settlement_window.geometry("600x600")
@@ -474,12 +570,9 @@ class MonthlyKharcha:
         balance_frame = ttk.LabelFrame(main_frame, text="Current Balances", padding=10)
         balance_frame.pack(fill='x', pady=(0, 20))
         
-        for name, balance in self.current_data['balances'].items():
-            status = "to receive" if balance > 0 else "to pay"
-            amount = abs(balance)
-            ttk.Label(balance_frame,
-                     text=f"{name}: ₨ {amount:,.2f} ({status})",
-                     style="Card.TLabel").pack(anchor='w', pady=2)
+        TextList(balance_frame).set(
+            f"{name}: ₨ {abs(balance):,.2f} ({'to receive' if balance > 0 else 'to pay'})"
+            for name, balance in self.current_data['balances'].items())
         
         form_frame = ttk.LabelFrame(main_frame, text="Settlement Details", padding=20)
         form_frame.pack(fill='x', pady=10)
@@ -522,12 +615,11 @@ class MonthlyKharcha:
             from_person = from_cb.get()
             to_person = to_cb.get()
             if from_person and to_person and from_person != to_person:
-                from_balance = self.current_data['balances'].get(from_person, 0)
-                to_balance = self.current_data['balances'].get(to_person, 0)
-                if from_balance < 0 and to_balance > 0:
-                    suggested = min(abs(from_balance), to_balance)
-                    amount_entry.delete(0, 'end')
-                    amount_entry.insert(0, f"{suggested:.2f}")
+                for settlement in self.suggest_settlement_plan():
+                    if settlement['from'] == from_person and settlement['to'] == to_person:
+                        amount_entry.delete(0, 'end')
+                        amount_entry.insert(0, f"{settlement['amount']:.2f}")
+                        break
         
         from_cb.configure(command=update_suggested_amount)
         to_cb.configure(command=update_suggested_amount)
@@ -545,18 +637,20 @@ class MonthlyKharcha:
                 if from_person == to_person:
                     raise ValueError("From and To person cannot be the same")
                 
-                settlement_expense = {
+                settlement_expense = Expense({
+                    'id': new_expense_id(),
                     'category': 'Settlement',
                     'description': f'Settlement payment from {from_person} to {to_person}',
                     'amount': amount,
                     'paid_by': from_person,
                     'shared_between': [to_person],
-                    'date': date.strftime("%Y-%m-%d %H:%M:%S")
-                }
+                    'date': date.strftime(DATE_FORMAT)
+                })
                 
-                self.current_data['expenses'].append(settlement_expense)
-                self.save_data()
-                self.update_balances()
+                self.book.record_settlement(settlement_expense)
+                if 'summary_tab' in self._built_tabs:
+                    self.expense_list.insert(settlement_expense)
+                self.refresh.invalidate('expenses')
                 
                 settlement_window.destroy()
                 messagebox.showinfo("Success", 
@@ -584,25 +678,18 @@ class MonthlyKharcha:
                                         padding=10)
         suggestion_frame.pack(fill='x', pady=(0, 20))
         
+        suggestion_list = TextList(suggestion_frame)
+        
         def show_suggestions():
-            # Clear previous suggestions
-            for widget in suggestion_frame.winfo_children():
-                if widget != suggest_btn:
-                    widget.destroy()
-            
             # Get and display settlement suggestions
             plan = self.suggest_settlement_plan()
             if plan:
-                for settlement in plan:
-                    suggestion_text = (f"{settlement['from']} should pay "
-                                    f"₨ {settlement['amount']:,.2f} to {settlement['to']}")
-                    ttk.Label(suggestion_frame,
-                            text="💡 " + suggestion_text,
-                            style="Card.TLabel").pack(anchor='w', pady=2)
+                suggestion_list.set(
+                    f"💡 {settlement['from']} should pay "
+                    f"₨ {settlement['amount']:,.2f} to {settlement['to']}"
+                    for settlement in plan)
             else:
-                ttk.Label(suggestion_frame,
-                         text="No settlements needed at this time",
-                         style="Card.TLabel").pack(pady=5)
+                suggestion_list.set(["No settlements needed at this time"])
         
         suggest_btn = ctk.CTkButton(suggestion_frame,
                                   text="Get AI Suggestions",
@@ -613,59 +700,43 @@ class MonthlyKharcha:
         if messagebox.askyesno("Confirm", "Start a new month? This will:\n1. Archive current month's data\n2. Clear all balances\n3. Start fresh expense tracking"):
             current_date = datetime.now()
             
-            category_totals = {category: 0 for category in self.categories}
-            for expense in self.current_data['expenses']:
-                category_totals[expense['category']] += expense['amount']
-            
-            archive_data = {
-                'month_data': self.current_data,
-                'month_summary': {
-                    'total_expenses': sum(expense['amount'] for expense in self.current_data['expenses']),
-                    'category_totals': category_totals,
-                    'final_balances': self.current_data['balances'],
-                    'expense_count': len(self.current_data['expenses']),
-                    'archive_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                }
-            }
-            
-            archive_file = self.data_dir / f"archive_{current_date.year}_{current_date.month}.json"
-            with open(archive_file, 'w') as f:
-                json.dump(archive_data, f, indent=4)
+            self._reload_stored_months()
+            try:
+                archive_data = self.book.start_new_month(self.categories, current_date)
+            except BookChangedError as e:
+                self._reload_stored_months()
+                messagebox.showerror("Error", f"The month was not archived: {str(e)}. "
+                                     "The month has been reloaded; please try again.")
+                return
             
             self.export_monthly_archive(archive_data, current_date)
             
-            self.initialize_new_data()
-            self.update_balances()
+            self.refresh.invalidate('month')
             messagebox.showinfo("Success", "New month started successfully!\nPrevious month's data has been archived.")
 
     def update_balances(self):
-        if not hasattr(self, '_last_update') or time.time() - self._last_update > 1.0:
-            balances = {name: 0 for name in self.roommates}
-            
-            for expense in self.current_data['expenses']:
-                paid_by = expense['paid_by']
-                amount = expense['amount']
-                sharing_people = expense['shared_between']
-                share_per_person = amount / len(sharing_people)
-                
-                balances[paid_by] += amount
-                for person in sharing_people:
-                    balances[person] -= share_per_person
-            
-            # Find largest pending settlement
-            largest_settlement = 0
-            for name, balance in balances.items():
-                if abs(balance) > largest_settlement:
-                    largest_settlement = abs(balance)
-            
-            # Update largest settlement display with color coding
-            if hasattr(self, 'largest_settlement_label'):
-                self.largest_settlement_label.config(
-                    text=f"₨ {largest_settlement:,.2f}",
-                    foreground="red" if largest_settlement > 0 else self.colors['primary']
-                )
-            
-            # Update balance display
+        self.book.update_balances(verify=self.verify_ledger)
+
+    def update_balance_labels(self):
+        """Show the balances on whichever of their tabs have been built"""
+        balances = self.current_data['balances']
+        
+        # Find largest pending settlement
+        largest_settlement = 0
+        for name, balance in balances.items():
+            if abs(balance) > largest_settlement:
+                largest_settlement = abs(balance)
+        
+        # Update largest settlement display with color coding
+        if 'dashboard_tab' in self._built_tabs:
+            self.largest_settlement_label.config(
+                text=f"₨ {largest_settlement:,.2f}",
+                foreground="red" if largest_settlement > 0 else self.colors['primary']
+            )
+            self.total_expenses_label.config(text=f"₨ {self.ledger.total:,.2f}")
+        
+        # Update balance display
+        if 'expenses_tab' in self._built_tabs:
             for name, balance in balances.items():
                 if name in self.balance_labels:
                     color = "green" if balance >= 0 else "red"
@@ -674,57 +745,32 @@ class MonthlyKharcha:
                         text=formatted_balance,
                         foreground=color
                     )
-            
-            total_expenses = sum(expense['amount'] for expense in self.current_data['expenses'])
-            self.total_expenses_label.config(text=f"₨ {total_expenses:,.2f}")
-            
-            self.current_data['balances'] = balances
-            self._last_update = time.time()
-            self._balance_cache = balances
-            
-            # Update graphs if they exist
-            if hasattr(self, 'update_graphs'):
-                self.update_graphs()
-            
-            # Update insights
-            if hasattr(self, 'update_insights'):
-                self.update_insights()
 
     def load_current_month(self):
         current_date = datetime.now()
-        self.current_file = self.data_dir / f"{current_date.year}_{current_date.month}.json"
-        
-        if self.current_file.exists():
-            try:
-                with open(self.current_file, 'r') as f:
-                    self.current_data = json.load(f)
-                self.roommates = self.current_data.get('roommates', self.roommates)
-                self.analyze_spending_patterns()  # Analyze existing data
-            except json.JSONDecodeError:
-                self.initialize_new_data()
-        else:
-            self.initialize_new_data()
-    
-    def initialize_new_data(self):
-        self.current_data = {
-            'roommates': self.roommates,
-            'expenses': [],
-            'shared_expenses': {
-                'rent': 0,
-                'electricity': 0,
-                'internet': 0,
-                'gas': 0  # Added Gas to shared expenses
-            },
-            'food_sharing': ["Danish", "Umair", "Nisar"],
-            'balances': {name: 0 for name in self.roommates}
-        }
-        self.save_data()
+        roommates = DEFAULT_ROOMMATES if self.book is None else self.roommates
+        self.book = MonthBook.open(self.storage, current_date.year, current_date.month, roommates)
     
     def save_data(self):
-        with open(self.current_file, 'w') as f:
-            json.dump(self.current_data, f, indent=4)
+        """Write the whole current month to storage"""
+        self.book.save()
+    
+    def on_close(self):
+        """Flush pending storage writes before the window closes"""
+        self.refresh.cancel()
+        if self.chart_renderer is not None:
+            self.chart_renderer.close()
+        if self.archives is not None:
+            self.archives.close()
+        try:
+            self.storage.close()
+        except Exception as e:
+            print(f"Error closing storage: {str(e)}")
+        self.window.destroy()
     
     def setup_expenses_tab(self, parent):
+        from tkcalendar import DateEntry
+        
         # Use a PanedWindow for better control of sections
         paned = ttk.PanedWindow(parent, orient='vertical')
         paned.pack(fill='both', expand=True)
@@ -843,19 +889,17 @@ class MonthlyKharcha:
         category_frame = ttk.Frame(graphs_container)
         category_frame.grid(row=0, column=0, sticky='nsew', padx=10, pady=10)
         
-        self.category_fig = plt.Figure(figsize=(6, 4), dpi=100)
-        self.category_ax = self.category_fig.add_subplot(111)
-        self.category_canvas = FigureCanvasTkAgg(self.category_fig, category_frame)
-        self.category_canvas.get_tk_widget().pack(fill='both', expand=True)
+        from .charts import CategoryPieChart, ChartRenderer, ChartView, PersonBarChart
+        if self.chart_renderer is None:
+            self.chart_renderer = ChartRenderer(self.window)
+            self.chart_renderer.set_theme(self.current_theme, self.colors)
+        self.category_view = ChartView(category_frame, self.chart_renderer, CategoryPieChart)
         
         # Person bar chart
         person_frame = ttk.Frame(graphs_container)
         person_frame.grid(row=0, column=1, sticky='nsew', padx=10, pady=10)
         
-        self.person_fig = plt.Figure(figsize=(6, 4), dpi=100)
-        self.person_ax = self.person_fig.add_subplot(111)
-        self.person_canvas = FigureCanvasTkAgg(self.person_fig, person_frame)
-        self.person_canvas.get_tk_widget().pack(fill='both', expand=True)
+        self.person_view = ChartView(person_frame, self.chart_renderer, PersonBarChart)
         
         # Pack canvas and scrollbar
         canvas.pack(side='left', fill='both', expand=True)
@@ -868,125 +912,18 @@ class MonthlyKharcha:
         def on_mousewheel(event):
             canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
         canvas.bind_all("<MouseWheel>", on_mousewheel)
-        
-        # Initial graph update
-        self.update_graphs()
 
     def update_graphs(self):
         try:
-            # Clear previous plots
-            self.category_ax.clear()
-            self.person_ax.clear()
-            
-            # Set font sizes
-            TITLE_SIZE = 12
-            LABEL_SIZE = 10
-            VALUE_SIZE = 9
+            # Category-wise spending, without categories with zero spending
+            # Charts are rendered in the background and shown when ready
+            category_totals = {k: v for k, v in self.ledger.category_totals.items() if v > 0}
+            self.category_view.show(category_totals)
             
-            # Category-wise spending pie chart
-            category_totals = defaultdict(float)
-            for expense in self.current_data['expenses']:
-                category_totals[expense['category']] += expense['amount']
-            
-            # Filter out categories with zero spending
-            category_totals = {k: v for k, v in category_totals.items() if v > 0}
-            
-            if category_totals:
-                # Use a colorful but professional color palette
-                colors = plt.cm.Set3(np.linspace(0, 1, len(category_totals)))
-                
-                patches, texts, autotexts = self.category_ax.pie(
-                    category_totals.values(),
-                    labels=[f"{k}" for k in category_totals.keys()],
-                    autopct='%1.1f%%',
-                    startangle=90,
-                    colors=colors,
-                    textprops={'fontsize': LABEL_SIZE}
-                )
-                
-                # Make percentage labels more readable
-                plt.setp(autotexts, size=VALUE_SIZE, weight='bold')
-                plt.setp(texts, size=LABEL_SIZE)
-                
-                # Add legend with amounts
-                legend_labels = [f"{k}\n₨{v:,.0f}" for k, v in category_totals.items()]
-                self.category_ax.legend(
-                    patches, legend_labels,
-                    title="Categories",
-                    loc="center left",
-                    bbox_to_anchor=(1.0, 0.5),
-                    fontsize=LABEL_SIZE,
-                    title_fontsize=LABEL_SIZE
-                )
-                
-                self.category_ax.set_title("Spending by Category", 
-                                         pad=20, 
-                                         fontsize=TITLE_SIZE, 
-                                         fontweight='bold')
-            else:
-                self.category_ax.text(0.5, 0.5, "No expenses yet",
-                                    ha='center', va='center',
-                                    fontsize=TITLE_SIZE)
-            
-            # Person-wise spending bar chart
-            person_totals = defaultdict(float)
-            for expense in self.current_data['expenses']:
-                person_totals[expense['paid_by']] += expense['amount']
-            
-            if person_totals:
-                names = list(person_totals.keys())
-                amounts = list(person_totals.values())
-                
-                # Create bars with nice colors
-                bars = self.person_ax.bar(
-                    names, amounts,
-                    color=plt.cm.Set3(np.linspace(0, 1, len(names))),
-                    width=0.6
-                )
-                
-                # Add value labels on bars
-                for bar in bars:
-                    height = bar.get_height()
-                    self.person_ax.text(
-                        bar.get_x() + bar.get_width()/2.,
-                        height,
-                        f'₨{int(height):,}',
-                        ha='center',
-                        va='bottom',
-                        fontsize=VALUE_SIZE,
-                        fontweight='bold'
-                    )
-                
-                # Customize appearance
-                self.person_ax.set_title("Amount Paid by Each Person",
-                                       pad=20,
-                                       fontsize=TITLE_SIZE,
-                                       fontweight='bold')
-                self.person_ax.set_ylabel("Amount (₨)",
-                                        fontsize=LABEL_SIZE)
-                
-                # Rotate and align the tick labels so they look better
-                self.person_ax.tick_params(axis='both', which='major', labelsize=LABEL_SIZE)
-                plt.setp(self.person_ax.get_xticklabels(),
-                        rotation=45,
-                        ha='right',
-                        rotation_mode='anchor')
-                
-                # Add some padding to prevent label cutoff
-                self.person_ax.margins(y=0.2)
-                
-            else:
-                self.person_ax.text(0.5, 0.5, "No expenses yet",
-                                  ha='center', va='center',
-                                  fontsize=TITLE_SIZE)
-            
-            # Adjust layouts to prevent text cutoff
-            self.category_fig.tight_layout()
-            self.person_fig.tight_layout()
-            
-            # Redraw canvases
-            self.category_canvas.draw()
-            self.person_canvas.draw()
+            # Person-wise spending
+            person_totals = {name: total for name, total in self.ledger.payments.items()
+                             if self.ledger.payment_counts[name]}
+            self.person_view.show(person_totals)
             
         except Exception as e:
             print(f"Error updating graphs: {str(e)}")
@@ -1011,20 +948,8 @@ class MonthlyKharcha:
         
         # Create treeview for expenses
         columns = ('Date', 'Category', 'Description', 'Amount', 'Paid By', 'Shared Between')
-        self.expense_tree = ttk.Treeview(expenses_frame, columns=columns, show='headings')
-        
-        # Configure columns
-        for col in columns:
-            self.expense_tree.heading(col, text=col)
-            self.expense_tree.column(col, width=100)
-        
-        # Add scrollbar
-        scrollbar = ttk.Scrollbar(expenses_frame, orient="vertical", command=self.expense_tree.yview)
-        self.expense_tree.configure(yscrollcommand=scrollbar.set)
-        
-        # Pack tree and scrollbar
-        self.expense_tree.pack(side='left', fill='x', expand=True)
-        scrollbar.pack(side='right', fill='y')
+        self.expense_list = VirtualExpenseList(expenses_frame, columns, self._expense_row)
+        self.expense_tree = self.expense_list.tree
         
         # Create a frame for buttons
         button_frame = ttk.Frame(expenses_frame)
@@ -1060,51 +985,34 @@ class MonthlyKharcha:
         # Update expense list
         self.update_expense_list()
 
-    def update_expense_list(self):
-        """Update the expense list in the summary tab"""
-        # Clear existing items
-        for item in self.expense_tree.get_children():
-            self.expense_tree.delete(item)
-        
-        # Add expenses sorted by date
-        sorted_expenses = sorted(
-            self.current_data['expenses'],
-            key=lambda x: datetime.strptime(x['date'], "%Y-%m-%d %H:%M:%S"),
-            reverse=True
+    def _expense_row(self, expense):
+        """Values shown for an expense in the expense lists"""
+        return (
+            expense['date'],
+            expense['category'],
+            expense['description'],
+            f"₨ {expense['amount']:,.2f}",
+            expense['paid_by'],
+            ', '.join(expense['shared_between'])
         )
-        
-        for expense in sorted_expenses:
-            self.expense_tree.insert('', 'end', values=(
-                expense['date'],
-                expense['category'],
-                expense['description'],
-                f"₨ {expense['amount']:,.2f}",
-                expense['paid_by'],
-                ', '.join(expense['shared_between'])
-            ))
+
+    def update_expense_list(self):
+        """Reload the whole expense list in the summary tab"""
+        # Single changes go through expense_list.insert/update/delete
+        self.expense_list.set_expenses(self.current_data['expenses'])
 
     def edit_expense(self):
         """Edit selected expense"""
-        selected = self.expense_tree.selection()
+        from tkcalendar import DateEntry
+        
+        selected = self.expense_list.selection()
         if not selected:
             messagebox.showwarning("No Selection", "Please select an expense to edit")
             return
         
-        # Get selected expense
-        item = selected[0]
-        values = self.expense_tree.item(item)['values']
-        
-        # Find the expense in the data
-        expense_date = values[0]
-        expense_desc = values[2]
-        target_expense = None
-        
-        for i, expense in enumerate(self.current_data['expenses']):
-            if (expense['date'] == expense_date and 
-                expense['description'] == expense_desc):
-                target_expense = expense
-                expense_index = i
-                break
+        # Rows are keyed by expense ID
+        expense_id = selected[0]
+        target_expense = self.book.index.get(expense_id)
         
         if not target_expense:
             messagebox.showerror("Error", "Could not find expense")
@@ -1126,8 +1034,7 @@ class MonthlyKharcha:
                               background=self.colors['primary'],
                               foreground='white')
         # Set the current date from the expense
-        current_date = datetime.strptime(target_expense['date'], "%Y-%m-%d %H:%M:%S")
-        date_entry.set_date(current_date)
+        date_entry.set_date(timestamp_datetime(target_expense.ts))
         date_entry.pack(fill='x', pady=5)
         
         ttk.Label(main_frame, text="Category:").pack(anchor='w')
@@ -1170,21 +1077,18 @@ class MonthlyKharcha:
                     raise ValueError("At least one person must share the expense")
                 
                 # Update expense
-                self.current_data['expenses'][expense_index] = {
+                updated_expense = Expense({
+                    'id': expense_id,
                     'category': category_cb.get(),
                     'description': desc_entry.get(),
                     'amount': amount,
                     'paid_by': paid_by_cb.get(),
                     'shared_between': shared_between,
-                    'date': date_entry.get_date().strftime("%Y-%m-%d %H:%M:%S")  # Use new date
-                }
-                
-                # Save changes
-                self.save_data()
-                self.update_balances()
-                self.update_expense_list()
-                if self.summary_text.get(1.0, tk.END).strip():
-                    self.calculate_summary()
+                    'date': date_entry.get_date().strftime(DATE_FORMAT)  # Use new date
+                })
+                self.book.replace(expense_id, updated_expense)
+                self.expense_list.update(updated_expense)
+                self.refresh.invalidate('expenses')
                 
                 edit_window.destroy()
                 messagebox.showinfo("Success", "Expense updated successfully!")
@@ -1201,50 +1105,34 @@ class MonthlyKharcha:
 
     def delete_expense(self):
         """Delete selected expense"""
-        selected = self.expense_tree.selection()
+        selected = self.expense_list.selection()
         if not selected:
             messagebox.showwarning("No Selection", "Please select an expense to delete")
             return
         
         # Get selected expense
         item = selected[0]
-        values = self.expense_tree.item(item)['values']
+        target_expense = self.book.index.get(item)
+        if not target_expense:
+            messagebox.showerror("Error", "Could not find expense to delete")
+            return
         
         # Confirm deletion
         if not messagebox.askyesno("Confirm Delete", 
                                   f"Are you sure you want to delete this expense?\n\n"
-                                  f"Description: {values[2]}\n"
-                                  f"Amount: {values[3]}\n"
-                                  f"Date: {values[0]}"):
+                                  f"Description: {target_expense['description']}\n"
+                                  f"Amount: ₨ {target_expense['amount']:,.2f}\n"
+                                  f"Date: {target_expense['date']}"):
             return
         
-        # Find the expense in the data
-        expense_date = values[0]
-        expense_desc = values[2]
+        # Remove the expense and save the change
+        self.book.remove(item)
         
-        for i, expense in enumerate(self.current_data['expenses']):
-            if (expense['date'] == expense_date and 
-                expense['description'] == expense_desc):
-                # Remove the expense
-                self.current_data['expenses'].pop(i)
-                
-                # Save changes
-                self.save_data()
-                
-                # Update everything
-                self.update_balances()
-                self.update_expense_list()
-                if self.summary_text.get(1.0, tk.END).strip():
-                    self.calculate_summary()
-                
-                # Update graphs if they exist
-                if hasattr(self, 'update_graphs'):
-                    self.update_graphs()
-                
-                messagebox.showinfo("Success", "Expense deleted successfully!")
-                return
+        # Update everything
+        self.expense_list.delete(item)
+        self.refresh.invalidate('expenses')
         
-        messagebox.showerror("Error", "Could not find expense to delete")
+        messagebox.showinfo("Success", "Expense deleted successfully!")
 
     def setup_settings_tab(self, parent):
         settings_frame = ttk.LabelFrame(parent, text="Settings", padding=10)
@@ -1276,6 +1164,44 @@ class MonthlyKharcha:
                   command=self.add_roommate).pack(side='left', padx=5)
         ttk.Button(btn_frame, text="Remove Roommate", 
                   command=self.remove_roommate).pack(side='left', padx=5)
+        
+        # Storage settings
+        storage_frame = ttk.LabelFrame(settings_frame, text="Data Storage", padding=10)
+        storage_frame.pack(fill='x', pady=10)
+        
+        backend = "JSON files" if isinstance(self.storage, JSONStorage) else "SQLite database"
+        self.storage_label = ttk.Label(storage_frame,
+                                       text=f"Storing data in {backend} at {self.data_dir}",
+                                       style="Card.TLabel")
+        self.storage_label.pack(anchor='w', pady=5)
+        
+        if isinstance(self.storage, JSONStorage):
+            ttk.Button(storage_frame, text="Move Data to SQLite",
+                      command=self.migrate_to_sqlite).pack(anchor='w', pady=5)
+    
+    def migrate_to_sqlite(self):
+        """Import all month files into a SQLite database and switch to it"""
+        if not isinstance(self.storage, JSONStorage):
+            messagebox.showinfo("Storage", "Data is already stored in SQLite.")
+            return
+        if not messagebox.askyesno("Confirm", "Move all months into a SQLite database?\n"
+                                   "The existing JSON files are kept as a backup."):
+            return
+        try:
+            if self.archives is not None:
+                self.archives.close()
+                self.archives = None
+            self.expense_predictor = None
+            self.storage.close()
+            imported = migrate_json_to_sqlite(self.data_dir)
+            self.storage = open_storage(self.data_dir)
+            self.load_current_month()
+            self.refresh.invalidate('month')
+            self.storage_label.config(text=f"Storing data in SQLite database at {self.data_dir}")
+            messagebox.showinfo("Success", f"Imported {len(imported)} month files into SQLite.")
+        except Exception as e:
+            messagebox.showerror("Error", f"Migration failed: {str(e)}")
+            traceback.print_exc()
     
     def add_expense(self, category, description, amount, paid_by, shared_between, date):
         try:
@@ -1293,54 +1219,38 @@ class MonthlyKharcha:
             if not sharing_people:
                 raise ValueError("At least one person must share the expense")
             
-            expense = {
+            expense = Expense({
+                'id': new_expense_id(),
                 'category': category,
                 'description': description,
                 'amount': amount,
                 'paid_by': paid_by,
                 'shared_between': sharing_people,
-                'date': date.strftime("%Y-%m-%d %H:%M:%S")
-            }
+                'date': date.strftime(DATE_FORMAT)
+            })
 
             # Determine which file to update based on the date
             expense_date = date
             current_date = datetime.now()
+            month_start, month_end = month_bounds(current_date.year, current_date.month)
             
             # Check if expense is for current month
-            if (expense_date.year == current_date.year and 
-                expense_date.month == current_date.month):
+            if month_start <= expense.ts < month_end:
                 # Add to current month's data
-                self.current_data['expenses'].append(expense)
-                self.update_balances()
-                self.save_data()
-                self.update_expense_list()
-                
-                if hasattr(self, 'update_insights'):
-                    self.update_insights()
+                self.book.add(expense)
+                if 'summary_tab' in self._built_tabs:
+                    self.expense_list.insert(expense)
+                self.refresh.invalidate('expenses')
                     
                 messagebox.showinfo(
                     "Success", 
                     f"Expense added to current month!\nAmount: ₨ {amount:,.2f}"
                 )
             else:
-                # Look for existing file for the target month
-                target_date = f"{expense_date.year}_{expense_date.month:02d}"
-                possible_files = [
-                    self.data_dir / f"{expense_date.year}_{expense_date.month:02d}.json",  # YYYY_MM.json
-                    self.data_dir / f"{expense_date.year}_{expense_date.month}.json",      # YYYY_M.json
-                    self.data_dir / f"archive_{expense_date.year}_{expense_date.month:02d}.json"  # archive_YYYY_MM.json
-                ]
-
-                target_file = None
-                for file in possible_files:
-                    if file.exists():
-                        target_file = file
-                        break
+                # Look up the stored month the expense belongs to
+                target_book = self.storage.find_book(expense_date.year, expense_date.month)
 
-                if not target_file:
-                    # Debug print
-                    print(f"Searched for files: {[str(f) for f in possible_files]}")
-                    print(f"Available files in directory: {list(self.data_dir.glob('*.json'))}")
+                if target_book is None:
                     messagebox.showerror(
                         "Error", 
                         f"No existing data found for {expense_date.strftime('%B %Y')}.\n"
@@ -1349,30 +1259,9 @@ class MonthlyKharcha:
                     return
 
                 try:
-                    # Load existing data
-                    with open(target_file, 'r') as f:
-                        month_data = json.load(f)
-
-                    # Add new expense
-                    month_data['expenses'].append(expense)
-
-                    # Recalculate balances
-                    balances = {name: 0 for name in month_data.get('roommates', self.roommates)}
-                    for exp in month_data['expenses']:
-                        paid_by_person = exp['paid_by']
-                        exp_amount = exp['amount']
-                        exp_sharing = exp['shared_between']
-                        share_per_person = exp_amount / len(exp_sharing)
-                        
-                        balances[paid_by_person] += exp_amount
-                        for person in exp_sharing:
-                            balances[person] -= share_per_person
-                        
-                    month_data['balances'] = balances
-
-                    # Save updated data back to the same file
-                    with open(target_file, 'w') as f:
-                        json.dump(month_data, f, indent=4)
+                    # A single append; balances are derived when the month is loaded
+                    self.storage.add_expense(target_book, expense)
+                    self._stored_months_changed()
 
                     # Refresh archives display if it's open
                     if hasattr(self, 'archive_window') and self.archive_window.winfo_exists():
@@ -1391,86 +1280,30 @@ class MonthlyKharcha:
                     )
                     return
 
-            # Update summary if it's open
-            if self.summary_text.get(1.0, tk.END).strip():
-                self.calculate_summary()
-
         except ValueError as e:
             messagebox.showerror("Error", str(e))
     
     def calculate_summary(self):
         """Generate a clear and focused summary of expenses and balances"""
-        summary = "Monthly Summary\n" + "="*30 + "\n\n"
-        
-        # Total expenses for the month
-        total_expenses = sum(expense['amount'] for expense in self.current_data['expenses'])
-        summary += f"Total Monthly Expenses: ₨ {total_expenses:,.2f}\n\n"
-        
-        # Per person payment breakdown
-        summary += "Payment Breakdown\n" + "-"*30 + "\n"
-        person_payments = {name: 0 for name in self.roommates}
-        person_shares = {name: 0 for name in self.roommates}
-        
-        for expense in self.current_data['expenses']:
-            # Add to total payments
-            person_payments[expense['paid_by']] += expense['amount']
-            
-            # Calculate and add shares
-            share = expense['amount'] / len(expense['shared_between'])
-            for person in expense['shared_between']:
-                person_shares[person] += share
-        
-        # Show each person's payments and shares
-        for person in self.roommates:
-            paid = person_payments[person]
-            share = person_shares[person]
-            balance = paid - share
-            
-            summary += f"\n{person}:\n"
-            summary += f"  Total Paid: ₨ {paid:,.2f}\n"
-            summary += f"  Fair Share: ₨ {share:,.2f}\n"
-            if balance > 0:
-                summary += f"  To Receive: ₨ {balance:,.2f}\n"
-            else:
-                summary += f"  To Pay: ₨ {abs(balance):,.2f}\n"
-        
-        # Category breakdown
-        summary += "\nCategory Breakdown\n" + "-"*30 + "\n"
-        category_totals = defaultdict(float)
-        for expense in self.current_data['expenses']:
-            category_totals[expense['category']] += expense['amount']
-        
-        for category, amount in category_totals.items():
-            if amount > 0:
-                percentage = (amount / total_expenses) * 100
-                summary += f"{category}: ₨ {amount:,.2f} ({percentage:.1f}%)\n"
-        
         self.summary_text.delete(1.0, tk.END)
-        self.summary_text.insert(tk.END, summary)
+        self.summary_text.insert(tk.END, self.book.summary_text())
     
     def add_roommate(self):
         name = tk.simpledialog.askstring("Add Roommate", "Enter roommate name:")
-        if name and name not in self.roommates:
-            self.roommates.append(name)
-            self.current_data['roommates'] = self.roommates
-            self.current_data['balances'][name] = 0  # Initialize balance for new roommate
-            self.save_data()
-            self.update_roommate_list()
-            self.update_graphs()  # Add this line to refresh graphs
-            self.update_balances()  # Update balances display
-            
-            # Refresh any open windows or displays
-            if hasattr(self, 'update_insights'):
-                self.update_insights()
+        if name and self.book.add_roommate(name):
+            self.refresh.invalidate('roommates')
     
     def remove_roommate(self):
         selection = self.roommate_listbox.curselection()
         if selection:
             name = self.roommate_listbox.get(selection[0])
-            self.roommates.remove(name)
-            self.current_data['roommates'] = self.roommates
-            self.save_data()
-            self.update_roommate_list()
+            self.book.remove_roommate(name)
+            self.refresh.invalidate('roommates')
+    
+    def refresh_summary(self):
+        """Regenerate the summary text if one is being shown"""
+        if self.summary_text.get(1.0, tk.END).strip():
+            self.calculate_summary()
     
     def update_roommate_list(self):
         """Update the roommate listbox with current roommates"""
@@ -1483,184 +1316,43 @@ class MonthlyKharcha:
         try:
             timestamp = time.strftime("%Y%m%d_%H%M%S")
             pdf_path = self.data_dir / f"summary_{timestamp}.pdf"
-            
-            c = canvas.Canvas(str(pdf_path), pagesize=letter)
-            width, height = letter
-            
-            c.setFont("Helvetica-Bold", 16)
-            y = height - 40
-            
-            c.drawString(40, y, "Monthly Kharcha Summary")
-            y -= 30
-            
-            summary_text = self.summary_text.get(1.0, tk.END)
-            
-            c.setFont("Helvetica", 12)
-            for line in summary_text.split('\n'):
-                if '=' in line or '-' in line:  # Section separators
-                    c.setFont("Helvetica-Bold", 12)
-                    y -= 20
-                elif line.strip():  # Non-empty lines
-                    c.drawString(40, y, line)
-                    y -= 20
-                    c.setFont("Helvetica", 12)
-                
-                if y < 40:
-                    c.showPage()
-                    y = height - 40
-                    c.setFont("Helvetica", 12)
-            
-            c.save()
+            write_summary_pdf(self.summary_text.get(1.0, tk.END), pdf_path)
             messagebox.showinfo("Success", f"PDF exported successfully to:\n{pdf_path}")
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to export PDF: {str(e)}")
 
     def analyze_spending_patterns(self):
-        """Analyze spending patterns and detect trends"""
-        try:
-            if not hasattr(self, 'current_data') or not self.current_data.get('expenses'):
-                self.spending_patterns = defaultdict(dict)
-                return
-            
-            expenses_df = pd.DataFrame(self.current_data['expenses'])
-            if not expenses_df.empty:
-                expenses_df['date'] = pd.to_datetime(expenses_df['date'])
-                
-                # Analyze patterns per category
-                for category in self.categories:
-                    category_expenses = expenses_df[expenses_df['category'] == category]
-                    if not category_expenses.empty:
-                        avg_amount = category_expenses['amount'].mean()
-                        max_amount = category_expenses['amount'].max()
-                        total = category_expenses['amount'].sum()
-                        frequency = len(category_expenses)
-                        
-                        self.spending_patterns[category] = {
-                            'average_amount': avg_amount,
-                            'max_amount': max_amount,
-                            'total': total,
-                            'frequency': frequency,
-                            'last_date': category_expenses['date'].max()
-                        }
-        
-        except Exception as e:
-            print(f"Error analyzing spending patterns: {str(e)}")
-            self.spending_patterns = defaultdict(dict)
+        """Per-category spending patterns, from the ledger's running aggregates"""
+        self.spending_patterns = defaultdict(dict, self.book.spending_patterns(self.categories))
 
     def predict_monthly_expenses(self):
-        """Predict total expenses for next month based on historical data"""
+        """Predict total expenses for next month from every stored month"""
         try:
-            expenses_df = pd.DataFrame(self.current_data['expenses'])
-            expenses_df['date'] = pd.to_datetime(expenses_df['date'])
-            expenses_df['day_of_month'] = expenses_df['date'].dt.day
-            
-            # Group by day and calculate daily totals
-            daily_totals = expenses_df.groupby('day_of_month')['amount'].sum().reset_index()
-            
-            # Create feature names
-            feature_names = ['day']
-            X = daily_totals[['day_of_month']].copy()
-            X.columns = feature_names
-            y = daily_totals['amount']
-            
-            model = LinearRegression()
-            model.fit(X, y)
-            
-            # Predict for next month using same feature names
-            next_month_days = pd.DataFrame(
-                np.array(range(1, 32)).reshape(-1, 1),
-                columns=feature_names
-            )
-            predicted_amounts = model.predict(next_month_days)
-            
-            return sum(predicted_amounts)
+            if self.expense_predictor is None:
+                self.expense_predictor = Forecaster(self._archive_loader())
+            today = datetime.now()
+            return self.expense_predictor.forecast(today.year, today.month, today.day,
+                                                   self.ledger.category_paisa)
         except Exception as e:
             print(f"Error predicting expenses: {str(e)}")
             return None
 
+    def _stored_months_changed(self):
+        """Make the next forecast look for changes in the stored months"""
+        if self.expense_predictor is not None:
+            self.expense_predictor.invalidate()
+
+    def _reload_stored_months(self):
+        """Pick up months written by another process, such as the command line"""
+        if self.book.reload():
+            self.refresh.invalidate('month', 'roommates')
+        self._stored_months_changed()
+
     def get_expense_insights(self):
         """Generate AI-powered insights about spending patterns"""
-        insights = []
-        
         try:
-            if not self.current_data.get('expenses'):
-                return ["No expenses recorded yet this month"]
-            
-            # Basic stats
-            total_expenses = sum(expense['amount'] for expense in self.current_data['expenses'])
-            insights.append(f"Total spending this month: ₨ {total_expenses:,.2f}")
-            
-            # Category analysis
-            category_totals = defaultdict(float)
-            for expense in self.current_data['expenses']:
-                category_totals[expense['category']] += expense['amount']
-            
-            # Sort categories by amount
-            sorted_categories = sorted(category_totals.items(), key=lambda x: x[1], reverse=True)
-            
-            # Top spending categories
-            if sorted_categories:
-                insights.append(f"Top spending category: {sorted_categories[0][0]} "
-                              f"(₨ {sorted_categories[0][1]:,.2f})")
-            
-                # Category distribution
-                for category, amount in sorted_categories[:3]:  # Top 3 categories
-                    percentage = (amount / total_expenses) * 100
-                    insights.append(f"{category}: ₨ {amount:,.2f} ({percentage:.1f}% of total)")
-            
-            # Recent activity
-            recent_expenses = sorted(self.current_data['expenses'], 
-                                   key=lambda x: datetime.strptime(x['date'], "%Y-%m-%d %H:%M:%S"),
-                                   reverse=True)
-            if recent_expenses:
-                latest = recent_expenses[0]
-                insights.append(f"Most recent expense: {latest['description']} "
-                              f"(₨ {latest['amount']:,.2f})")
-            
-            # Individual analysis
-            person_totals = defaultdict(float)
-            person_counts = defaultdict(int)
-            for expense in self.current_data['expenses']:
-                person_totals[expense['paid_by']] += expense['amount']
-                person_counts[expense['paid_by']] += 1
-            
-            if person_totals:
-                # Highest contributor
-                highest_payer = max(person_totals.items(), key=lambda x: x[1])
-                insights.append(f"Highest contributor: {highest_payer[0]} "
-                              f"(₨ {highest_payer[1]:,.2f})")
-            
-                # Most frequent payer
-                most_frequent = max(person_counts.items(), key=lambda x: x[1])
-                insights.append(f"Most frequent payer: {most_frequent[0]} "
-                              f"({most_frequent[1]} expenses)")
-            
-            # Settlement status
-            balances = self.current_data.get('balances', {})
-            pending_settlements = [abs(bal) for bal in balances.values() if abs(bal) > 0]
-            if pending_settlements:
-                total_pending = sum(pending_settlements) / 2  # Divide by 2 as each debt is counted twice
-                insights.append(f"Total pending settlements: ₨ {total_pending:,.2f}")
-                
-                # Settlement recommendations
-                settlement_plan = self.suggest_settlement_plan()
-                if settlement_plan:
-                    top_settlement = settlement_plan[0]
-                    insights.append(f"Recommended settlement: {top_settlement['from']} should pay "
-                                  f"₨ {top_settlement['amount']:,.2f} to {top_settlement['to']}")
-            
-            # Time-based analysis
-            if len(recent_expenses) > 1:
-                dates = [datetime.strptime(exp['date'], "%Y-%m-%d %H:%M:%S").date() 
-                        for exp in self.current_data['expenses']]
-                unique_days = len(set(dates))
-                if unique_days > 0:
-                    daily_avg = total_expenses / unique_days
-                    insights.append(f"Daily average spending: ₨ {daily_avg:,.2f}")
-            
-            return insights
-            
+            return self.book.insight_lines()
         except Exception as e:
             import traceback
             traceback.print_exc()
@@ -1668,30 +1360,7 @@ class MonthlyKharcha:
 
     def suggest_settlement_plan(self):
         """Generate an optimal settlement plan"""
-        balances = self.current_data['balances']
-        debtors = [(name, -bal) for name, bal in balances.items() if bal < 0]
-        creditors = [(name, bal) for name, bal in balances.items() if bal > 0]
-        
-        settlement_plan = []
-        
-        # Sort by amount to optimize settlements
-        debtors.sort(key=lambda x: x[1], reverse=True)
-        creditors.sort(key=lambda x: x[1], reverse=True)
-        
-        for debtor, debt in debtors:
-            remaining_debt = debt
-            for creditor, credit in creditors:
-                if credit > 0 and remaining_debt > 0:
-                    amount = min(remaining_debt, credit)
-                    settlement_plan.append({
-                        'from': debtor,
-                        'to': creditor,
-                        'amount': amount
-                    })
-                    remaining_debt -= amount
-                    credit -= amount
-        
-        return settlement_plan
+        return self.book.settlement_plan()
 
     def evaluate_expression(self, expression):
         """Safely evaluate a mathematical expression"""
@@ -1707,6 +1376,12 @@ class MonthlyKharcha:
         except:
             return None
 
+    def _archive_loader(self):
+        """The shared loader for reading stored months, bound to the current storage"""
+        if self.archives is None:
+            self.archives = ArchiveLoader(self.storage)
+        return self.archives
+
     def show_archives(self):
         """Show window with list of archived months"""
         archive_window = tk.Toplevel(self.window)
@@ -1732,195 +1407,65 @@ class MonthlyKharcha:
                  text="Monthly Archives",
                  style="Header.TLabel").pack(pady=(0, 20))
         
-        # Create scrollable frame for archives
-        canvas = tk.Canvas(main_frame)
-        scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=canvas.yview)
-        scrollable_frame = ttk.Frame(canvas)
-        
-        scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
-        
-        canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        # Get list of all JSON files in the data directory
-        json_files = list(self.data_dir.glob("*.json"))
-        
-        # Debug print to see all files
-        print("Found JSON files:", [f.name for f in json_files])
-        
-        # Filter and organize files
-        archive_files = []
-        current_date = datetime.now()
-        
-        for file in json_files:
-            try:
-                # Debug print for each file being processed
-                print(f"Processing file: {file.name}")
-                
-                # Check different file patterns
-                if re.match(r'^(\d{4})_(\d{1,2})\.json$', file.name):
-                    # Any month file (YYYY_M.json or YYYY_MM.json)
-                    year, month = map(int, file.stem.split('_'))
-                    print(f"Matched regular file pattern: {year}_{month}")
-                    archive_files.append(file)
-                elif re.match(r'^archive_\d{4}_\d{2}\.json$', file.name):
-                    # Archive files (archive_YYYY_MM.json)
-                    print(f"Matched archive file pattern: {file.name}")
-                    archive_files.append(file)
-            except Exception as e:
-                print(f"Error processing file {file}: {str(e)}")
-                traceback.print_exc()
-                continue
+        archive_list = ArchiveCardList(
+            main_frame,
+            on_view=lambda summary: self.view_archive_summary(
+                summary['key'], summary['year'], summary['month']),
+            on_export=lambda summary: self.export_monthly_archive(
+                self._archive_loader().load(summary['key']),
+                datetime(summary['year'], summary['month'], 1),
+                live=not summary['archived'] and self.storage.find_book(
+                    summary['year'], summary['month'], archived=True) is not None))
 
-        # Debug print archive files found
-        print("Archive files found:", [f.name for f in archive_files])
+        # Months the storage manifest has totals for are listed right away;
+        # the rest show as loading until the archive loader has read them
+        summaries, pending = self.storage.cached_month_summaries()
+        archive_list.add(summaries)
+        archive_list.add({'year': year, 'month': month, 'key': book,
+                          'archived': self.storage.is_archive(book), 'total': None}
+                         for year, month, book in pending)
+        if pending:
+            self._load_archive_summaries(archive_window, archive_list, pending)
+        elif not summaries:
+            archive_list.set_status("No archives found")
 
-        # Sort files by date (newest first)
-        def get_date_from_filename(filename):
-            try:
-                match = re.match(r'^(?:archive_)?(\d{4})_(\d{1,2})\.json$', filename.name)
-                if match:
-                    year, month = map(int, match.groups())
-                    return datetime(year, month, 1)
-                return datetime(1900, 1, 1)  # Return old date for invalid files
-            except Exception as e:
-                print(f"Error parsing date from filename {filename}: {str(e)}")
-                return datetime(1900, 1, 1)
+    def _load_archive_summaries(self, archive_window, archive_list, pending):
+        """Read the totals of months missing from the manifest on the loader's pool"""
+        futures = self._archive_loader().submit_summaries(pending)
 
-        # Sort and remove duplicates
-        archive_files.sort(key=get_date_from_filename, reverse=True)
-        
-        # Debug print sorted files
-        print("Sorted archive files:", [f.name for f in archive_files])
-        
-        # Remove duplicates by keeping only the most recent version for each month
-        seen_months = set()
-        unique_archives = []
-        for file in archive_files:
-            try:
-                date = get_date_from_filename(file)
-                month_key = f"{date.year}_{date.month}"
-                if month_key not in seen_months:
-                    seen_months.add(month_key)
-                    unique_archives.append(file)
-                    print(f"Added unique archive: {file.name} for {month_key}")
-            except Exception as e:
-                print(f"Error processing file for deduplication {file}: {str(e)}")
-                continue
-
-        archive_files = unique_archives
-
-        if not archive_files:
-            ttk.Label(scrollable_frame,
-                     text="No archives found",
-                     style="SubHeader.TLabel").pack(pady=20)
-        else:
-            # Create card for each archive
-            for archive_file in archive_files:
+        def poll():
+            if not archive_window.winfo_exists():
+                for year, month, book, future in futures:
+                    future.cancel()
+                return
+            batch, remaining = [], []
+            for year, month, book, future in futures:
+                if not future.done():
+                    remaining.append((year, month, book, future))
+                    continue
                 try:
-                    with open(archive_file, 'r') as f:
-                        print(f"Loading file: {archive_file.name}")
-                        # Handle both regular and archive files
-                        if archive_file.stem.startswith('archive_'):
-                            archive_data = json.load(f)
-                            year = archive_file.stem.split('_')[1]
-                            month = archive_file.stem.split('_')[2]
-                        else:
-                            data = json.load(f)
-                            year, month = archive_file.stem.split('_')
-                            archive_data = {
-                                'month_data': data,
-                                'month_summary': {
-                                    'total_expenses': sum(exp['amount'] for exp in data.get('expenses', [])),
-                                    'category_totals': self._calculate_category_totals(data.get('expenses', [])),
-                                    'final_balances': data.get('balances', {}),
-                                    'expense_count': len(data.get('expenses', []))
-                                }
-                            }
-                        
-                        # Create and display card
-                        self._create_archive_card(
-                            scrollable_frame, 
-                            archive_data, 
-                            archive_file, 
-                            int(year), 
-                            int(month)
-                        )
-                        print(f"Successfully created card for: {archive_file.name}")
-                        
-                except Exception as e:
-                    print(f"Error loading archive {archive_file}: {str(e)}")
-                    traceback.print_exc()
-        
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
+                    batch.append(future.result())
+                except (OSError, ValueError) as e:
+                    print(f"Error loading archive {year}-{month:02d}: {str(e)}")
+                    batch.append({'year': year, 'month': month, 'key': book,
+                                  'archived': self.storage.is_archive(book),
+                                  'total': None, 'error': str(e)})
+            futures[:] = remaining
+            if batch:
+                archive_list.add(batch)
+            if futures:
+                archive_list.set_status(
+                    f"Loading {len(pending) - len(futures)} of {len(pending)} months...")
+                archive_window.after(50, poll)
+            else:
+                archive_list.set_status("")
 
-    def _create_archive_card(self, parent_frame, archive_data, archive_file, year, month):
-        """Helper method to create archive cards"""
-        try:
-            month_name = datetime(year, month, 1).strftime("%B %Y")
-            
-            # Create card frame
-            card = ttk.Frame(parent_frame, style="Card.TFrame")
-            card.pack(fill='x', pady=10, padx=10)
-            
-            # Month and total
-            header_frame = ttk.Frame(card)
-            header_frame.pack(fill='x', pady=5)
-            
-            ttk.Label(header_frame,
-                     text=month_name,
-                     style="SubHeader.TLabel").pack(side='left', padx=10)
-            
-            total = archive_data['month_summary']['total_expenses']
-            ttk.Label(header_frame,
-                     text=f"Total: ₨ {total:,.2f}",
-                     style="Amount.TLabel").pack(side='right', padx=10)
-            
-            # Action buttons
-            btn_frame = ttk.Frame(card)
-            btn_frame.pack(fill='x', pady=5)
-            
-            ctk.CTkButton(btn_frame,
-                        text="View Details",
-                        command=lambda: self.view_archive_summary(archive_file),
-                        width=150).pack(side='left', padx=5)
-            
-            ctk.CTkButton(btn_frame,
-                        text="Export PDF",
-                        command=lambda: self.export_monthly_archive(
-                            archive_data, 
-                            datetime(year, month, 1)
-                        ),
-                        width=150).pack(side='left', padx=5)
-        except Exception as e:
-            print(f"Error creating archive card: {str(e)}")
-            traceback.print_exc()
+        poll()
 
-    def view_archive_summary(self, archive_file):
+    def view_archive_summary(self, book, year, month):
         """Display summary of an archived month with editable expenses"""
         try:
-            with open(archive_file, 'r') as f:
-                # Handle both regular and archive files
-                if archive_file.stem.startswith('archive_'):
-                    archive_data = json.load(f)
-                    year = archive_file.stem.split('_')[1]
-                    month = archive_file.stem.split('_')[2]
-                else:
-                    data = json.load(f)
-                    year, month = archive_file.stem.split('_')
-                    archive_data = {
-                        'month_data': data,
-                        'month_summary': {
-                            'total_expenses': sum(exp['amount'] for exp in data['expenses']),
-                            'category_totals': self._calculate_category_totals(data['expenses']),
-                            'final_balances': data.get('balances', {}),
-                            'expense_count': len(data['expenses'])
-                        }
-                    }
+            archive_data = self.storage.load_archive(book)
             
             summary_window = tk.Toplevel(self.window)
             month_name = datetime(int(year), int(month), 1).strftime("%B %Y")
@@ -1998,9 +1543,7 @@ class MonthlyKharcha:
             # Detailed transactions
             summary.append("Detailed Transactions")
             summary.append("-" * 20)
-            for expense in sorted(month_data['expenses'],
-                                key=lambda x: datetime.strptime(x['date'], "%Y-%m-%d %H:%M:%S"),
-                                reverse=True):
+            for expense in sorted(month_data['expenses'], key=lambda x: x.ts, reverse=True):
                 summary.append(f"\nDate: {expense['date']}")
                 summary.append(f"Category: {expense['category']}")
                 summary.append(f"Description: {expense['description']}")
@@ -2017,60 +1560,28 @@ class MonthlyKharcha:
             
             # Create treeview for expenses
             columns = ('Date', 'Category', 'Description', 'Amount', 'Paid By', 'Shared Between')
-            expense_tree = ttk.Treeview(expenses_frame, columns=columns, show='headings')
-            
-            # Configure columns
-            for col in columns:
-                expense_tree.heading(col, text=col)
-                expense_tree.column(col, width=100)
+            expense_list = VirtualExpenseList(expenses_frame, columns, self._expense_row,
+                                              fill='both')
             
-            # Add scrollbar
-            tree_scrollbar = ttk.Scrollbar(expenses_frame, orient="vertical", command=expense_tree.yview)
-            expense_tree.configure(yscrollcommand=tree_scrollbar.set)
-            
-            # Pack tree and scrollbar
-            expense_tree.pack(side='left', fill='both', expand=True)
-            tree_scrollbar.pack(side='right', fill='y')
-            
-            # Add expenses to tree
-            for expense in sorted(month_data['expenses'],
-                                key=lambda x: datetime.strptime(x['date'], "%Y-%m-%d %H:%M:%S"),
-                                reverse=True):
-                expense_tree.insert('', 'end', values=(
-                    expense['date'],
-                    expense['category'],
-                    expense['description'],
-                    f"₨ {expense['amount']:,.2f}",
-                    expense['paid_by'],
-                    ', '.join(expense['shared_between'])
-                ))
+            # Add expenses to tree, keyed by expense ID
+            archive_index = ExpenseIndex(month_data['expenses'])
+            expense_list.set_expenses(month_data['expenses'])
             
             # Button frame
             button_frame = ttk.Frame(expenses_frame)
             button_frame.pack(pady=10)
             
             def edit_archived_expense():
-                selected = expense_tree.selection()
+                from tkcalendar import DateEntry
+                
+                selected = expense_list.selection()
                 if not selected:
                     messagebox.showwarning("No Selection", "Please select an expense to edit")
                     return
                 
                 # Get selected expense
-                item = selected[0]
-                values = expense_tree.item(item)['values']
-                
-                # Find the expense in the data
-                expense_date = values[0]
-                expense_desc = values[2]
-                target_expense = None
-                expense_index = None
-                
-                for i, expense in enumerate(month_data['expenses']):
-                    if (expense['date'] == expense_date and 
-                        expense['description'] == expense_desc):
-                        target_expense = expense
-                        expense_index = i
-                        break
+                expense_id = selected[0]
+                target_expense = archive_index.get(expense_id)
                 
                 if target_expense is None:
                     messagebox.showerror("Error", "Could not find expense")
@@ -2091,8 +1602,7 @@ class MonthlyKharcha:
                 date_entry = DateEntry(edit_frame, width=30,
                                       background=self.colors['primary'],
                                       foreground='white')
-                current_date = datetime.strptime(target_expense['date'], "%Y-%m-%d %H:%M:%S")
-                date_entry.set_date(current_date)
+                date_entry.set_date(timestamp_datetime(target_expense.ts))
                 date_entry.pack(fill='x', pady=5)
                 
                 ttk.Label(edit_frame, text="Category:").pack(anchor='w')
@@ -2136,39 +1646,29 @@ class MonthlyKharcha:
                             raise ValueError("At least one person must share the expense")
                         
                         # Update expense
-                        month_data['expenses'][expense_index] = {
+                        updated_expense = Expense({
+                            'id': expense_id,
                             'category': category_cb.get(),
                             'description': desc_entry.get(),
                             'amount': amount,
                             'paid_by': paid_by_cb.get(),
                             'shared_between': shared_between,
-                            'date': date_entry.get_date().strftime("%Y-%m-%d %H:%M:%S")
-                        }
+                            'date': date_entry.get_date().strftime(DATE_FORMAT)
+                        })
+                        archive_index.replace(expense_id, updated_expense)
                         
                         # Recalculate summary
-                        month_summary['total_expenses'] = sum(exp['amount'] for exp in month_data['expenses'])
-                        month_summary['category_totals'] = self._calculate_category_totals(month_data['expenses'])
+                        category_totals = category_paisa(month_data['expenses'])
+                        month_summary['total_expenses'] = to_rupees(sum(category_totals.values()))
+                        month_summary['category_totals'] = {
+                            category: to_rupees(total) for category, total in category_totals.items()}
                         
-                        # Save changes back to file
-                        with open(archive_file, 'w') as f:
-                            if archive_file.stem.startswith('archive_'):
-                                json.dump(archive_data, f, indent=4)
-                            else:
-                                json.dump(month_data, f, indent=4)
+                        # Save the single changed row
+                        self.storage.edit_expense(book, expense_id, updated_expense)
+                        self._stored_months_changed()
                         
                         # Update tree view
-                        expense_tree.delete(*expense_tree.get_children())
-                        for exp in sorted(month_data['expenses'],
-                                        key=lambda x: datetime.strptime(x['date'], "%Y-%m-%d %H:%M:%S"),
-                                        reverse=True):
-                            expense_tree.insert('', 'end', values=(
-                                exp['date'],
-                                exp['category'],
-                                exp['description'],
-                                f"₨ {exp['amount']:,.2f}",
-                                exp['paid_by'],
-                                ', '.join(exp['shared_between'])
-                            ))
+                        expense_list.update(updated_expense)
                         
                         edit_window.destroy()
                         messagebox.showinfo("Success", "Archived expense updated successfully!")
@@ -2186,7 +1686,7 @@ class MonthlyKharcha:
                           command=edit_window.destroy).pack(side='left', padx=5)
             
             def delete_archived_expense():
-                selected = expense_tree.selection()
+                selected = expense_list.selection()
                 if not selected:
                     messagebox.showwarning("No Selection", "Please select an expense to delete")
                     return
@@ -2196,30 +1696,18 @@ class MonthlyKharcha:
                     return
                 
                 item = selected[0]
-                values = expense_tree.item(item)['values']
+                if item not in archive_index:
+                    messagebox.showerror("Error", "Could not find expense to delete")
+                    return
                 
-                # Find and remove the expense
-                expense_date = values[0]
-                expense_desc = values[2]
+                # Remove the expense and update storage
+                archive_index.remove(item)
+                self.storage.delete_expense(book, item)
+                self._stored_months_changed()
                 
-                for i, expense in enumerate(month_data['expenses']):
-                    if (expense['date'] == expense_date and 
-                        expense['description'] == expense_desc):
-                        month_data['expenses'].pop(i)
-                        
-                        # Update file
-                        with open(archive_file, 'w') as f:
-                            if archive_file.stem.startswith('archive_'):
-                                json.dump(archive_data, f, indent=4)
-                            else:
-                                json.dump(month_data, f, indent=4)
-                        
-                        # Update tree
-                        expense_tree.delete(item)
-                        messagebox.showinfo("Success", "Archived expense deleted successfully!")
-                        return
-                
-                messagebox.showerror("Error", "Could not find expense to delete")
+                # Update tree
+                expense_list.delete(item)
+                messagebox.showinfo("Success", "Archived expense deleted successfully!")
             
             # Add Edit and Delete buttons
             ttk.Button(button_frame, text="Edit Selected", 
@@ -2232,103 +1720,11 @@ class MonthlyKharcha:
             print(f"Error in view_archive_summary: {str(e)}")
             traceback.print_exc()
 
-    def _calculate_category_totals(self, expenses):
-        """Helper method to calculate category totals"""
-        totals = defaultdict(float)
-        for expense in expenses:
-            totals[expense['category']] += expense['amount']
-        return dict(totals)
-
-    def export_monthly_archive(self, archive_data, date):
+    def export_monthly_archive(self, archive_data, date, live=False):
         """Export monthly archive to PDF"""
         try:
-            # Create PDF filename with timestamp
-            timestamp = date.strftime("%Y%m_%B")
-            pdf_path = self.data_dir / f"monthly_summary_{timestamp}.pdf"
-            
-            # Create PDF
-            c = canvas.Canvas(str(pdf_path), pagesize=letter)
-            width, height = letter
-            
-            # Title
-            c.setFont("Helvetica-Bold", 16)
-            y = height - 40
-            month_name = date.strftime("%B %Y")
-            c.drawString(40, y, f"Monthly Kharcha Summary - {month_name}")
-            y -= 30
-            
-            # Overview
-            c.setFont("Helvetica-Bold", 12)
-            c.drawString(40, y, "Monthly Overview")
-            y -= 20
-            
-            c.setFont("Helvetica", 10)
-            total = archive_data['month_summary']['total_expenses']
-            c.drawString(40, y, f"Total Expenses: ₨ {total:,.2f}")
-            y -= 15
-            c.drawString(40, y, f"Number of Transactions: {archive_data['month_summary']['expense_count']}")
-            y -= 30
-            
-            # Category breakdown
-            c.setFont("Helvetica-Bold", 12)
-            c.drawString(40, y, "Category Breakdown")
-            y -= 20
-            
-            c.setFont("Helvetica", 10)
-            for category, amount in archive_data['month_summary']['category_totals'].items():
-                if amount > 0:
-                    c.drawString(40, y, f"{category}: ₨ {amount:,.2f}")
-                    y -= 15
-                    if y < 50:  # New page if near bottom
-                        c.showPage()
-                        y = height - 40
-            y -= 15
-            
-            # Final balances
-            c.setFont("Helvetica-Bold", 12)
-            c.drawString(40, y, "Final Balances")
-            y -= 20
-            
-            c.setFont("Helvetica", 10)
-            for person, balance in archive_data['month_summary']['final_balances'].items():
-                status = "to receive" if balance > 0 else "to pay"
-                c.drawString(40, y, f"{person}: ₨ {abs(balance):,.2f} ({status})")
-                y -= 15
-                if y < 50:
-                    c.showPage()
-                    y = height - 40
-            y -= 15
-            
-            # Detailed transactions
-            c.showPage()  # Start transactions on new page
-            y = height - 40
-            
-            c.setFont("Helvetica-Bold", 12)
-            c.drawString(40, y, "Detailed Transactions")
-            y -= 20
-            
-            c.setFont("Helvetica", 10)
-            for expense in sorted(archive_data['month_data']['expenses'],
-                                key=lambda x: datetime.strptime(x['date'], "%Y-%m-%d %H:%M:%S"),
-                                reverse=True):
-                if y < 100:  # Check if enough space for transaction
-                    c.showPage()
-                    y = height - 40
-                
-                c.drawString(40, y, f"Date: {expense['date']}")
-                y -= 15
-                c.drawString(40, y, f"Category: {expense['category']}")
-                y -= 15
-                c.drawString(40, y, f"Description: {expense['description']}")
-                y -= 15
-                c.drawString(40, y, f"Amount: ₨ {expense['amount']:,.2f}")
-                y -= 15
-                c.drawString(40, y, f"Paid by: {expense['paid_by']}")
-                y -= 15
-                c.drawString(40, y, f"Shared between: {', '.join(expense['shared_between'])}")
-                y -= 25
-            
-            c.save()
+            pdf_path = self.data_dir / month_pdf_name(date, live)
+            write_month_pdf(archive_data, date, pdf_path)
             messagebox.showinfo("Success", 
                               f"PDF exported successfully!\nSaved to:\n{pdf_path}")
             
@@ -2343,12 +1739,25 @@ class MonthlyKharcha:
             print(f"Error running application: {str(e)}")
 
 # Add at the end of main.py
-def main():
+def run_app(data_dir=None, profile_startup=False):
+    """Open the app window on a data directory"""
     try:
-        app = MonthlyKharcha()
+        profile = StartupProfile() if profile_startup else None
+        app = MonthlyKharcha(profile, data_dir)
+        if profile is not None:
+            # Idle callbacks run after the first frame has been drawn
+            def report():
+                profile.mark("first frame")
+                profile.report()
+            app.window.after_idle(report)
         app.run()
     except Exception as e:
         print(f"Error starting application: {str(e)}")
 
+def main():
+    # The command line opens the app when no subcommand is given
+    from .cli import main as cli_main
+    sys.exit(cli_main())
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,71 @@
+"""
+Coalesced UI refreshes for Monthly Kharcha.
+
+Mutations do not redraw anything themselves.  They mark what changed
+(``'expenses'``, ``'roommates'``, ``'month'``, ...) and every view that
+depends on it, directly or through another view, is refreshed once in a
+single pass on the next Tk idle cycle, however many changes came in.
+"""
+
+import traceback
+from collections import defaultdict
+
+
+class RefreshScheduler:
+    """
+    Dependency-tracked invalidation of derived views.
+
+    Views are registered with a refresh callback and the names they depend
+    on, which may be plain data names or other views.  A view must be
+    registered after the views it depends on; a pass refreshes the dirty
+    views in registration order, so dependencies are always up to date
+    before their dependents run.
+    """
+
+    def __init__(self, widget):
+        self.widget = widget
+        self._callbacks = {}
+        self._dependents = defaultdict(list)
+        self._dirty = set()
+        self._pending = None
+
+    def register(self, name, callback, depends_on=()):
+        self._callbacks[name] = callback
+        for dependency in depends_on:
+            self._dependents[dependency].append(name)
+
+    def invalidate(self, *names):
+        """Mark names and everything depending on them dirty and schedule a pass"""
+        stack = list(names)
+        while stack:
+            name = stack.pop()
+            if name in self._dirty:
+                continue
+            self._dirty.add(name)
+            stack.extend(self._dependents.get(name, ()))
+        if self._pending is None:
+            self._pending = self.widget.after_idle(self._run)
+
+    def flush(self):
+        """Run a pending pass now instead of waiting for the idle cycle"""
+        if self._pending is not None:
+            self.widget.after_cancel(self._pending)
+            self._run()
+
+    def cancel(self):
+        if self._pending is not None:
+            self.widget.after_cancel(self._pending)
+            self._pending = None
+        self._dirty.clear()
+
+    def _run(self):
+        self._pending = None
+        dirty, self._dirty = self._dirty, set()
+        for name, callback in self._callbacks.items():
+            if name not in dirty:
+                continue
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error refreshing {name}: {str(e)}")
+                traceback.print_exc()
@@ -0,0 +1,136 @@
+"""
+PDF reports for Monthly Kharcha.
+
+reportlab is imported when a report is written, so the app and the
+command line only load it when they export.
+"""
+
+
+def month_pdf_name(date, live=False):
+    """
+    File name of the PDF report of the month ``date`` falls in.  ``live``
+    names the report of the live book of a month that was also archived,
+    so the two reports do not overwrite each other.
+    """
+    suffix = "_live" if live else ""
+    return f"monthly_summary_{date.strftime('%Y%m_%B')}{suffix}.pdf"
+
+
+def write_summary_pdf(summary_text, pdf_path):
+    """Write the text of a month summary to a PDF"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(str(pdf_path), pagesize=letter)
+    width, height = letter
+
+    c.setFont("Helvetica-Bold", 16)
+    y = height - 40
+
+    c.drawString(40, y, "Monthly Kharcha Summary")
+    y -= 30
+
+    c.setFont("Helvetica", 12)
+    for line in summary_text.split('\n'):
+        if '=' in line or '-' in line:  # Section separators
+            c.setFont("Helvetica-Bold", 12)
+            y -= 20
+        elif line.strip():  # Non-empty lines
+            c.drawString(40, y, line)
+            y -= 20
+            c.setFont("Helvetica", 12)
+
+        if y < 40:
+            c.showPage()
+            y = height - 40
+            c.setFont("Helvetica", 12)
+
+    c.save()
+
+
+def write_month_pdf(archive_data, date, pdf_path):
+    """Write a month's overview, balances and transactions to a PDF"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    c = canvas.Canvas(str(pdf_path), pagesize=letter)
+    width, height = letter
+
+    # Title
+    c.setFont("Helvetica-Bold", 16)
+    y = height - 40
+    month_name = date.strftime("%B %Y")
+    c.drawString(40, y, f"Monthly Kharcha Summary - {month_name}")
+    y -= 30
+
+    # Overview
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(40, y, "Monthly Overview")
+    y -= 20
+
+    c.setFont("Helvetica", 10)
+    total = archive_data['month_summary']['total_expenses']
+    c.drawString(40, y, f"Total Expenses: ₨ {total:,.2f}")
+    y -= 15
+    c.drawString(40, y, f"Number of Transactions: {archive_data['month_summary']['expense_count']}")
+    y -= 30
+
+    # Category breakdown
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(40, y, "Category Breakdown")
+    y -= 20
+
+    c.setFont("Helvetica", 10)
+    for category, amount in archive_data['month_summary']['category_totals'].items():
+        if amount > 0:
+            c.drawString(40, y, f"{category}: ₨ {amount:,.2f}")
+            y -= 15
+            if y < 50:  # New page if near bottom
+                c.showPage()
+                y = height - 40
+    y -= 15
+
+    # Final balances
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(40, y, "Final Balances")
+    y -= 20
+
+    c.setFont("Helvetica", 10)
+    for person, balance in archive_data['month_summary']['final_balances'].items():
+        status = "to receive" if balance > 0 else "to pay"
+        c.drawString(40, y, f"{person}: ₨ {abs(balance):,.2f} ({status})")
+        y -= 15
+        if y < 50:
+            c.showPage()
+            y = height - 40
+    y -= 15
+
+    # Detailed transactions
+    c.showPage()  # Start transactions on new page
+    y = height - 40
+
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(40, y, "Detailed Transactions")
+    y -= 20
+
+    c.setFont("Helvetica", 10)
+    for expense in sorted(archive_data['month_data']['expenses'],
+                          key=lambda x: x.ts, reverse=True):
+        if y < 100:  # Check if enough space for transaction
+            c.showPage()
+            y = height - 40
+
+        c.drawString(40, y, f"Date: {expense['date']}")
+        y -= 15
+        c.drawString(40, y, f"Category: {expense['category']}")
+        y -= 15
+        c.drawString(40, y, f"Description: {expense['description']}")
+        y -= 15
+        c.drawString(40, y, f"Amount: ₨ {expense['amount']:,.2f}")
+        y -= 15
+        c.drawString(40, y, f"Paid by: {expense['paid_by']}")
+        y -= 15
+        c.drawString(40, y, f"Shared between: {', '.join(expense['shared_between'])}")
+        y -= 25
+
+    c.save()
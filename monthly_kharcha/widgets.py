@@ -0,0 +1,468 @@
+"""
+Reusable Tk widgets for Monthly Kharcha.
+"""
+
+import tkinter as tk
+from datetime import datetime
+from tkinter import ttk
+
+import customtkinter as ctk
+
+from .engine.model import DateIndex
+
+
+class VirtualExpenseList:
+    """
+    Expense Treeview that only materializes the rows in view.
+
+    Expenses are kept in a ``DateIndex`` (newest first).  The Treeview holds
+    the visible rows plus a small buffer; scrolling, inserts, updates and
+    deletes are applied as a diff against the rows already shown, keyed by
+    expense ID, instead of clearing and refilling the tree.
+    """
+
+    BUFFER = 10
+
+    def __init__(self, parent, columns, format_row, fill='x'):
+        self.format_row = format_row
+        self.tree = ttk.Treeview(parent, columns=columns, show='headings')
+        for col in columns:
+            self.tree.heading(col, text=col)
+            self.tree.column(col, width=100)
+
+        self.scrollbar = ttk.Scrollbar(parent, orient="vertical", command=self._on_scrollbar)
+        self.tree.configure(yscrollcommand=self._on_tree_scroll)
+
+        self.tree.pack(side='left', fill=fill, expand=True)
+        self.scrollbar.pack(side='right', fill='y')
+
+        self.index = DateIndex()
+        self.expenses = {}
+        self.offset = 0
+        self.visible = int(self.tree.cget('height'))
+        self._shown = {}      # expense ID -> values currently in the tree
+        self._selected = ()
+        self._restoring_selection = False
+
+        self.tree.bind('<Configure>', self._on_resize)
+        self.tree.bind('<MouseWheel>', self._on_mousewheel)
+        self.tree.bind('<Button-4>', lambda e: self.scroll(-3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll(3))
+        self.tree.bind('<<TreeviewSelect>>', self._on_select)
+
+    # Model updates
+
+    def set_expenses(self, expenses):
+        """Replace the whole list"""
+        self.expenses = {expense['id']: expense for expense in expenses}
+        self.index = DateIndex(expenses)
+        self._render()
+
+    def insert(self, expense):
+        self.expenses[expense['id']] = expense
+        self.index.insert(expense)
+        self._render()
+
+    def update(self, expense):
+        self.expenses[expense['id']] = expense
+        self.index.update(expense)
+        self._render()
+
+    def delete(self, expense_id):
+        if expense_id in self.index:
+            del self.expenses[expense_id]
+            self.index.remove(expense_id)
+            self._selected = tuple(i for i in self._selected if i != expense_id)
+            self._render()
+
+    def selection(self):
+        """Selected expense IDs, including rows scrolled out of the tree"""
+        return self._selected
+
+    # Scrolling
+
+    def _max_offset(self):
+        return max(0, len(self.index) - self.visible)
+
+    def scroll(self, rows):
+        self.scroll_to(self.offset + rows)
+
+    def scroll_to(self, offset):
+        offset = min(max(0, int(offset)), self._max_offset())
+        if offset != self.offset:
+            self.offset = offset
+            self._render()
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.scroll_to(float(amount) * len(self.index))
+        elif unit == 'pages':
+            self.scroll(int(amount) * self.visible)
+        else:
+            self.scroll(int(amount))
+
+    def _on_mousewheel(self, event):
+        self.scroll(int(-1 * (event.delta / 120)) * 3)
+        return 'break'
+
+    def _on_tree_scroll(self, first, last):
+        # Keyboard navigation can scroll the tree into the buffer rows;
+        # fold that into the list offset so the buffer is refilled
+        first = float(first)
+        if first > 0 and self._shown:
+            shift = round(first * len(self._shown))
+            self.tree.yview_moveto(0)
+            if shift:
+                self.scroll(shift)
+                return
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        total = len(self.index)
+        if total <= self.visible:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.offset / total, (self.offset + self.visible) / total)
+
+    def _on_resize(self, event):
+        row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        visible = max(1, (event.height - row_height) // row_height)
+        if visible != self.visible:
+            self.visible = visible
+            self.offset = min(self.offset, self._max_offset())
+            self._render()
+
+    def _on_select(self, event):
+        if self._restoring_selection:
+            # Triggered by _render putting the selection back
+            self._restoring_selection = False
+            return
+        self._selected = self.tree.selection()
+
+    # Rendering
+
+    def _render(self):
+        """Bring the tree in line with the rows in the current window"""
+        self.offset = min(self.offset, self._max_offset())
+        window = self.index.ids(self.offset, self.offset + self.visible + self.BUFFER)
+        wanted = set(window)
+
+        stale = [expense_id for expense_id in self._shown if expense_id not in wanted]
+        if stale:
+            self.tree.delete(*stale)
+            for expense_id in stale:
+                del self._shown[expense_id]
+
+        children = list(self.tree.get_children())
+        for position, expense_id in enumerate(window):
+            values = self.format_row(self.expenses[expense_id])
+            if expense_id not in self._shown:
+                self.tree.insert('', position, iid=expense_id, values=values)
+                children.insert(position, expense_id)
+            else:
+                if self._shown[expense_id] != values:
+                    self.tree.item(expense_id, values=values)
+                if children[position] != expense_id:
+                    self.tree.move(expense_id, '', position)
+                    children.remove(expense_id)
+                    children.insert(position, expense_id)
+            self._shown[expense_id] = values
+
+        selected = tuple(expense_id for expense_id in self._selected if expense_id in self._shown)
+        if selected != self.tree.selection():
+            self._restoring_selection = True
+            self.tree.selection_set(selected)
+        self._update_scrollbar()
+
+
+_UNFILLED = object()
+
+
+class WidgetPool:
+    """
+    Recycled row widgets for a list that is refreshed in place.
+
+    ``create(position)`` builds the widgets of one row and returns an
+    object with ``fill(value)``, ``show()`` and ``hide()``.  ``update``
+    shows one row per value, creating rows only when the list outgrows
+    the pool and hiding the rows past its end, which are kept for when it
+    grows again.  Each row remembers its value and is only refilled when
+    the value changed, so refreshing an unchanged list touches no widgets.
+    """
+
+    def __init__(self, create):
+        self._create = create
+        self.rows = []
+        self._values = []
+        self.shown = 0
+
+    def update(self, values):
+        """Fill and show a row for each value; returns the rows in use"""
+        count = 0
+        for count, value in enumerate(values, 1):
+            position = count - 1
+            if position == len(self.rows):
+                self.rows.append(self._create(position))
+                self._values.append(_UNFILLED)
+            row = self.rows[position]
+            if self._values[position] != value:
+                row.fill(value)
+                self._values[position] = value
+            if position >= self.shown:
+                row.show()
+        for row in self.rows[count:self.shown]:
+            row.hide()
+        self.shown = count
+        return self.rows[:count]
+
+
+class _TextRow:
+    def __init__(self, parent, boxed, separated, label_options):
+        self.separator = ttk.Separator(parent, orient='horizontal') if separated else None
+        self.frame = ttk.Frame(parent, style="Card.TFrame") if boxed else None
+        self.label = ttk.Label(self.frame or parent, style="Card.TLabel", **label_options)
+        if boxed:
+            self.label.pack(fill='x', pady=5, padx=10)
+
+    def fill(self, text):
+        self.label.configure(text=text)
+
+    def show(self):
+        if self.separator is not None:
+            self.separator.pack(fill='x', pady=2)
+        if self.frame is not None:
+            self.frame.pack(fill='x', pady=5, padx=5)
+        else:
+            self.label.pack(anchor='w', pady=2)
+
+    def hide(self):
+        if self.separator is not None:
+            self.separator.pack_forget()
+        (self.frame or self.label).pack_forget()
+
+
+class TextList:
+    """
+    A column of text labels, refreshed in place through a ``WidgetPool``.
+
+    With ``boxed`` every label sits in its own card frame with a separator
+    between cards.  Other keyword arguments are passed to the labels.
+    """
+
+    def __init__(self, parent, boxed=False, **label_options):
+        self.pool = WidgetPool(
+            lambda position: _TextRow(parent, boxed, boxed and position > 0, label_options))
+
+    def set(self, texts):
+        self.pool.update(texts)
+
+
+class _YearHeader:
+    def __init__(self, parent):
+        self.frame = ttk.Frame(parent)
+        self.year_label = ttk.Label(self.frame, style="Header.TLabel")
+        self.year_label.pack(side='left', padx=10)
+        self.total_label = ttk.Label(self.frame, style="Amount.TLabel")
+        self.total_label.pack(side='right', padx=10)
+
+    def fill(self, value):
+        year, total = value
+        self.year_label.configure(text=str(year))
+        self.total_label.configure(text=f"₨ {total:,.2f}")
+
+    def show(self):
+        """Placed by ``ArchiveCardList._render``"""
+
+    def hide(self):
+        self.frame.place_forget()
+
+
+class _MonthCard:
+    def __init__(self, parent, on_view, on_export):
+        self.summary = None
+        self.frame = ttk.Frame(parent, style="Card.TFrame")
+
+        header_frame = ttk.Frame(self.frame)
+        header_frame.pack(fill='x', pady=5)
+        self.month_label = ttk.Label(header_frame, style="SubHeader.TLabel")
+        self.month_label.pack(side='left', padx=10)
+        self.total_label = ttk.Label(header_frame, style="Amount.TLabel")
+        self.total_label.pack(side='right', padx=10)
+
+        btn_frame = ttk.Frame(self.frame)
+        btn_frame.pack(fill='x', pady=5)
+        ctk.CTkButton(btn_frame, text="View Details", width=150,
+                      command=lambda: on_view(self.summary)).pack(side='left', padx=5)
+        ctk.CTkButton(btn_frame, text="Export PDF", width=150,
+                      command=lambda: on_export(self.summary)).pack(side='left', padx=5)
+        self.widgets = (self.frame, header_frame, self.month_label, self.total_label, btn_frame)
+
+    def fill(self, summary):
+        self.summary = summary
+        self.month_label.configure(text=_month_name(summary))
+        if summary.get('total') is not None:
+            total = f"Total: ₨ {summary['total']:,.2f}"
+        elif summary.get('error'):
+            total = "Could not be read"
+        else:
+            total = "Loading..."
+        self.total_label.configure(text=total)
+
+    def show(self):
+        """Placed by ``ArchiveCardList._render``"""
+
+    def hide(self):
+        self.frame.place_forget()
+
+
+def _month_name(summary):
+    name = datetime(summary['year'], summary['month'], 1).strftime("%B %Y")
+    return f"{name} (archived)" if summary.get('archived') else name
+
+
+class ArchiveCardList:
+    """
+    Searchable list of month cards grouped under year headers.
+
+    Only the rows in view have widgets: pools of header and card widgets
+    are placed at the visible rows and refilled as the list scrolls.
+    Months can be added while the list is shown, e.g. as a background
+    loader reads them; a month without a total yet is shown as loading and
+    filled in when it arrives.
+    """
+
+    HEADER_HEIGHT = 40
+    CARD_HEIGHT = 100
+
+    def __init__(self, parent, on_view, on_export):
+        self.on_view = on_view
+        self.on_export = on_export
+        self.months = {}      # (year, month, live) -> summary
+        self.rows = []        # ('year', (year, total)) and ('month', summary), filtered
+        self.offset = 0
+        self._shown_rows = 0
+        self._headers = WidgetPool(self._header)
+        self._cards = WidgetPool(self._card)
+
+        search_frame = ttk.Frame(parent)
+        search_frame.pack(fill='x', pady=(0, 10))
+        ttk.Label(search_frame, text="Search:").pack(side='left', padx=(0, 5))
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add('write', lambda *args: self._filter())
+        ttk.Entry(search_frame, textvariable=self.search_var).pack(side='left', fill='x', expand=True)
+        self.status_label = ttk.Label(search_frame)
+        self.status_label.pack(side='right', padx=(10, 0))
+
+        list_frame = ttk.Frame(parent)
+        list_frame.pack(fill='both', expand=True)
+        self.body = ttk.Frame(list_frame)
+        self.body.pack(side='left', fill='both', expand=True)
+        self.scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.pack(side='right', fill='y')
+
+        self.body.bind('<Configure>', lambda e: self._render())
+        self._bind_scroll(self.body)
+
+    def add(self, summaries):
+        """Add months or replace the ones already listed"""
+        for summary in summaries:
+            self.months[(summary['year'], summary['month'],
+                         not summary.get('archived'))] = summary
+        self._filter()
+
+    def set_status(self, text):
+        self.status_label.configure(text=text)
+
+    # Filtering and grouping
+
+    def _filter(self):
+        query = self.search_var.get().strip().lower()
+        rows = []
+        header = None
+        for (year, month, live), summary in sorted(self.months.items(), reverse=True):
+            total = summary.get('total')
+            if query and query not in _month_name(summary).lower() and (
+                    total is None or query not in f"{total:,.2f}"):
+                continue
+            if header is None or header[1][0] != year:
+                header = ['year', [year, 0]]
+                rows.append(header)
+            header[1][1] += total or 0
+            rows.append(('month', summary))
+        self.rows = rows
+        self._render()
+
+    # Scrolling
+
+    def _height(self, row):
+        return self.HEADER_HEIGHT if row[0] == 'year' else self.CARD_HEIGHT
+
+    def _max_offset(self):
+        """First row of the last full page"""
+        space = self.body.winfo_height()
+        offset = len(self.rows)
+        while offset > 0 and space >= self._height(self.rows[offset - 1]):
+            offset -= 1
+            space -= self._height(self.rows[offset])
+        return offset
+
+    def scroll(self, rows):
+        self.scroll_to(self.offset + rows)
+
+    def scroll_to(self, offset):
+        offset = min(max(0, int(offset)), self._max_offset())
+        if offset != self.offset:
+            self.offset = offset
+            self._render()
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto':
+            self.scroll_to(float(amount) * len(self.rows))
+        elif unit == 'pages':
+            self.scroll(int(amount) * max(1, self._shown_rows))
+        else:
+            self.scroll(int(amount))
+
+    def _bind_scroll(self, widget):
+        widget.bind('<MouseWheel>', lambda e: self.scroll(int(-1 * (e.delta / 120))))
+        widget.bind('<Button-4>', lambda e: self.scroll(-1))
+        widget.bind('<Button-5>', lambda e: self.scroll(1))
+
+    # Rendering
+
+    def _header(self, position):
+        header = _YearHeader(self.body)
+        for widget in (header.frame, header.year_label, header.total_label):
+            self._bind_scroll(widget)
+        return header
+
+    def _card(self, position):
+        card = _MonthCard(self.body, self.on_view, self.on_export)
+        for widget in card.widgets:
+            self._bind_scroll(widget)
+        return card
+
+    def _render(self):
+        """Place pooled widgets at the rows in view and hide the rest"""
+        self.offset = min(self.offset, self._max_offset())
+        space = self.body.winfo_height()
+        y = 0
+        row = self.offset
+        visible = []
+        while row < len(self.rows) and y < space:
+            visible.append((self.rows[row], y))
+            y += self._height(self.rows[row])
+            row += 1
+        headers = iter(self._headers.update(
+            tuple(value) for (kind, value), y in visible if kind == 'year'))
+        cards = iter(self._cards.update(
+            value for (kind, value), y in visible if kind == 'month'))
+        for (kind, value), y in visible:
+            widget = next(headers) if kind == 'year' else next(cards)
+            widget.frame.place(x=0, y=y, relwidth=1, height=self._height((kind, value)) - 10)
+        self._shown_rows = row - self.offset
+
+        if self.rows:
+            self.scrollbar.set(self.offset / len(self.rows), row / len(self.rows))
+        else:
+            self.scrollbar.set(0, 1)
@@ -13,10 +13,7 @@ setup(
     packages=find_packages(),
     install_requires=[
         'customtkinter>=5.2.0',
-        'pandas>=1.5.0',
         'matplotlib>=3.7.0',
-        'seaborn>=0.12.0',
-        'scikit-learn>=1.0.0',
         'tkcalendar>=1.6.1',
         'reportlab>=3.6.12',
         'numpy>=1.21.0'
@@ -35,7 +32,7 @@ setup(
     python_requires='>=3.8',
     entry_points={
         'console_scripts': [
-            'monthly-kharcha=monthly_kharcha.main:main',
+            'monthly-kharcha=monthly_kharcha.cli:main',
         ],
     },
 ) 
\ No newline at end of file
@@ -0,0 +1,79 @@
+import random
+
+import pytest
+
+from monthly_kharcha.engine import Expense, Ledger, new_expense_id
+from monthly_kharcha.engine import balance_engine
+from monthly_kharcha.engine.expense_table import ExpenseTable
+
+PEOPLE = ["Danish", "Umair", "Nisar", "Shahzaib", "Guest"]
+
+
+def make_expense(amount, paid_by, shared_between, category="Food"):
+    return Expense({
+        'id': new_expense_id(),
+        'category': category,
+        'description': "test",
+        'amount': amount,
+        'paid_by': paid_by,
+        'shared_between': shared_between,
+        'date': "2026-10-01 12:00:00"
+    })
+
+
+def random_expenses(count, seed=7):
+    rng = random.Random(seed)
+    expenses = []
+    for _ in range(count):
+        sharing = rng.sample(PEOPLE, rng.randint(1, len(PEOPLE)))
+        if rng.random() < 0.05:
+            sharing.append(sharing[0])
+        expenses.append(make_expense(rng.randint(1, 10 ** 6) / 100, rng.choice(PEOPLE),
+                                     sharing, rng.choice(["Food", "Rent", "Gas"])))
+    return expenses
+
+
+def as_dicts(totals):
+    return (dict(totals.payments), dict(totals.shares), dict(totals.category_totals))
+
+
+def test_table_keeps_sharing_order_and_duplicates():
+    expenses = [make_expense(100, "Danish", ["Nisar", "Umair", "Danish"]),
+                make_expense(100, "Danish", ["Umair", "Umair"])]
+    table = ExpenseTable.from_expenses(expenses, PEOPLE)
+    assert [row['shared_between'] for row in table] == [
+        ["Nisar", "Umair", "Danish"], ["Umair", "Umair"]]
+
+
+def test_leftover_paisa_follow_the_stored_order():
+    # 30000.02 split three ways leaves two paisa for the first two people
+    expense = make_expense(30000.02, "Danish", ["Nisar", "Umair", "Danish"])
+    table = ExpenseTable.from_expenses([expense] * balance_engine.VECTORIZE_FROM, PEOPLE)
+    shares = balance_engine.totals(table).shares
+    assert shares["Nisar"] == shares["Umair"] == shares["Danish"] + balance_engine.VECTORIZE_FROM
+
+
+@pytest.mark.parametrize("count", [50, balance_engine.VECTORIZE_FROM + 500])
+def test_table_totals_match_ledger(count):
+    expenses = random_expenses(count)
+    expected = as_dicts(balance_engine._python_totals(expenses))
+    assert as_dicts(balance_engine.totals(expenses)) == expected
+    assert as_dicts(balance_engine.totals(ExpenseTable.from_expenses(expenses, PEOPLE))) == expected
+
+    ledger = Ledger(PEOPLE)
+    for expense in expenses:
+        ledger.add(expense)
+    balances = balance_engine.totals(ExpenseTable.from_expenses(expenses)).balances(PEOPLE)
+    assert ledger.balances == {name: paisa / 100 for name, paisa in balances.items()}
+
+
+def test_table_totals_after_removals_and_replacements():
+    expenses = random_expenses(balance_engine.VECTORIZE_FROM + 200, seed=3)
+    table = ExpenseTable.from_expenses(expenses)
+    for expense in expenses[:150]:
+        table.remove(expense['id'])
+    changed = make_expense(1234.57, "Guest", ["Shahzaib", "Nisar", "Guest"])
+    table.replace(expenses[400]['id'], changed)
+    remaining = expenses[150:400] + [changed] + expenses[401:]
+    assert as_dicts(balance_engine.totals(table)) == as_dicts(
+        balance_engine._python_totals(remaining))
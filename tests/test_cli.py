@@ -0,0 +1,162 @@
+import csv
+import json
+from datetime import datetime
+
+import pytest
+
+from monthly_kharcha import cli
+from monthly_kharcha.engine import (Expense, JSONStorage, MonthBook, SQLiteStorage,
+                                    archive_data, new_expense_id, new_month_data, open_storage)
+from monthly_kharcha.engine.storage import MonthJournal
+
+ROOMMATES = ["Danish", "Umair", "Nisar"]
+
+
+def record(description, amount, date="2025-03-05", paid_by="Danish", shared_between=None):
+    return {'date': date, 'category': "Food", 'description': description, 'amount': amount,
+            'paid_by': paid_by, 'shared_between': shared_between or ROOMMATES}
+
+
+def write_csv(path, records):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=cli.IMPORT_FIELDS)
+        writer.writeheader()
+        for row in records:
+            writer.writerow(dict(row, shared_between=",".join(row['shared_between'])))
+    return path
+
+
+def run(data_dir, *argv):
+    return cli.main(["--data-dir", str(data_dir), *argv])
+
+
+def stored(data_dir, year, month, archived=None):
+    storage = open_storage(data_dir)
+    try:
+        return storage.load(storage.find_book(year, month, archived))['expenses']
+    finally:
+        storage.close(compact=False)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """A data directory with March 2025 started"""
+    data_dir = tmp_path / "data"
+    storage = JSONStorage(data_dir)
+    data_dir.mkdir()
+    storage.save(storage.current_book(2025, 3), new_month_data(ROOMMATES))
+    storage.close()
+    return data_dir
+
+
+@pytest.fixture
+def sqlite_dir(tmp_path):
+    data_dir = tmp_path / "sqlite"
+    data_dir.mkdir()
+    storage = SQLiteStorage(data_dir / "kharcha.db")
+    storage.save(storage.current_book(2025, 3), new_month_data(ROOMMATES))
+    storage.close()
+    return data_dir
+
+
+def test_invalid_record_imports_nothing(data_dir, tmp_path, capsys):
+    today = datetime.now().strftime("%Y-%m-%d")
+    before = sorted(path.name for path in data_dir.iterdir())
+    path = write_csv(tmp_path / "bad.csv", [record("fine", 300),
+                                            record("also fine", 150, today),
+                                            record("bad", "three hundred")])
+    assert run(data_dir, "import", str(path)) == 1
+    assert "record 3: invalid amount" in capsys.readouterr().err
+    assert sorted(path.name for path in data_dir.iterdir()) == before
+
+
+def test_import_into_missing_month_imports_nothing(data_dir, tmp_path, capsys):
+    path = write_csv(tmp_path / "old.csv", [record("fine", 300),
+                                            record("too old", 150, "2024-01-02")])
+    assert run(data_dir, "import", str(path)) == 1
+    assert "January 2024" in capsys.readouterr().err
+    assert stored(data_dir, 2025, 3) == []
+
+
+def test_import_appends_once_per_month(data_dir, tmp_path, monkeypatch):
+    writes = []
+    extend = MonthJournal.extend
+
+    def counting_extend(journal, operations):
+        writes.append((journal.snapshot_path.name, len(operations)))
+        extend(journal, operations)
+
+    monkeypatch.setattr(MonthJournal, 'extend', counting_extend)
+    today = datetime.now()
+    path = write_csv(tmp_path / "batch.csv", [
+        record("one", 300), record("two", 150.5),
+        record("now", 90, today.strftime("%Y-%m-%d")), record("three", 60)])
+    assert run(data_dir, "import", str(path)) == 0
+
+    assert sorted(writes) == sorted([("2025_3.json", 3), (f"{today.year}_{today.month}.json", 1)])
+    assert [e['description'] for e in stored(data_dir, 2025, 3)] == ["one", "two", "three"]
+    assert [e['description'] for e in stored(data_dir, today.year, today.month)] == ["now"]
+
+
+@pytest.mark.parametrize("backend", ["data_dir", "sqlite_dir"])
+def test_reimport_gets_new_ids(backend, request, tmp_path):
+    data_dir = request.getfixturevalue(backend)
+    path = tmp_path / "expenses.json"
+    path.write_text(json.dumps([dict(record("rent", 600), id="abc"),
+                                dict(record("food", 300), id="abc")]))
+    assert run(data_dir, "import", str(path)) == 0
+    assert run(data_dir, "import", str(path)) == 0
+
+    ids = [expense['id'] for expense in stored(data_dir, 2025, 3)]
+    assert len(ids) == 4
+    assert len(set(ids)) == 4 and "abc" not in ids
+
+
+@pytest.fixture
+def shared_month(data_dir):
+    storage = JSONStorage(data_dir)
+    key = storage.current_book(2025, 3)
+    for description, amount, paid_by in (("rent", 900, "Danish"), ("food", 300, "Umair")):
+        storage.add_expense(key, Expense(dict(record(description, amount, paid_by=paid_by),
+                                              id=new_expense_id(),
+                                              date="2025-03-05 12:00:00")))
+    storage.close(compact=False)
+    return data_dir
+
+
+def test_balances_json(shared_month, capsys):
+    assert run(shared_month, "balances", "--month", "2025-03", "--json") == 0
+    assert json.loads(capsys.readouterr().out) == {"Danish": 500.0, "Umair": -100.0,
+                                                   "Nisar": -400.0}
+
+
+def test_settle_plan_json(shared_month, capsys):
+    assert run(shared_month, "settle-plan", "--month", "2025-03", "--json") == 0
+    assert json.loads(capsys.readouterr().out) == [
+        {'from': "Nisar", 'to': "Danish", 'amount': 400.0},
+        {'from': "Umair", 'to': "Danish", 'amount': 100.0}]
+
+
+def test_missing_month_is_reported(data_dir, capsys):
+    assert run(data_dir, "balances", "--month", "2024-01", "--json") == 1
+    assert "No existing data found for January 2024" in capsys.readouterr().err
+
+
+def test_export_pdf_all(shared_month, tmp_path, capsys):
+    pytest.importorskip("reportlab")
+    storage = JSONStorage(shared_month)
+    key = storage.current_book(2025, 3)
+    book = MonthBook(storage, key, storage.load(key))
+    book.update_balances()
+    storage.archive(2025, 3, archive_data(book.data, book.ledger,
+                                          archive_date=datetime(2025, 3, 31)))
+    storage.save(storage.current_book(2025, 2), new_month_data(ROOMMATES))
+    storage.close()
+
+    output_dir = tmp_path / "pdfs"
+    assert run(shared_month, "export-pdf", "--all", "--output-dir", str(output_dir)) == 0
+    names = sorted(path.name for path in output_dir.iterdir())
+    assert names == ["monthly_summary_202502_February.pdf", "monthly_summary_202503_March.pdf",
+                     "monthly_summary_202503_March_live.pdf"]
+    assert all((output_dir / name).read_bytes().startswith(b"%PDF") for name in names)
+    assert len(capsys.readouterr().out.splitlines()) == 3
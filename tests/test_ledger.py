@@ -0,0 +1,93 @@
+import random
+
+import pytest
+
+from monthly_kharcha.engine import Expense, ExpenseIndex, Ledger, new_expense_id
+
+PEOPLE = ["Danish", "Umair", "Nisar", "Shahzaib", "Guest"]
+CATEGORIES = ["Food", "Rent", "Gas", "Other"]
+
+
+def random_expense(rng, expense_id=None):
+    sharing = rng.sample(PEOPLE, rng.randint(1, len(PEOPLE)))
+    if rng.random() < 0.1:
+        sharing.append(sharing[0])
+    return Expense({
+        'id': expense_id or new_expense_id(),
+        'category': rng.choice(CATEGORIES),
+        'description': "test",
+        'amount': rng.choice([rng.randint(1, 10 ** 6) / 100, rng.randint(1, 5000),
+                              rng.randint(1, 300) / 3]),
+        'paid_by': rng.choice(PEOPLE),
+        'shared_between': sharing,
+        'date': f"2026-10-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00:00"
+    })
+
+
+def pattern_view(ledger, expenses):
+    stats = ledger.patterns.current(expenses)
+    return {category: (entry.count, entry.total, entry.largest, entry.latest)
+            for category, entry in stats.items()}
+
+
+def nonzero(totals):
+    # Running totals keep people and categories whose expenses were all removed
+    return {key: value for key, value in totals.items() if value}
+
+
+def assert_matches_recompute(ledger, expenses):
+    fresh = Ledger(ledger.roommates)
+    fresh.rebuild(expenses)
+    assert ledger.balances == fresh.balances
+    for totals in ('payments_paisa', 'shares_paisa', 'category_paisa'):
+        assert nonzero(getattr(ledger, totals)) == nonzero(getattr(fresh, totals))
+    assert (ledger.total_paisa, ledger.count) == (fresh.total_paisa, fresh.count)
+    assert sum(ledger.balance_paisa(name) for name in PEOPLE) == 0
+    assert pattern_view(ledger, expenses) == pattern_view(fresh, expenses)
+    assert ledger.verify(expenses)
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_incremental_updates_match_a_full_recompute(seed):
+    rng = random.Random(seed)
+    expenses = [random_expense(rng) for _ in range(rng.randint(0, 30))]
+    index = ExpenseIndex(expenses)
+    ledger = Ledger(PEOPLE[:3])
+    ledger.rebuild(expenses)
+    ledger.patterns.current(expenses)
+
+    for step in range(400):
+        choice = rng.random()
+        if choice < 0.45 or not expenses:
+            expense = random_expense(rng)
+            index.add(expense)
+            ledger.add(expense)
+        elif choice < 0.7:
+            expense_id = rng.choice(expenses)['id']
+            new_expense = random_expense(rng, expense_id)
+            ledger.replace(index.replace(expense_id, new_expense), new_expense)
+        elif choice < 0.95:
+            ledger.remove(index.remove(rng.choice(expenses)['id']))
+        elif choice < 0.975:
+            ledger.add_roommate(rng.choice(PEOPLE))
+        else:
+            ledger.remove_roommate(rng.choice(PEOPLE))
+        if step % 50 == 0:
+            assert_matches_recompute(ledger, expenses)
+
+    version = ledger.version
+    assert_matches_recompute(ledger, expenses)
+    assert ledger.version == version
+
+
+def test_verify_repairs_a_drifted_ledger():
+    rng = random.Random(1)
+    expenses = [random_expense(rng) for _ in range(20)]
+    ledger = Ledger(PEOPLE)
+    ledger.rebuild(expenses)
+    ledger.payments_paisa["Danish"] += 1
+    version = ledger.version
+
+    assert not ledger.verify(expenses)
+    assert ledger.version > version
+    assert ledger.verify(expenses)
@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+from monthly_kharcha.engine.money import split, to_paisa, to_rupees
+
+
+@pytest.mark.parametrize("amount, paisa", [
+    (0.005, 1), (1.005, 101), (2.675, 268), (10.005, 1001), (12.345, 1235),
+    (0.004, 0), (0.0049999, 0), (33.333, 3333), (0.1 + 0.2, 30), (1e-7, 0),
+    (-0.005, -1), (-1.005, -101), (-12.345, -1235), (-0.004, 0),
+    (0, 0), (0.0, 0), (-0.0, 0), (7, 700), (-7, -700),
+])
+def test_to_paisa_rounds_halves_away_from_zero(amount, paisa):
+    assert to_paisa(amount) == paisa
+    assert isinstance(to_paisa(amount), int)
+
+
+def test_to_rupees_inverts_to_paisa():
+    for paisa in (0, 1, 99, 100, 12345, -1, -12345):
+        assert to_paisa(to_rupees(paisa)) == paisa
+
+
+@pytest.mark.parametrize("paisa, parts, shares", [
+    (100, 3, [34, 33, 33]),
+    (101, 3, [34, 34, 33]),
+    (2, 3, [1, 1, 0]),
+    (99, 3, [33, 33, 33]),
+    (7, 1, [7]),
+    (-100, 3, [-34, -33, -33]),
+    (-2, 3, [-1, -1, 0]),
+    (0, 4, [0, 0, 0, 0]),
+])
+def test_split_gives_leftover_paisa_to_the_first_shares(paisa, parts, shares):
+    assert split(paisa, parts) == shares
+
+
+def test_split_adds_up_exactly():
+    rng = random.Random(17)
+    for _ in range(2000):
+        paisa = rng.randint(-10 ** 7, 10 ** 7)
+        parts = rng.randint(1, 12)
+        shares = split(paisa, parts)
+        assert len(shares) == parts
+        assert sum(shares) == paisa
+        assert max(shares) - min(shares) <= 1
+        # Reverting an expense subtracts exactly what adding it added
+        assert split(-paisa, parts) == [-share for share in shares]
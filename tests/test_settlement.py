@@ -0,0 +1,112 @@
+import random
+from functools import lru_cache
+
+import pytest
+
+from monthly_kharcha.engine.settlement import (EXACT_LIMIT, balances_to_paisa, settle,
+                                               settlement_plan)
+
+
+def zero_sum_balances(rng, members, max_group=4):
+    """Random ``{name: paisa}`` balances made of small zero-sum groups"""
+    amounts = []
+    while len(amounts) < members:
+        group = [rng.randint(-50000, 50000) for _ in range(rng.randint(1, max_group - 1))]
+        group.append(-sum(group))
+        amounts.extend(group)
+    amounts = amounts[:members]
+    amounts[-1] -= sum(amounts)
+    rng.shuffle(amounts)
+    return {f"person{i:02d}": amount for i, amount in enumerate(amounts)}
+
+
+def apply_transfers(balances, transfers):
+    remaining = dict(balances)
+    for payer, receiver, amount in transfers:
+        assert amount > 0
+        remaining[payer] += amount
+        remaining[receiver] -= amount
+    return remaining
+
+
+def fewest_transfers(balances):
+    """Brute force: members minus the most zero-sum subsets they split into"""
+    amounts = [amount for amount in balances.values() if amount]
+
+    @lru_cache(maxsize=None)
+    def most_groups(mask):
+        if not mask:
+            return 0
+        first = (mask & -mask).bit_length() - 1
+        best = 0
+        rest = mask & ~(1 << first)
+        sub = rest
+        while True:
+            group = sub | (1 << first)
+            if sum(amounts[i] for i in range(len(amounts)) if group >> i & 1) == 0:
+                best = max(best, 1 + most_groups(mask & ~group))
+            if not sub:
+                break
+            sub = (sub - 1) & rest
+        return best
+
+    return len(amounts) - most_groups((1 << len(amounts)) - 1)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_exact_plan_settles_with_fewest_transfers(seed):
+    rng = random.Random(seed)
+    balances = zero_sum_balances(rng, rng.randint(2, 9))
+    transfers = settle(balances)
+    assert all(amount == 0 for amount in apply_transfers(balances, transfers).values())
+    assert len(transfers) == fewest_transfers(balances)
+
+
+def test_plan_is_largest_first_and_deterministic():
+    balances = {"Danish": 30000, "Umair": -10000, "Nisar": -15000, "Shahzaib": -5000}
+    transfers = settle(balances)
+    assert transfers == settle(dict(reversed(list(balances.items()))))
+    assert [amount for _, _, amount in transfers] == sorted(
+        (amount for _, _, amount in transfers), reverse=True)
+
+
+def test_opposite_balances_pay_each_other():
+    balances = {"Danish": 500, "Umair": -500, "Nisar": 700, "Shahzaib": -700}
+    assert sorted(settle(balances)) == [("Shahzaib", "Nisar", 700), ("Umair", "Danish", 500)]
+
+
+def test_largest_exact_group_settles():
+    rng = random.Random(11)
+    # Non-zero balances without opposite pairs, so all of them reach the solver
+    balances = {}
+    while (len(balances) < EXACT_LIMIT or not all(balances.values())
+           or any(-amount in balances.values() for amount in balances.values())):
+        balances = zero_sum_balances(rng, EXACT_LIMIT)
+    transfers = settle(balances)
+    assert all(amount == 0 for amount in apply_transfers(balances, transfers).values())
+    assert len(transfers) <= EXACT_LIMIT - 1
+
+
+def test_large_groups_use_the_greedy_plan():
+    rng = random.Random(5)
+    balances = zero_sum_balances(rng, 200)
+    transfers = settle(balances)
+    assert all(amount == 0 for amount in apply_transfers(balances, transfers).values())
+    assert len(transfers) < len(balances)
+
+
+def test_settled_balances_need_no_transfers():
+    assert settle({}) == []
+    assert settle({"Danish": 0, "Umair": 0}) == []
+
+
+def test_rupee_balances_are_rounded_to_zero_sum():
+    paisa = balances_to_paisa({"Danish": 10.005, "Umair": 10.005, "Nisar": -20.0})
+    assert sum(paisa.values()) == 0
+    assert paisa == balances_to_paisa({"Danish": 10.005, "Umair": 10.005, "Nisar": -20.0})
+
+
+def test_settlement_plan_in_rupees():
+    plan = settlement_plan({"Danish": 150.5, "Umair": -100.25, "Nisar": -50.25})
+    assert plan == [{'from': "Umair", 'to': "Danish", 'amount': 100.25},
+                    {'from': "Nisar", 'to': "Danish", 'amount': 50.25}]
@@ -0,0 +1,197 @@
+import json
+import sqlite3
+
+import pytest
+
+from monthly_kharcha.engine import (Expense, JSONStorage, MigrationError, SQLiteStorage,
+                                    archive_data, migrate_json_to_sqlite, new_expense_id,
+                                    new_month_data, open_storage)
+from monthly_kharcha.engine.ledger import Ledger
+from monthly_kharcha.engine.sqlite_storage import SCHEMA_VERSION
+
+ROOMMATES = ["Danish", "Umair", "Nisar"]
+
+# The expenses table before amounts were counted in paisa
+SCHEMA_V1 = """
+CREATE TABLE months (
+    month TEXT NOT NULL,
+    archived INTEGER NOT NULL DEFAULT 0,
+    archive_date TEXT,
+    final_balances TEXT,
+    extra TEXT NOT NULL DEFAULT '{}',
+    PRIMARY KEY (month, archived)
+);
+CREATE TABLE roommates (
+    month TEXT NOT NULL,
+    archived INTEGER NOT NULL DEFAULT 0,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (month, archived, position)
+);
+CREATE TABLE expenses (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT,
+    month TEXT NOT NULL,
+    archived INTEGER NOT NULL DEFAULT 0,
+    date TEXT NOT NULL,
+    category TEXT NOT NULL,
+    description TEXT NOT NULL,
+    amount REAL NOT NULL,
+    paid_by TEXT NOT NULL,
+    shared_between TEXT NOT NULL
+);
+CREATE UNIQUE INDEX expenses_id ON expenses (month, archived, id);
+PRAGMA user_version = 1;
+"""
+
+
+def make_expense(description, amount=300, category="Food", expense_id=None):
+    return Expense({
+        'id': expense_id or new_expense_id(),
+        'category': category,
+        'description': description,
+        'amount': amount,
+        'paid_by': "Danish",
+        'shared_between': ROOMMATES,
+        'date': "2026-10-01 12:00:00"
+    })
+
+
+def month_with(*expenses):
+    data = new_month_data(ROOMMATES)
+    data['expenses'] = list(expenses)
+    return data
+
+
+def archived(data):
+    ledger = Ledger(ROOMMATES)
+    ledger.rebuild(data['expenses'])
+    data['balances'] = ledger.balances
+    return archive_data(data, ledger)
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = SQLiteStorage(tmp_path / "kharcha.db")
+    yield storage
+    storage.close()
+
+
+def test_version_1_database_is_upgraded_to_paisa(tmp_path):
+    db_path = tmp_path / "kharcha.db"
+    conn = sqlite3.connect(str(db_path))
+    conn.executescript(SCHEMA_V1)
+    conn.execute("INSERT INTO months (month, archived) VALUES ('2026-10', 0)")
+    conn.executemany(
+        "INSERT INTO expenses (id, month, archived, date, category, description, amount, "
+        "paid_by, shared_between) VALUES (?, '2026-10', 0, '2026-10-01 12:00:00', 'Food', "
+        "'old', ?, 'Danish', ?)",
+        [("a", 100.0, json.dumps(ROOMMATES)), ("b", 0.1 + 0.2, json.dumps(["Umair"])),
+         ("c", 10.005, json.dumps(["Nisar"]))])
+    conn.commit()
+    conn.close()
+
+    storage = SQLiteStorage(db_path)
+    try:
+        assert storage.conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+        assert storage.conn.execute(
+            "SELECT id, paisa, amount FROM expenses ORDER BY seq").fetchall() == [
+                ("a", 10000, 100.0), ("b", 30, 0.3), ("c", 1001, 10.01)]
+        data = storage.load(("2026-10", 0))
+        assert [expense['amount'] for expense in data['expenses']] == [100.0, 0.3, 10.01]
+    finally:
+        storage.close()
+
+
+def test_save_and_load_round_trip_in_paisa(storage):
+    key = storage.current_book(2026, 10)
+    expenses = [make_expense("third", 100), make_expense("odd", 33.33),
+                make_expense("float", 0.1 + 0.2, "Gas")]
+    storage.save(key, month_with(*expenses))
+
+    assert storage.conn.execute(
+        "SELECT paisa FROM expenses ORDER BY seq").fetchall() == [(10000,), (3333,), (30,)]
+    data = storage.load(key)
+    assert [(e['id'], e['amount']) for e in data['expenses']] == [
+        (e['id'], e['amount']) for e in expenses]
+    assert data['roommates'] == ROOMMATES
+    # 100 splits as 33.34 + 33.33 + 33.33, the leftover paisa going first
+    assert data['balances'] == {"Danish": 89.08, "Umair": -44.54, "Nisar": -44.54}
+
+
+def test_single_changes_are_stored(storage):
+    key = storage.current_book(2026, 10)
+    storage.save(key, month_with())
+    first, second = make_expense("first"), make_expense("second")
+    storage.add_expenses(key, [first, second])
+    storage.edit_expense(key, first['id'], make_expense("edited", 45.5, expense_id=first['id']))
+    storage.delete_expense(key, second['id'])
+    storage.set_roommates(key, ROOMMATES + ["Shahzaib"])
+
+    data = storage.load(key)
+    assert [(e['description'], e['amount']) for e in data['expenses']] == [("edited", 45.5)]
+    assert data['roommates'] == ROOMMATES + ["Shahzaib"]
+
+
+def test_live_and_archived_books_of_one_month(storage):
+    storage.archive(2026, 10, archived(month_with(make_expense("before", 600))))
+    live = storage.current_book(2026, 10)
+    storage.save(live, month_with(make_expense("after", 300, "Rent")))
+    storage.save(storage.current_book(2026, 9), month_with())
+
+    assert storage.find_book(2026, 10) == live
+    assert storage.find_book(2026, 10, archived=False) == live
+    assert storage.find_book(2026, 10, archived=True) == ("2026-10", 1)
+    assert storage.find_book(2026, 9, archived=True) is None
+    assert [key for year, month, key in storage.list_books()] == [
+        ("2026-10", 0), ("2026-10", 1), ("2026-09", 0)]
+
+    summaries = storage.month_summaries()
+    assert [(s['key'], s['archived'], s['total']) for s in summaries] == [
+        (("2026-10", 0), False, 300.0), (("2026-10", 1), True, 600.0),
+        (("2026-09", 0), False, 0.0)]
+    assert storage.monthly_category_totals() == {(2026, 10): {"Food": 600.0, "Rent": 300.0},
+                                                 (2026, 9): {}}
+    archive = storage.load_archive(("2026-10", 1))
+    assert archive['month_summary']['final_balances'] == {
+        "Danish": 400.0, "Umair": -200.0, "Nisar": -200.0}
+    assert [e['description'] for e in archive['month_data']['expenses']] == ["before"]
+
+
+def test_json_months_migrate_to_sqlite(tmp_path):
+    source = JSONStorage(tmp_path)
+    source.archive(2026, 9, archived(month_with(make_expense("archived", 900))))
+    live = source.current_book(2026, 9)
+    source.save(live, month_with())
+    source.add_expense(live, make_expense("journaled", 12.34))
+    source.close(compact=False)
+
+    imported = migrate_json_to_sqlite(tmp_path)
+    assert sorted(imported) == ["2026_9.json", "archive_2026_09.json"]
+    assert not (tmp_path / "kharcha.db.tmp").exists()
+
+    storage = open_storage(tmp_path)
+    try:
+        assert isinstance(storage, SQLiteStorage)
+        assert [key for year, month, key in storage.list_books()] == [
+            ("2026-09", 0), ("2026-09", 1)]
+        assert [(e['description'], e['amount']) for e in storage.load(("2026-09", 0))['expenses']
+                ] == [("journaled", 12.34)]
+        archive = storage.load_archive(("2026-09", 1))
+        assert archive['month_summary']['total_expenses'] == 900.0
+        assert archive['month_summary']['archive_date']
+    finally:
+        storage.close()
+
+
+def test_failed_migration_leaves_no_database(tmp_path):
+    JSONStorage(tmp_path).save(tmp_path / "2026_8.json", month_with(make_expense("fine")))
+    duplicate = month_with(make_expense("one", expense_id="abc"),
+                           make_expense("two", expense_id="abc"))
+    (tmp_path / "2026_9.json").write_text(json.dumps(duplicate))
+
+    with pytest.raises(MigrationError, match="2026_9.json"):
+        migrate_json_to_sqlite(tmp_path)
+    assert sorted(path.name for path in tmp_path.iterdir()
+                  if path.name.startswith("kharcha.db")) == []
+    assert isinstance(open_storage(tmp_path), JSONStorage)
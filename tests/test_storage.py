@@ -0,0 +1,144 @@
+import json
+
+import pytest
+
+from monthly_kharcha.engine import (BookChangedError, Expense, JSONStorage, MonthBook,
+                                    new_expense_id, new_month_data)
+from monthly_kharcha.engine.storage import MonthJournal
+
+ROOMMATES = ["Danish", "Umair", "Nisar"]
+
+
+def make_expense(description, amount=300):
+    return Expense({
+        'id': new_expense_id(),
+        'category': "Food",
+        'description': description,
+        'amount': amount,
+        'paid_by': "Danish",
+        'shared_between': ROOMMATES,
+        'date': "2026-10-01 12:00:00"
+    })
+
+
+@pytest.fixture
+def book(tmp_path):
+    storage = JSONStorage(tmp_path)
+    key = storage.current_book(2026, 10)
+    storage.save(key, new_month_data(ROOMMATES))
+    return storage, key
+
+
+def descriptions(key):
+    data = MonthJournal(key).load(repair=False)
+    return [expense['description'] for expense in data['expenses']]
+
+
+def test_appends_replay_on_load(book):
+    storage, key = book
+    storage.add_expense(key, make_expense("one"))
+    storage.add_expenses(key, [make_expense("two"), make_expense("three")])
+    assert key.with_suffix('.journal').exists()
+    assert descriptions(key) == ["one", "two", "three"]
+    assert storage.load(key)['balances'] == {"Danish": 600.0, "Umair": -300.0, "Nisar": -300.0}
+
+
+def test_torn_journal_tail_is_dropped_and_truncated(book):
+    storage, key = book
+    storage.add_expense(key, make_expense("kept"))
+    journal_path = key.with_suffix('.journal')
+    intact = journal_path.read_bytes()
+    with open(journal_path, 'ab') as f:
+        f.write(b'{"op":"add","seq":2,"expense":{"id":"torn"')
+
+    assert [e['description'] for e in JSONStorage(key.parent).load(key)['expenses']] == ["kept"]
+    assert journal_path.read_bytes() == intact
+
+    storage = JSONStorage(key.parent)
+    storage.add_expense(key, make_expense("after"))
+    assert descriptions(key) == ["kept", "after"]
+
+
+def test_crash_before_journal_removal_does_not_replay_twice(book):
+    storage, key = book
+    storage.add_expense(key, make_expense("one"))
+    storage.add_expense(key, make_expense("two"))
+    journal_path = key.with_suffix('.journal')
+    leftover = journal_path.read_bytes()
+
+    # Compact, then put the journal back as if the process died between
+    # replacing the snapshot and unlinking the journal
+    storage.flush()
+    assert not journal_path.exists()
+    journal_path.write_bytes(leftover)
+
+    assert descriptions(key) == ["one", "two"]
+    storage = JSONStorage(key.parent)
+    storage.add_expense(key, make_expense("three"))
+    assert descriptions(key) == ["one", "two", "three"]
+
+
+def test_bad_journal_entry_is_skipped(book):
+    storage, key = book
+    storage.add_expense(key, make_expense("one"))
+    with open(key.with_suffix('.journal'), 'a') as f:
+        f.write(json.dumps({'op': 'delete', 'seq': 2, 'id': "missing"}) + "\n")
+    storage = JSONStorage(key.parent)
+    storage.add_expense(key, make_expense("two"))
+    assert descriptions(key) == ["one", "two"]
+
+
+def test_journal_compacts_after_limit(book, monkeypatch):
+    storage, key = book
+    monkeypatch.setattr(MonthJournal, 'COMPACT_AFTER', 5)
+    for i in range(7):
+        storage.add_expense(key, make_expense(f"e{i}"))
+    snapshot = json.loads(key.read_text())
+    assert len(snapshot['expenses']) == 5
+    assert snapshot['journal_seq'] == 5
+    assert descriptions(key) == [f"e{i}" for i in range(7)]
+
+
+def test_interleaved_writers_keep_every_entry(book):
+    app, key = book
+    app.add_expense(key, make_expense("app-1"))
+    other = JSONStorage(key.parent)
+    other.add_expense(key, make_expense("cli"))
+    other.close()
+    app.add_expense(key, make_expense("app-2"))
+    assert descriptions(key) == ["app-1", "cli", "app-2"]
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_whole_month_save_keeps_other_writers_entries(book, compact):
+    app, key = book
+    month = MonthBook(app, key, app.load(key))
+    month.add(make_expense("app-1"))
+    other = JSONStorage(key.parent)
+    other.add_expense(key, make_expense("cli"))
+    other.close(compact=compact)
+    # The app's next append picks up the other writer's entry on disk,
+    # but its own copy of the month is still missing it
+    month.add(make_expense("app-2"))
+
+    with pytest.raises(BookChangedError):
+        month.save()
+    with pytest.raises(BookChangedError):
+        month.start_new_month()
+    assert descriptions(key) == ["app-1", "cli", "app-2"]
+
+    assert month.reload()
+    assert not month.reload()
+    assert [expense['description'] for expense in month.expenses] == ["app-1", "cli", "app-2"]
+    assert month.ledger.total == 900
+    archived = month.start_new_month()
+    assert archived['month_summary']['expense_count'] == 3
+    assert descriptions(key) == []
+
+
+def test_lock_files_are_removed(book):
+    storage, key = book
+    storage.add_expense(key, make_expense("one"))
+    storage.load(key)
+    storage.flush()
+    assert sorted(path.name for path in key.parent.iterdir()) == ["2026_10.json", "manifest.json"]